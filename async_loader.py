@@ -0,0 +1,210 @@
+# async_loader.py
+"""
+Carregamento assíncrono da cena: a janela renderiza antes dos assets terminarem.
+
+Threads de trabalho fazem a parte pesada que não precisa de OpenGL (bake/leitura
+das texturas, geração de malhas e do campo de estrelas). O resultado entra numa
+fila limitada e a thread do OpenGL (a única com contexto) a esvazia aos poucos
+com pump(), enviando no máximo alguns megabytes por frame.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import time
+
+import numpy as np
+
+from mesh_cache import load_mesh
+from texture_bake import ensure_baked, read_baked, first_level_within, create_mip_texture, upload_level
+from starfield import (
+    load_starfield, upload_starfield,
+    load_starfield_cubemap, create_cubemap_texture, upload_cubemap_face
+)
+
+UPLOAD_BUDGET_BYTES = 4 * 1024 * 1024  # por frame
+QUEUE_SIZE = 8
+
+
+class AsyncLoader:
+    """
+    Fila de carregamento com trabalhadores em background e envio limitado por frame.
+
+    Cada pedido recebe um callback on_ready(resultado), chamado na thread do OpenGL
+    (dentro de pump) quando o envio termina: o ID da textura ou (vertices, indices).
+    """
+
+    def __init__(self, workers=4, upload_budget=UPLOAD_BUDGET_BYTES, queue_size=QUEUE_SIZE):
+        """
+        Args:
+            workers: Número de threads de trabalho
+            upload_budget: Bytes enviados à GPU por chamada de pump()
+            queue_size: Máximo de resultados prontos esperando envio (limita a memória)
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="loader")
+        self.ready = queue.Queue(maxsize=queue_size)
+        self.upload_budget = upload_budget
+        self._lock = threading.Lock()
+        self._active = None  # gerador do envio em andamento
+
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+        self.bytes_uploaded = 0
+
+        self.start_time = time.perf_counter()
+        self.time_to_first_frame = None
+        self.time_to_fully_loaded = None
+
+    def _submit(self, work, upload, on_ready, description):
+        """Executa work() numa thread e agenda upload(resultado, on_ready) na thread do OpenGL."""
+        with self._lock:
+            self.total += 1
+            self.time_to_fully_loaded = None
+
+        def run():
+            try:
+                result = work()
+            except Exception as e:  # o erro é reportado na thread do OpenGL
+                self.ready.put((None, e, None, description))
+            else:
+                # Bloqueia se a fila estiver cheia: limita quanto fica pronto na memória
+                self.ready.put((upload, result, on_ready, description))
+
+        self.executor.submit(run)
+
+    def request_texture(self, texture_path, on_ready, max_size=None):
+        """
+        Carrega uma textura (via contêiner .mip); on_ready(texture_id).
+        Com max_size, só envia a cauda da cadeia (níveis com lado <= max_size) e os
+        níveis maiores ficam para o streaming (ver texture_streaming.py).
+        """
+        def work():
+            _, levels = read_baked(ensure_baked(texture_path))
+            first = 0 if max_size is None else first_level_within(levels, max_size)
+            # Copiar para a RAM aqui para que o envio não espere pelo disco
+            return len(levels), first, [np.array(level) for level in levels[first:]]
+
+        self._submit(work, self._upload_texture, on_ready, texture_path)
+
+    def request_mesh(self, generator, on_ready, **params):
+        """Gera (ou lê do cache) uma malha; on_ready((vertices, indices)) na thread do OpenGL."""
+        def work():
+            vertices, indices = load_mesh(generator, **params)
+            return np.ascontiguousarray(vertices), np.ascontiguousarray(indices)
+
+        self._submit(work, self._upload_passthrough, on_ready, f"{generator} {params}")
+
+    def request_starfield(self, on_ready, **params):
+        """Gera (ou lê do cache) o campo de estrelas; on_ready(texture_id)."""
+        def work():
+            return np.array(load_starfield(**params))
+
+        self._submit(work, self._upload_starfield, on_ready, "starfield")
+
+    def request_starfield_cubemap(self, on_ready, **params):
+        """Gera (ou lê do cache) o cubemap do campo de estrelas; on_ready(texture_id)."""
+        def work():
+            return np.array(load_starfield_cubemap(**params))
+
+        self._submit(work, self._upload_cubemap, on_ready, "starfield cubemap")
+
+    @staticmethod
+    def _upload_texture(result, on_ready):
+        num_levels, first, levels = result
+        texture_id = create_mip_texture(num_levels, base_level=first)
+        for i, level in enumerate(levels, start=first):
+            upload_level(texture_id, i, level)
+            yield level.nbytes
+        on_ready(texture_id)
+
+    @staticmethod
+    def _upload_passthrough(result, on_ready):
+        # O callback cria os buffers; o tamanho conta no orçamento do frame
+        on_ready(result)
+        yield sum(array.nbytes for array in result)
+
+    @staticmethod
+    def _upload_starfield(pixels, on_ready):
+        on_ready(upload_starfield(pixels))
+        yield pixels.nbytes
+
+    @staticmethod
+    def _upload_cubemap(faces, on_ready):
+        texture_id = create_cubemap_texture()
+        for face, pixels in enumerate(faces):
+            upload_cubemap_face(texture_id, face, pixels)
+            yield pixels.nbytes
+        on_ready(texture_id)
+
+    def pump(self):
+        """
+        Envia resultados prontos até o orçamento de bytes do frame. Chamar uma vez
+        por frame na thread do OpenGL. Retorna os bytes enviados neste frame.
+        """
+        sent = 0
+        while sent < self.upload_budget:
+            if self._active is None:
+                try:
+                    upload, result, on_ready, description = self.ready.get_nowait()
+                except queue.Empty:
+                    break
+                if upload is None:
+                    print(f"ERRO ao carregar {description}: {result}")
+                    self.failed += 1
+                    self._finish_one()
+                    continue
+                self._active = upload(result, on_ready)
+
+            try:
+                sent += next(self._active)
+            except StopIteration:
+                self._active = None
+                self.completed += 1
+                self._finish_one()
+
+        self.bytes_uploaded += sent
+        return sent
+
+    def wait(self, poll=0.001):
+        """
+        Bloqueia até todos os pedidos terminarem, enviando tudo à GPU (thread do OpenGL).
+        Usado no modo headless, onde o primeiro frame já precisa da cena completa.
+        """
+        while not self.done:
+            if self.pump() == 0:
+                time.sleep(poll)
+
+    def _finish_one(self):
+        if self.done and self.time_to_fully_loaded is None:
+            self.time_to_fully_loaded = time.perf_counter() - self.start_time
+
+    def mark_first_frame(self):
+        """Registra o tempo até o primeiro frame (chamar após o primeiro flip)."""
+        if self.time_to_first_frame is None:
+            self.time_to_first_frame = time.perf_counter() - self.start_time
+
+    @property
+    def done(self):
+        return self.completed + self.failed >= self.total
+
+    @property
+    def progress(self):
+        """Fração dos pedidos concluídos (0.0 a 1.0)."""
+        return 1.0 if self.total == 0 else (self.completed + self.failed) / self.total
+
+    def metrics(self):
+        """Resumo das métricas de carregamento (segundos e bytes)."""
+        return {
+            "time_to_first_frame": self.time_to_first_frame,
+            "time_to_fully_loaded": self.time_to_fully_loaded,
+            "completed": self.completed,
+            "failed": self.failed,
+            "bytes_uploaded": self.bytes_uploaded,
+        }
+
+    def shutdown(self):
+        """Encerra as threads de trabalho (descarta o que ainda não foi enviado)."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        # Liberar trabalhadores bloqueados na fila cheia
+        while not self.ready.empty():
+            self.ready.get_nowait()
@@ -0,0 +1,681 @@
+# benchmark.py
+"""
+Micro-benchmarks das partes do projeto. Só "uniforms" precisa de contexto OpenGL
+(cria uma janela oculta com o pygame e é pulado se não houver display).
+
+Uso:
+    python3 benchmark.py [sphere] [vertex_format] [vertex_cache] [arena] [transforms] [kepler] [ephemeris] [starfield] [uniforms] [culling] [lights]
+"""
+import sys
+import time
+
+import glm
+import numpy as np
+
+from meshes import (
+    generate_sphere, generate_sphere_vectorized, generate_sphere_packed, generate_skybox_sphere
+)
+from mesh_optimize import optimize_mesh
+from planet import Planet
+from scene_graph import SceneGraph
+from orbits import solve_kepler, perifocal_basis, orbit_offsets
+from ephemeris import Ephemeris, build_ephemeris, scene_elements
+from starfield import generate_starfield
+from stats import GLCallCounter, FrameStats
+from culling import FrustumCuller, frustum_planes, classify_spheres, OUTSIDE
+from clustered_lighting import CLUSTER_GRID, PointLights, assign_lights, slice_params
+
+
+def _best_time(func, *args, repeat=3):
+    """Executa func(*args) 'repeat' vezes e retorna o menor tempo (segundos)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_sphere_equivalence(resolutions=((30, 30), (7, 13), (64, 64)), atol=1e-5):
+    """
+    Compara generate_sphere_vectorized com a implementação original.
+    Lança AssertionError se os índices diferirem ou os vértices saírem da tolerância.
+    """
+    for stacks, sectors in resolutions:
+        ref_verts, ref_inds = generate_sphere(1.0, stacks, sectors)
+        verts, inds = generate_sphere_vectorized(1.0, stacks, sectors)
+        assert verts.shape == ref_verts.shape, f"{stacks}x{sectors}: layout diferente"
+        assert np.array_equal(inds, ref_inds), f"{stacks}x{sectors}: índices diferentes"
+        err = np.abs(verts - ref_verts).max()
+        assert err <= atol, f"{stacks}x{sectors}: erro máximo {err:.2e} > {atol:.0e}"
+    print(f"generate_sphere_vectorized equivale à original ({len(resolutions)} resoluções)")
+
+
+def bench_sphere(resolutions=(30, 128, 512, 1024)):
+    """Reporta vértices por segundo de cada gerador de esfera."""
+    check_sphere_equivalence()
+    print(f"{'resolução':>10} {'original (v/s)':>16} {'vetorizado (v/s)':>18}")
+    for n in resolutions:
+        num_vertices = (n + 1) * (n + 1)
+        # A versão original fica impraticável em resoluções altas
+        if n <= 128:
+            original = f"{num_vertices / _best_time(generate_sphere, 1.0, n, n, repeat=1):16,.0f}"
+        else:
+            original = f"{'-':>16}"
+        vectorized = num_vertices / _best_time(generate_sphere_vectorized, 1.0, n, n)
+        print(f"{f'{n}x{n}':>10} {original} {vectorized:18,.0f}")
+
+
+def _unpack_2_10_10_10(words):
+    """Inverso de meshes.pack_2_10_10_10 (conversão do GL 4.2+: c / 511). Retorna (xyz, w)."""
+    words = words.astype(np.int64)
+    fields = [(words >> shift) & 0x3FF for shift in (0, 10, 20)]
+    xyz = np.stack([np.where(f >= 512, f - 1024, f) for f in fields], axis=1) / 511.0
+    w = (words >> 30) & 0x3
+    return xyz, np.where(w >= 2, w - 4, w)
+
+
+def check_packed_vertices(resolutions=((30, 30), (7, 13), (256, 256))):
+    """
+    Compara o layout compacto com o de 14 floats: erro de posição e UV (em
+    fração do raio e da textura) e ângulo das normais e tangentes.
+    Lança AssertionError se algum erro passar dos limites da quantização.
+    """
+    for stacks, sectors in resolutions:
+        ref, ref_inds = generate_sphere_vectorized(1.0, stacks, sectors)
+        packed, inds = generate_sphere_packed(1.0, stacks, sectors)
+        ref = ref.reshape(-1, 14).astype(np.float64)
+        assert np.array_equal(inds, ref_inds), f"{stacks}x{sectors}: índices diferentes"
+
+        pos_err = np.abs(packed["position"][:, :3] / 32767.0 - ref[:, 0:3]).max()
+        uv_err = np.abs(packed["uv"] / 65535.0 - ref[:, 3:5]).max()
+        normal, _ = _unpack_2_10_10_10(packed["normal"])
+        tangent, sign = _unpack_2_10_10_10(packed["tangent"])
+        # Nos polos a tangente de referência é nula (degenerada nos dois layouts)
+        defined = np.linalg.norm(ref[:, 8:11], axis=1) > 0.5
+        angles = []
+        for vectors, columns in ((normal, slice(5, 8)), (tangent, slice(8, 11))):
+            vectors, expected = vectors[defined], ref[defined, columns]
+            vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+            cos = np.clip(np.sum(vectors * expected, axis=1), -1.0, 1.0)
+            angles.append(np.degrees(np.arccos(cos)).max())
+        bitangent = sign[:, None] * np.cross(ref[:, 5:8], ref[:, 8:11])
+        assert pos_err <= 2e-5 and uv_err <= 1e-5, f"{stacks}x{sectors}: posição/UV fora da tolerância"
+        assert max(angles) <= 0.2, f"{stacks}x{sectors}: normal/tangente a {max(angles):.3f} graus"
+        assert np.allclose(bitangent, ref[:, 11:14], atol=1e-5), f"{stacks}x{sectors}: bitangente"
+    print(f"layout compacto equivale ao de floats ({len(resolutions)} resoluções): "
+          f"posição {pos_err:.1e}, UV {uv_err:.1e}, ângulos {angles[0]:.3f}/{angles[1]:.3f} graus")
+
+
+def bench_vertex_format(resolutions=(8, 16, 32, 64, 128, 256)):
+    """Bytes por vértice e memória da cadeia de LOD nos dois layouts."""
+    check_packed_vertices()
+    print(f"{'resolução':>10} {'floats (KB)':>12} {'compacto (KB)':>14} {'empacotar (ms)':>15}")
+    totals = [0, 0]
+    for n in resolutions:
+        floats, _ = generate_sphere_vectorized(1.0, n, n)
+        packed, _ = generate_sphere_packed(1.0, n, n)
+        totals[0] += floats.nbytes
+        totals[1] += packed.nbytes
+        pack_ms = (_best_time(generate_sphere_packed, 1.0, n, n)
+                   - _best_time(generate_sphere_vectorized, 1.0, n, n)) * 1e3
+        print(f"{f'{n}x{n}':>10} {floats.nbytes / 1024:12,.1f} {packed.nbytes / 1024:14,.1f} "
+              f"{max(pack_ms, 0.0):15.2f}")
+    print(f"{'cadeia':>10} {totals[0] / 1024:12,.1f} {totals[1] / 1024:14,.1f}   "
+          f"({floats.nbytes // (floats.size // 14)} -> {packed.itemsize} bytes/vértice, "
+          f"{totals[0] / totals[1]:.1f}x menos)")
+
+
+def check_optimized_mesh(resolutions=((30, 30), (7, 13), (64, 64))):
+    """
+    Confere que optimize_mesh só reordena: os mesmos triângulos (com o mesmo
+    winding) sobre os mesmos dados de vértice. Lança AssertionError se não.
+    """
+    for stacks, sectors in resolutions:
+        vertices, indices = generate_sphere_vectorized(1.0, stacks, sectors)
+        new_vertices, new_indices, _ = optimize_mesh(vertices, indices, 14)
+        before = vertices.reshape(-1, 14)[indices.reshape(-1, 3)].reshape(-1, 42)
+        after = new_vertices.reshape(-1, 14)[new_indices.reshape(-1, 3)].reshape(-1, 42)
+        assert len(before) == len(after), f"{stacks}x{sectors}: número de triângulos"
+        assert np.array_equal(np.unique(before, axis=0), np.unique(after, axis=0)), \
+            f"{stacks}x{sectors}: triângulos diferentes"
+    print(f"optimize_mesh preserva os triângulos ({len(resolutions)} resoluções)")
+
+
+def bench_vertex_cache(resolutions=(8, 30, 64, 128, 256)):
+    """ACMR/ATVR (cache FIFO simulado) e bytes de índices antes e depois da otimização."""
+    check_optimized_mesh()
+    print(f"{'malha':>16} {'ACMR':>14} {'ATVR':>14} {'índices (KB)':>16} {'tempo (s)':>10}")
+    meshes = [(f"esfera {n}x{n}", generate_sphere_vectorized, n, 14) for n in resolutions]
+    meshes.append(("skybox 20x20", generate_skybox_sphere, 20, 5))
+    for name, generator, n, components in meshes:
+        vertices, indices = generator(1.0, n, n)
+        start = time.perf_counter()
+        _, _, stats = optimize_mesh(vertices, indices, components)
+        elapsed = time.perf_counter() - start
+        before, after = stats["before"], stats["after"]
+        print(f"{name:>16} {before['acmr']:6.3f} -> {after['acmr']:.3f} "
+              f"{before['atvr']:6.3f} -> {after['atvr']:.3f} "
+              f"{stats['index_bytes'][0] / 1024:7.1f} -> {stats['index_bytes'][1] / 1024:<6.1f} "
+              f"{elapsed:10.2f}")
+
+
+def _make_system(num_bodies, seed=0):
+    """Sol + planetas + luas (um planeta para cada ~100 corpos), em ordem embaralhada."""
+    rng = np.random.default_rng(seed)
+    sun = Planet(1.5, 10.0, 0.0, 0.0)
+    num_planets = max(1, num_bodies // 100)
+    planets = [Planet(0.5, rng.uniform(50, 500), rng.uniform(3, 50), rng.uniform(1, 30), parent=sun)
+               for _ in range(num_planets)]
+    moons = [Planet(0.1, rng.uniform(50, 500), rng.uniform(0.5, 2), rng.uniform(10, 90),
+                    parent=planets[rng.integers(num_planets)])
+             for _ in range(num_bodies - num_planets - 1)]
+    bodies = [sun] + planets + moons
+    return [bodies[i] for i in rng.permutation(len(bodies))]
+
+
+def bench_transforms(sizes=(3, 1000, 100_000)):
+    """Compara SceneGraph.update (em lote) com Planet.update (um corpo por vez)."""
+    # Verificação: as duas implementações devem gerar as mesmas matrizes
+    reference = _make_system(500)
+    reference_order = sorted(reference, key=lambda p: 0 if p.parent is None else 1 if p.parent.parent is None else 2)
+    for planet in reference_order:
+        planet.update(12.5)
+    expected = np.array([np.array(planet.model) for planet in reference])
+    graph_bodies = _make_system(500)
+    SceneGraph(graph_bodies).update(12.5)
+    err = np.abs(np.array([np.array(planet.model) for planet in graph_bodies]) - expected).max()
+    assert err < 1e-4, f"SceneGraph difere de Planet.update (erro {err:.2e})"
+    print(f"SceneGraph equivale a Planet.update (erro máximo {err:.1e})")
+
+    print(f"{'corpos':>8} {'Planet.update (us)':>20} {'SceneGraph (us)':>17} {'corpos/s (lote)':>17}")
+    for n in sizes:
+        bodies = _make_system(n)
+        ordered = sorted(bodies, key=lambda p: 0 if p.parent is None else 1 if p.parent.parent is None else 2)
+        if n <= 10_000:
+            loop = _best_time(lambda: [planet.update(1.0) for planet in ordered]) * 1e6
+            loop = f"{loop:20,.1f}"
+        else:
+            loop = f"{'-':>20}"
+        scene = SceneGraph(bodies)
+        clock = iter(range(1, 10**9))
+        batched = _best_time(lambda: scene.update(float(next(clock))), repeat=10)
+        print(f"{n:>8,} {loop} {batched * 1e6:17,.1f} {n / batched:17,.0f}")
+
+
+def bench_kepler(sizes=(1000, 100_000, 1_000_000)):
+    """Atualizações de corpos por segundo do propagador kepleriano (órbitas elípticas)."""
+    rng = np.random.default_rng(0)
+    print(f"{'corpos':>10} {'resíduo máx.':>14} {'solve_kepler (c/s)':>20} {'SceneGraph (c/s)':>18}")
+    for n in sizes:
+        mean_anomaly = rng.uniform(-50.0, 50.0, n)
+        eccentricity = rng.uniform(0.0, 0.97, n)
+        E = solve_kepler(mean_anomaly, eccentricity)
+        residual = np.abs(E - eccentricity * np.sin(E) - np.remainder(mean_anomaly, 2 * np.pi)).max()
+        solve = n / _best_time(solve_kepler, mean_anomaly, eccentricity)
+
+        if n <= 100_000:
+            bodies = _make_system(n)
+            for body in bodies:
+                if body.parent is not None:
+                    body.eccentricity = float(rng.uniform(0.0, 0.9))
+                    body.inclination = float(rng.uniform(0.0, 30.0))
+            scene = SceneGraph(bodies)
+            clock = iter(range(1, 10**9))
+            graph = f"{n / _best_time(lambda: scene.update(float(next(clock)))):18,.0f}"
+        else:
+            graph = f"{'-':>18}"
+        print(f"{n:>10,} {residual:14.1e} {solve:20,.0f} {graph}")
+
+
+def _direct_orbits(elements, time):
+    """Posições relativas ao pai e longitude verdadeira pelo propagador (referência das efemérides)."""
+    P, Q = perifocal_basis(elements["inclination"], elements["ascending_node"], elements["periapsis"])
+    mean_anomaly = np.radians(elements["orbit_phase"] + time * elements["orbit_speed"])
+    offsets, true_anomaly = orbit_offsets(elements["orbit_radius"], elements["eccentricity"],
+                                          mean_anomaly, P, Q)
+    mask = elements["orbit_mask"]
+    longitude = (np.radians(elements["ascending_node"] + elements["periapsis"]) + true_anomaly) * mask
+    return offsets * mask[:, None], longitude
+
+
+def _eccentric_system(num_bodies, seed=0, max_eccentricity=0.3):
+    """_make_system com órbitas excêntricas e inclinadas (a mesma semente dá os mesmos corpos)."""
+    rng = np.random.default_rng(seed)
+    bodies = _make_system(num_bodies, seed)
+    for body in bodies:
+        if body.parent is not None:
+            body.eccentricity = float(rng.uniform(0.0, max_eccentricity))
+            body.inclination = float(rng.uniform(0.0, 30.0))
+    return bodies
+
+
+def check_ephemeris(num_bodies=500, span=60.0, samples=50, tolerance=1e-6):
+    """
+    As tabelas de Chebyshev devem reproduzir o propagador kepleriano (posição e
+    longitude), e Planet.update com efemérides deve coincidir com o SceneGraph.
+    """
+    import tempfile
+    rng = np.random.default_rng(0)
+    bodies = _eccentric_system(num_bodies)
+    scene = SceneGraph(bodies)
+    elements = scene_elements(scene)
+    with tempfile.TemporaryDirectory() as directory:
+        ephemeris = Ephemeris(build_ephemeris(elements, 0.0, span, f"{directory}/check.eph", workers=1))
+        position_error = longitude_error = 0.0
+        for time in rng.uniform(0.0, span, samples):
+            offsets, longitude = ephemeris.evaluate(time)
+            expected_offsets, expected_longitude = _direct_orbits(elements, time)
+            position_error = max(position_error, np.abs(offsets - expected_offsets).max())
+            turn = np.angle(np.exp(1j * (longitude - expected_longitude)))
+            longitude_error = max(longitude_error, np.abs(turn).max())
+        assert position_error < tolerance, f"posição difere do propagador (erro {position_error:.2e})"
+        assert longitude_error < tolerance, f"longitude difere do propagador (erro {longitude_error:.2e})"
+
+        # Planet.update (um corpo por vez) com as mesmas tabelas
+        scene.set_ephemeris(ephemeris)
+        scene.update(span / 3.0)
+        expected = np.array([np.array(planet.model) for planet in bodies])
+        standalone = _eccentric_system(num_bodies)
+        for planet, row in zip(standalone, scene.rows):
+            planet.use_ephemeris(ephemeris, int(row))
+        for planet in sorted(standalone, key=lambda p: 0 if p.parent is None else 1 if p.parent.parent is None else 2):
+            planet.update(span / 3.0)
+        models = np.array([np.array(planet.model) for planet in standalone])
+        matrix_error = np.abs(models - expected).max()
+        assert matrix_error < 1e-4, f"Planet.update com efemérides difere do SceneGraph (erro {matrix_error:.2e})"
+
+        # Mudar um elemento orbital invalida as tabelas no próximo update
+        moon = next(planet for planet in bodies if planet.parent is not None)
+        moon.eccentricity = moon.eccentricity / 2.0
+        assert scene.ephemeris is ephemeris
+        scene.update(span / 2.0)
+        assert scene.ephemeris is None, "efemérides continuam em uso depois de mudar os elementos"
+    print(f"efemérides equivalem ao propagador (posição {position_error:.1e}, "
+          f"longitude {longitude_error:.1e} rad, matrizes {matrix_error:.1e})")
+
+
+def bench_ephemeris(sizes=(3, 1000, 10_000), eccentricities=(0.3, 0.7), span=30.0, evaluations=50,
+                    workers=(1, 4)):
+    """
+    Avaliações de corpos por segundo: tabelas de Chebyshev (Clenshaw em lote) vs.
+    propagador kepleriano direto (que fica mais caro com a excentricidade, pelas
+    iterações de Newton), o erro das tabelas e o tempo de ajuste com e sem o pool.
+    """
+    import tempfile
+    check_ephemeris()
+    rng = np.random.default_rng(0)
+    print(f"{'corpos':>8} {'e máx.':>6} {'trechos':>9} {'MB':>7} {'ajuste (s)':>12} {'erro máx.':>10} "
+          f"{'kepler (c/s)':>14} {'efemérides (c/s)':>17}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            for max_eccentricity in eccentricities:
+                elements = scene_elements(SceneGraph(_eccentric_system(n, max_eccentricity=max_eccentricity)))
+                build = []
+                for count in workers:
+                    start = time.perf_counter()
+                    path = build_ephemeris(elements, 0.0, span, f"{directory}/{n}.eph", workers=count)
+                    build.append(time.perf_counter() - start)
+                ephemeris = Ephemeris(path)
+                times = rng.uniform(0.0, span, evaluations)
+                error = max(np.abs(ephemeris.evaluate(t)[0] - _direct_orbits(elements, t)[0]).max()
+                            for t in times[:5])
+                direct = _best_time(lambda: [_direct_orbits(elements, t) for t in times]) / evaluations
+                tables = _best_time(lambda: [ephemeris.evaluate(t) for t in times]) / evaluations
+                fit = " / ".join(f"{seconds:.2f}" for seconds in build)
+                print(f"{n:>8,} {max_eccentricity:6.1f} {int(ephemeris.segments.sum()):>9,} "
+                      f"{ephemeris.nbytes / 2**20:7.1f} {fit:>12} {error:10.1e} "
+                      f"{n / direct:14,.0f} {n / tables:17,.0f}")
+                del ephemeris
+    print(f"(ajuste com {' / '.join(map(str, workers))} processos)")
+
+
+def _culling_views(count, seed=0):
+    """Matrizes projection * view de câmeras aleatórias dentro do sistema, olhando em qualquer direção."""
+    rng = np.random.default_rng(seed)
+    projection = glm.perspective(glm.radians(45.0), 800 / 600, 0.1, 500.0)
+    views = []
+    for _ in range(count):
+        eye = glm.vec3(*rng.uniform(-40.0, 40.0, 3))
+        target = eye + glm.vec3(*rng.normal(size=3))
+        views.append(projection * glm.lookAt(eye, target, glm.vec3(0.0, 1.0, 0.0)))
+    return views
+
+
+def check_culling_equivalence(num_bodies=5000, views=50):
+    """
+    O culling hierárquico deve aceitar exatamente os corpos que o teste
+    individual de cada esfera aceita (as subárvores só pulam testes).
+    """
+    scene = SceneGraph(_make_system(num_bodies))
+    scene.update(3.0)
+    culler = FrustumCuller(scene)
+    spheres = np.column_stack((scene.positions, scene.radius))
+    for view_projection in _culling_views(views):
+        planes = frustum_planes(view_projection)
+        expected = classify_spheres(planes, spheres) != OUTSIDE
+        assert np.array_equal(culler.cull(planes), expected), "culling hierárquico difere do individual"
+    print(f"culling hierárquico equivale ao teste individual ({views} câmeras, {num_bodies} corpos)")
+
+
+def bench_culling(sizes=(1000, 10_000, 100_000), views=20):
+    """Esferas testadas e tempo do culling: um teste por corpo vs. hierárquico."""
+    check_culling_equivalence()
+    print(f"{'corpos':>8} {'visíveis':>9} {'testes (hier.)':>15} {'individual (us)':>16} {'hierárquico (us)':>17}")
+    for n in sizes:
+        scene = SceneGraph(_make_system(n))
+        scene.update(3.0)
+        culler = FrustumCuller(scene)
+        spheres = np.column_stack((scene.positions, scene.radius))
+        all_planes = [frustum_planes(vp) for vp in _culling_views(views)]
+        visible = tests = 0
+        for planes in all_planes:
+            visible += culler.cull(planes).sum()
+            tests += culler.tests
+        flat = _best_time(lambda: [classify_spheres(planes, spheres) for planes in all_planes]) / views
+        hierarchical = _best_time(lambda: [culler.cull(planes) for planes in all_planes]) / views
+        print(f"{n:>8,} {visible / views:9,.0f} {tests / views:15,.0f} {flat * 1e6:16,.1f} {hierarchical * 1e6:17,.1f}")
+
+
+def _starfield_loop(width, height, star_density, seed=0):
+    """Implementação original (laço em Python por estrela), só para comparação."""
+    rng = np.random.default_rng(seed)
+    starfield = np.zeros((height, width, 4), dtype=np.uint8)
+    num_stars = int(width * height * star_density)
+    star_x = rng.integers(0, width, num_stars)
+    star_y = rng.integers(0, height, num_stars)
+    star_brightness = rng.integers(150, 255, num_stars)
+    for i in range(num_stars):
+        brightness = star_brightness[i]
+        starfield[star_y[i], star_x[i]] = [brightness, brightness, brightness, 255]
+    return starfield
+
+
+def bench_starfield(sizes=(1024, 4096, 8192, 16384)):
+    """Tempo de geração do campo de estrelas (densidade 0.01) em vários tamanhos."""
+    a = generate_starfield(512, 512, 0.01, seed=7)
+    b = generate_starfield(512, 512, 0.01, rng=np.random.default_rng(7))
+    assert np.array_equal(a, b), "mesma semente deve gerar o mesmo céu"
+    print(f"{'tamanho':>8} {'estrelas':>12} {'laço (s)':>10} {'vetorizado (s)':>15} {'MB':>8}")
+    for n in sizes:
+        stars = int(n * n * 0.01)
+        loop = f"{_best_time(_starfield_loop, n, n, 0.01, repeat=1):10.3f}" if n <= 1024 else f"{'-':>10}"
+        vectorized = _best_time(generate_starfield, n, n, 0.01, repeat=1)
+        print(f"{n:>8} {stars:>12,} {loop} {vectorized:15.3f} {n * n / 2**20:8.0f}")
+
+
+def _gl_context():
+    """Cria um contexto OpenGL 3.3 core numa janela oculta. Retorna False se não houver display."""
+    import pygame
+    try:
+        pygame.init()
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MAJOR_VERSION, 3)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MINOR_VERSION, 3)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_CORE)
+        pygame.display.set_mode((64, 64), pygame.OPENGL | pygame.DOUBLEBUF | pygame.HIDDEN)
+    except pygame.error as e:
+        print(f"sem contexto OpenGL ({e}), pulando")
+        return False
+    return True
+
+
+def _legacy_frame_uniforms(programs, view, projection, camera_position):
+    """Envio por frame antigo: glUniform* por valor em cada programa (só para comparação)."""
+    from OpenGL.GL import glUseProgram, glUniformMatrix4fv, glUniform3fv, glUniform1i, GL_FALSE
+    for program, locations in programs[:2]:
+        glUseProgram(program)
+        glUniformMatrix4fv(locations["view"], 1, GL_FALSE, glm.value_ptr(view))
+        glUniform3fv(locations["viewPos"], 1, glm.value_ptr(camera_position))
+    sky_program, sky = programs[2]
+    glUseProgram(sky_program)
+    model = glm.translate(glm.mat4(1.0), camera_position)
+    view_no_translate = glm.mat4(glm.mat3(view))
+    glUniformMatrix4fv(sky["model"], 1, GL_FALSE, glm.value_ptr(model))
+    glUniformMatrix4fv(sky["view"], 1, GL_FALSE, glm.value_ptr(view_no_translate))
+    glUniformMatrix4fv(sky["projection"], 1, GL_FALSE, glm.value_ptr(projection))
+    glUniform1i(sky["textureSampler"], 0)
+
+
+def bench_uniforms(frames=2000):
+    """Chamadas OpenGL e tempo por frame do estado de câmera: glUniform* por programa vs UBO."""
+    if not _gl_context():
+        return
+    from OpenGL.GL import glGetUniformLocation, glFinish
+    from OpenGL.GL.shaders import compileProgram, compileShader
+    from OpenGL.GL import GL_VERTEX_SHADER, GL_FRAGMENT_SHADER
+    import uniform_buffers
+    from uniform_buffers import FrameUniforms
+
+    # Programas mínimos com as mesmas uniforms que os shaders tinham antes dos UBOs
+    legacy_vert = """#version 330 core
+        uniform mat4 model; uniform mat4 view; uniform mat4 projection; uniform vec3 viewPos;
+        void main() { gl_Position = projection * view * model * vec4(viewPos, 1.0); }"""
+    legacy_frag = """#version 330 core
+        uniform sampler2D textureSampler; out vec4 c;
+        void main() { c = texture(textureSampler, vec2(0.0)); }"""
+    programs = []
+    for _ in range(3):
+        program = compileProgram(compileShader(legacy_vert, GL_VERTEX_SHADER),
+                                 compileShader(legacy_frag, GL_FRAGMENT_SHADER))
+        names = ("model", "view", "projection", "viewPos", "textureSampler")
+        programs.append((program, {name: glGetUniformLocation(program, name) for name in names}))
+
+    frame_ubo = FrameUniforms()
+    projection = glm.perspective(glm.radians(45.0), 800 / 600, 0.1, 500.0)
+    position = glm.vec3(0.0, 0.0, 8.0)
+    view = glm.lookAt(position, glm.vec3(0.0), glm.vec3(0.0, 1.0, 0.0))
+
+    def legacy():
+        _legacy_frame_uniforms(programs, view, projection, position)
+
+    def ubo():
+        frame_ubo.update(view, projection, position, 1.0)
+
+    module = sys.modules[__name__]
+    print(f"{'caminho':>10} {'chamadas GL/frame':>18} {'us/frame':>10}")
+    for name, func in (("glUniform", legacy), ("UBO", ubo)):
+        with GLCallCounter(module, uniform_buffers, sys.modules["OpenGL.GL"]) as counter:
+            func()
+        start = time.perf_counter()
+        for _ in range(frames):
+            func()
+        glFinish()
+        elapsed = (time.perf_counter() - start) / frames
+        print(f"{name:>10} {counter.total:>18} {elapsed * 1e6:10.1f}")
+
+
+def bench_arena(bodies=(100, 1000, 10_000), materials=8, frames=50):
+    """
+    Chamadas de desenho e tempo de CPU por frame do InstancedRenderer sobre a
+    MeshArena: um glMultiDrawElementsIndirect por material vs. um
+    glDrawElementsInstancedBaseVertex por (nível, material).
+    """
+    if not _gl_context():
+        return
+    from OpenGL.GL import glFinish
+    from instancing import InstancedRenderer, Material
+    from lod import LODSelector
+    from mesh_arena import supports_multi_draw_indirect
+    from utils import load_shader
+
+    shader = load_shader("shaders/basic_instanced.vert", "shaders/basic.frag")
+    paths = [("indireto", True)] if supports_multi_draw_indirect() else []
+    paths.append(("base vertex", False))
+    rng = np.random.default_rng(0)
+    palette = [Material(0, None, False) for _ in range(materials)]
+
+    print(f"{'corpos':>8} {'caminho':>12} {'draw calls':>11} {'us/frame':>10}")
+    for name, indirect in paths:
+        # Cadeia de esferas pequenas: no llvmpipe o vertex shader dominaria o tempo
+        lod = LODSelector(resolutions=(4, 6, 8, 12, 16, 24), vertex_format="packed",
+                          indirect=indirect)
+        lod.build()
+        renderer = InstancedRenderer(shader)
+        for n in bodies:
+            # Matrizes nulas: triângulos degenerados, mede o envio e não a rasterização
+            matrices = np.zeros((n, 4, 4), dtype=np.float32)
+            level_indices = rng.integers(0, len(lod.levels), n)
+            material_indices = rng.integers(0, materials, n)
+            stats = FrameStats()
+            renderer.draw(matrices, lod.arena, lod.levels, level_indices, palette,
+                          material_indices, stats)
+            calls = stats.counters["draw_calls"]
+            glFinish()
+            start = time.perf_counter()
+            for _ in range(frames):
+                renderer.draw(matrices, lod.arena, lod.levels, level_indices, palette,
+                              material_indices)
+            glFinish()
+            elapsed = (time.perf_counter() - start) / frames
+            print(f"{n:>8} {name:>12} {calls:>11} {elapsed * 1e6:10.1f}")
+        lod.arena.delete()
+
+
+def _point_clusters(view, focal, near, far, points, grid=CLUSTER_GRID):
+    """Cluster de cada ponto (como no fragment shader), ou -1 fora do frustum."""
+    X, Y, Z = grid
+    scale, bias = slice_params(near, far, Z)
+    eye = points @ view[:3, :3].T + view[:3, 3]
+    depth = -eye[:, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ndc_x = eye[:, 0] * focal[0] / depth
+        ndc_y = eye[:, 1] * focal[1] / depth
+        k = np.floor(np.log(depth) * scale + bias)
+    inside = (depth > near) & (depth < far) & (np.abs(ndc_x) < 1.0) & (np.abs(ndc_y) < 1.0)
+    i = np.clip(np.floor((ndc_x + 1.0) * 0.5 * X), 0, X - 1)
+    j = np.clip(np.floor((ndc_y + 1.0) * 0.5 * Y), 0, Y - 1)
+    k = np.clip(np.nan_to_num(k), 0, Z - 1)
+    return np.where(inside, i + X * (j + Y * k), -1).astype(np.int64)
+
+
+def _light_views(count, seed=0):
+    """Câmeras (view, projection) perto do Sol, olhando para o disco das luzes."""
+    rng = np.random.default_rng(seed)
+    projection = glm.perspective(glm.radians(45.0), 800 / 600, 0.1, 500.0)
+    views = []
+    for _ in range(count):
+        eye = glm.vec3(*rng.uniform(-10.0, 10.0, 3))
+        target = glm.vec3(*rng.uniform(-4.0, 4.0, 3))
+        views.append((glm.lookAt(eye, target, glm.vec3(0.0, 1.0, 0.0)), projection))
+    return views
+
+
+def check_light_assignment(num_lights=64, views=10, samples=2000):
+    """
+    Todo ponto dentro da esfera de uma luz cai num cluster que lista essa luz
+    (a caixa projetada é conservadora), e as listas vêm em ordem crescente.
+    """
+    rng = np.random.default_rng(0)
+    lights = PointLights.random(num_lights, seed=1)
+    for view, projection in _light_views(views):
+        view = np.array(view, dtype=np.float64)
+        focal = (projection[0][0], projection[1][1])
+        clusters, indices = assign_lights(view, focal, 0.1, 500.0, lights.positions, lights.radii)
+        for light, (center, radius) in enumerate(zip(lights.positions, lights.radii)):
+            # Pontos uniformes dentro da esfera
+            direction = rng.normal(size=(samples, 3))
+            direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+            points = center + direction * radius * rng.uniform(0.0, 1.0, (samples, 1)) ** (1.0 / 3.0)
+            for cluster in np.unique(_point_clusters(view, focal, 0.1, 500.0, points)):
+                if cluster < 0:
+                    continue
+                offset, count = clusters[cluster]
+                assert light in indices[offset:offset + count], f"luz {light} falta no cluster {cluster}"
+        for offset, count in clusters:
+            assert np.all(np.diff(indices[offset:offset + count].astype(np.int64)) > 0)
+    print(f"listas por cluster conservadoras ({views} câmeras, {num_lights} luzes, "
+          f"{samples} pontos por luz)")
+
+
+def bench_lights(counts=(1, 16, 256), size=(256, 192), frames=20):
+    """
+    Custo por frame do fragment shader com N luzes pontuais: clustered vs.
+    laço por todas as luzes, numa esfera que cobre a tela, e o tempo de CPU
+    da distribuição das luzes pelos clusters.
+    """
+    check_light_assignment()
+    if not _gl_context():
+        return
+    from OpenGL.GL import (
+        GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, GL_DEPTH_TEST, GL_TEXTURE_2D, GL_TRIANGLES,
+        GL_FALSE, glBindTexture, glBindVertexArray, glClear, glDrawElements, glEnable, glFinish,
+        glGetUniformLocation, glUniform1i, glUniformMatrix4fv, glUseProgram
+    )
+    from clustered_lighting import ClusteredLighting
+    from headless import OffscreenTarget
+    from uniform_buffers import FrameUniforms, LightUniforms, attach_uniform_blocks
+    from utils import create_mesh_buffers, create_placeholder_texture, index_type, load_shader
+
+    target = OffscreenTarget(*size)
+    target.bind()
+    glEnable(GL_DEPTH_TEST)
+    shader = load_shader("shaders/basic.vert", "shaders/basic.frag")
+    frame_ubo, light_ubo = FrameUniforms(), LightUniforms()
+    attach_uniform_blocks(shader, frame_ubo, light_ubo)
+    glUseProgram(shader)
+    glUniform1i(glGetUniformLocation(shader, "textureSampler"), 0)
+    glUniform1i(glGetUniformLocation(shader, "isSun"), 0)
+    glUniform1i(glGetUniformLocation(shader, "useNormalMap"), 0)
+    glUniformMatrix4fv(glGetUniformLocation(shader, "model"), 1, GL_FALSE, np.eye(4, dtype=np.float32))
+    glBindTexture(GL_TEXTURE_2D, create_placeholder_texture())
+
+    vertices, indices = generate_sphere_vectorized(1.0, 64, 64)
+    vao, _, _ = create_mesh_buffers(vertices, indices)
+    glBindVertexArray(vao)
+    eye = glm.vec3(0.0, 0.0, 2.2)
+    view = glm.lookAt(eye, glm.vec3(0.0), glm.vec3(0.0, 1.0, 0.0))
+    projection = glm.perspective(glm.radians(45.0), size[0] / size[1], 0.1, 500.0)
+    frame_ubo.update(view, projection, eye, 0.0)
+    light_ubo.update(glm.vec3(0.0, 0.0, 10.0), glm.vec3(1.0), 0.25)
+
+    def render():
+        for _ in range(frames):
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            glDrawElements(GL_TRIANGLES, len(indices), index_type(indices), None)
+        glFinish()
+
+    print(f"{'luzes':>6} {'refs':>7} {'binning (us)':>13} {'clustered (ms)':>15} {'ingênuo (ms)':>13}")
+    rng = np.random.default_rng(0)
+    for n in counts:
+        # Luzes espalhadas numa casca logo acima da superfície visível da esfera
+        direction = rng.normal(size=(n, 3))
+        direction[:, 2] = np.abs(direction[:, 2])
+        direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+        lights = PointLights(direction * rng.uniform(1.05, 1.3, (n, 1)), rng.uniform(0.2, 0.5, n),
+                             rng.uniform(0.2, 1.0, (n, 3)))
+        times = []
+        for naive in (False, True):
+            lighting = ClusteredLighting(size, 0.1, 500.0, naive=naive)
+            lighting.attach(shader)
+            lighting.update(view, projection, lights)
+            render()
+            times.append(_best_time(render) / frames)
+            lighting.delete()
+        binning = _best_time(assign_lights, np.array(view, dtype=np.float64),
+                             (projection[0][0], projection[1][1]), 0.1, 500.0,
+                             lights.positions, lights.radii)
+        print(f"{n:>6} {lighting.references:>7,} {binning * 1e6:13,.0f} "
+              f"{times[0] * 1e3:15.2f} {times[1] * 1e3:13.2f}")
+    target.delete()
+
+
+BENCHMARKS = {
+    "sphere": bench_sphere,
+    "vertex_format": bench_vertex_format,
+    "vertex_cache": bench_vertex_cache,
+    "arena": bench_arena,
+    "transforms": bench_transforms,
+    "kepler": bench_kepler,
+    "ephemeris": bench_ephemeris,
+    "starfield": bench_starfield,
+    "uniforms": bench_uniforms,
+    "culling": bench_culling,
+    "lights": bench_lights,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
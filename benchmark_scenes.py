@@ -0,0 +1,142 @@
+# benchmark_scenes.py
+"""
+Benchmark da aplicação inteira em cenários reproduzíveis (ver scenarios.py).
+
+Cada cenário roda em um processo próprio (python3 main.py --benchmark
+--scenario ...), com relógio fixo, sem limite de FPS e com a câmera num
+caminho roteirizado, e grava um relatório JSON. O resultado pode ser salvo
+como linha de base e comparado com ela: se um percentil do tempo de frame, o
+tempo até o primeiro frame ou o pico de memória piorar mais que o limite, o
+script termina com código 1.
+
+Uso:
+    python3 benchmark_scenes.py [three_body] [belt_10k] [earth_flyby] [--headless]
+        [--frames 600] [--out resultados.json]
+        [--baseline linha_de_base.json] [--save-baseline] [--threshold 0.10]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from scenarios import SCENARIOS
+
+# Métricas comparadas com a linha de base (caminho no relatório, nome exibido)
+METRICS = (
+    (("frame_ms", "p50"), "frame p50 (ms)"),
+    (("frame_ms", "p95"), "frame p95 (ms)"),
+    (("frame_ms", "p99"), "frame p99 (ms)"),
+    (("startup_s", "first_frame"), "primeiro frame (s)"),
+    (("peak_memory_mb",), "pico de memória (MB)"),
+)
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark dos cenários da cena")
+    parser.add_argument("scenarios", nargs="*",
+                        help=f"Cenários a executar (padrão: todos): {', '.join(SCENARIOS)}")
+    parser.add_argument("--frames", type=int, default=600, help="Frames por cenário")
+    parser.add_argument("--headless", action="store_true",
+                        help="Renderizar sem janela (EGL), sem gravar os frames")
+    parser.add_argument("--out", default=None, help="Gravar os relatórios de todos os cenários")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Arquivo da linha de base")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Salvar os resultados como a nova linha de base")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Piora relativa tolerada antes de acusar regressão (0.10 = 10%%)")
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"cenário desconhecido: {name}")
+    return args
+
+
+def run_scenario(name, frames, headless):
+    """Executa um cenário num processo novo e retorna o relatório (dict)."""
+    with tempfile.TemporaryDirectory() as directory:
+        report_path = os.path.join(directory, "report.json")
+        command = [sys.executable, "main.py", "--benchmark", "--scenario", name,
+                   "--frames", str(frames), "--report", report_path]
+        if headless:
+            command += ["--headless", "--no-save"]
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        with open(report_path) as f:
+            return json.load(f)
+
+
+def _metric(report, path):
+    value = report
+    for key in path:
+        if value is None:
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare(results, baseline, threshold):
+    """
+    Compara cada métrica com a linha de base (maior é pior em todas).
+    Retorna a lista de regressões: (cenário, métrica, base, atual).
+    """
+    regressions = []
+    print(f"{'cenário':<14}{'métrica':<24}{'base':>12}{'atual':>12}{'variação':>10}")
+    for name, report in results.items():
+        if name not in baseline:
+            print(f"{name:<14}sem linha de base")
+            continue
+        for path, label in METRICS:
+            base, current = _metric(baseline[name], path), _metric(report, path)
+            if base is None or current is None or base == 0:
+                continue
+            change = current / base - 1.0
+            flag = " <-- regressão" if change > threshold else ""
+            print(f"{name:<14}{label:<24}{base:>12.3f}{current:>12.3f}{change:>+10.1%}{flag}")
+            if flag:
+                regressions.append((name, label, base, current))
+    return regressions
+
+
+def main():
+    args = parse_args()
+    results = {}
+    for name in args.scenarios or list(SCENARIOS):
+        print(f"== {name}: {SCENARIOS[name].description} ==")
+        report = run_scenario(name, args.frames, args.headless)
+        frame = report["frame_ms"]
+        print(f"frame p50/p95/p99: {frame['p50']:.2f} / {frame['p95']:.2f} / {frame['p99']:.2f} ms | "
+              f"primeiro frame: {report['startup_s']['first_frame']:.3f} s | "
+              f"memória: {report['peak_memory_mb']:.1f} MB")
+        results[name] = report
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Linha de base salva em {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Sem linha de base em {args.baseline} (use --save-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regressões acima de {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
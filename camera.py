@@ -27,6 +27,9 @@ class Camera:
         self.aspect_ratio = aspect_ratio
         self.speed = speed
         self.mouse_sensitivity = mouse_sensitivity
+        # Planos de recorte da projeção (também usados pelas fatias do clustered lighting)
+        self.near = 0.1
+        self.far = 500.0
         
         # Ângulos de Euler (em graus) - mais intuitivo para mapeamento do mouse
         self.yaw = -90.0    # Começa mirando para +Z (graus)
@@ -135,6 +138,25 @@ class Camera:
         if distance > self.max_distance:
             self.position = glm.normalize(self.position) * self.max_distance
     
+    def set_pose(self, position, yaw, pitch):
+        """Define posição e ângulos (em graus) de uma vez (ex.: pose interpolada da simulação)."""
+        self.position = glm.vec3(position)
+        self.yaw = float(yaw)
+        self.pitch = float(pitch)
+        self._update_camera_vectors()
+
+    def look_at(self, position, target):
+        """
+        Posiciona a câmera em 'position' olhando para 'target' (caminhos de câmera
+        roteirizados). Yaw e pitch são recalculados, então o mouse continua de onde parou.
+        """
+        self.position = glm.vec3(position)
+        direction = glm.normalize(glm.vec3(target) - self.position)
+        self.pitch = math.degrees(math.asin(max(-1.0, min(1.0, direction.y))))
+        self.pitch = max(-89.0, min(89.0, self.pitch))
+        self.yaw = math.degrees(math.atan2(direction.z, direction.x))
+        self._update_camera_vectors()
+
     def get_view(self):
         """
         Retorna a matriz View calculada com glm.lookAt.
@@ -151,4 +173,4 @@ class Camera:
         Returns:
             glm.mat4: Matriz projection para passar ao shader
         """
-        return glm.perspective(glm.radians(self.fov), self.aspect_ratio, 0.1, 500.0)
+        return glm.perspective(glm.radians(self.fov), self.aspect_ratio, self.near, self.far)
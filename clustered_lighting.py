@@ -0,0 +1,322 @@
+# clustered_lighting.py
+"""
+Clustered forward shading para muitas luzes pontuais.
+
+O frustum da câmera é dividido numa grade 3D de clusters: tiles na tela
+(CLUSTER_GRID[0] x CLUSTER_GRID[1]) e fatias de profundidade em escala
+logarítmica entre near e far (CLUSTER_GRID[2]):
+
+    fatia(d) = floor(log(d) * escala + bias),  escala = Z / log(far / near)
+
+A cada frame, na CPU e em lote com NumPy, cada luz (esfera de alcance) é
+convertida num intervalo de clusters (fatias pela profundidade, tiles pela
+caixa da esfera projetada), os pares (luz, cluster) são refinados com o teste
+esfera x AABB do cluster e ordenados por cluster. O resultado vai para três
+texture buffers (GL 3.3):
+
+    clusters  GL_RG32UI    (offset, quantidade) na lista de índices, por cluster
+    índices   GL_R32UI     luzes de cada cluster, em sequência
+    luzes     GL_RGBA32F   2 texels por luz: (posição, alcance), (cor, 0)
+
+O fragment shader acha o seu cluster por gl_FragCoord e pela profundidade no
+espaço da câmera e percorre só as luzes dele. O Sol continua sendo a luz
+principal do bloco LightData, sem alcance, aplicada a todo fragmento.
+"""
+import math
+
+import numpy as np
+from OpenGL.GL import (
+    GL_TEXTURE_BUFFER, GL_STREAM_DRAW, GL_RG32UI, GL_R32UI, GL_RGBA32F, GL_TEXTURE0,
+    GL_MAX_TEXTURE_BUFFER_SIZE, GL_CURRENT_PROGRAM,
+    glGenBuffers, glGenTextures, glBindBuffer, glBufferData, glBindTexture, glTexBuffer,
+    glActiveTexture, glGetIntegerv, glUseProgram, glUniform1i, glGetUniformLocation,
+    glDeleteBuffers, glDeleteTextures
+)
+
+from uniform_buffers import ClusterUniforms
+
+CLUSTER_GRID = (16, 12, 24)  # tiles em x, tiles em y, fatias de profundidade
+CLUSTER_UNIT = 2        # unidades de textura dos texture buffers (0 e 1 são dos materiais)
+LIGHT_INDEX_UNIT = 3
+LIGHT_UNIT = 4
+SAMPLER_UNITS = (("clusterSampler", CLUSTER_UNIT), ("lightIndexSampler", LIGHT_INDEX_UNIT),
+                 ("lightSampler", LIGHT_UNIT))
+
+
+def bind_sampler_units(program):
+    """
+    Fixa as unidades dos samplers de texture buffer do programa (se ele os usa).
+
+    Sem isso eles ficam na unidade 0, junto do sampler2D da textura, e os draws
+    falham com GL_INVALID_OPERATION. load_shader chama esta função para todo
+    programa, tenha ele um ClusteredLighting ligado ou não.
+    """
+    previous = int(glGetIntegerv(GL_CURRENT_PROGRAM))
+    glUseProgram(program)
+    for name, unit in SAMPLER_UNITS:
+        location = glGetUniformLocation(program, name)
+        if location >= 0:
+            glUniform1i(location, unit)
+    glUseProgram(previous)
+
+
+def slice_params(near, far, slices):
+    """(escala, bias) de fatia(d) = floor(log(d) * escala + bias)."""
+    scale = slices / math.log(far / near)
+    return scale, -math.log(near) * scale
+
+
+def assign_lights(view, focal, near, far, positions, radii, grid=CLUSTER_GRID):
+    """
+    Distribui as luzes pelos clusters do frustum.
+
+    Args:
+        view: Matriz view (4, 4) na forma matemática (linha, coluna)
+        focal: (projection[0][0], projection[1][1])
+        near, far: Planos da projeção
+        positions: Posições das luzes no mundo, (N, 3)
+        radii: Alcance de cada luz, (N,)
+        grid: (tiles em x, tiles em y, fatias)
+    Returns:
+        (clusters (X*Y*Z, 2) uint32 com [offset, quantidade], índices das luzes uint32)
+        O cluster (i, j, k) fica na posição i + X * (j + Y * k).
+    """
+    X, Y, Z = grid
+    num_clusters = X * Y * Z
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=np.float64)
+    view = np.asarray(view, dtype=np.float64)
+
+    # 1. Centros no espaço da câmera (profundidade positiva à frente)
+    centers = positions @ view[:3, :3].T + view[:3, 3]
+    depth = -centers[:, 2]
+
+    # 2. Fatias cobertas pelo intervalo de profundidade da esfera
+    scale, bias = slice_params(near, far, Z)
+    d_min = np.maximum(depth - radii, near)
+    d_max = np.minimum(depth + radii, far)
+    keep = d_min <= d_max
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k0 = np.floor(np.log(d_min) * scale + bias)
+        k1 = np.floor(np.log(np.maximum(d_max, near)) * scale + bias)
+    k0 = np.clip(np.nan_to_num(k0), 0, Z - 1).astype(np.int64)
+    k1 = np.clip(np.nan_to_num(k1), 0, Z - 1).astype(np.int64)
+
+    # 3. Tiles cobertos pela caixa [c - r, c + r] projetada (x / d é extremo nos cantos);
+    # esferas que cruzam o plano near podem cobrir a tela inteira
+    crossing = depth - radii <= near
+    near_d = np.maximum(depth - radii, near)
+    far_d = np.maximum(depth + radii, near)
+    tiles = []
+    for axis, tiles_on_axis in ((0, X), (1, Y)):
+        low, high = centers[:, axis] - radii, centers[:, axis] + radii
+        corners = np.stack([low / near_d, low / far_d, high / near_d, high / far_d]) * focal[axis]
+        ndc_min = np.where(crossing, -1.0, corners.min(axis=0))
+        ndc_max = np.where(crossing, 1.0, corners.max(axis=0))
+        keep &= (ndc_max >= -1.0) & (ndc_min <= 1.0)
+        t0 = np.clip(np.floor((ndc_min + 1.0) * 0.5 * tiles_on_axis), 0, tiles_on_axis - 1)
+        t1 = np.clip(np.floor((ndc_max + 1.0) * 0.5 * tiles_on_axis), 0, tiles_on_axis - 1)
+        tiles.append((t0.astype(np.int64), t1.astype(np.int64)))
+    (i0, i1), (j0, j1) = tiles
+
+    # 4. Um par (luz, cluster) por cluster de cada caixa
+    lights = np.flatnonzero(keep)
+    i0, j0, k0 = i0[lights], j0[lights], k0[lights]
+    wi, wj, wk = i1[lights] - i0 + 1, j1[lights] - j0 + 1, k1[lights] - k0 + 1
+    volume = wi * wj * wk
+    total = int(volume.sum())
+    pair_light = np.repeat(lights, volume)
+    local = np.arange(total) - np.repeat(np.cumsum(volume) - volume, volume)
+    wi_p, wj_p = np.repeat(wi, volume), np.repeat(wj, volume)
+    ci = np.repeat(i0, volume) + local % wi_p
+    cj = np.repeat(j0, volume) + (local // wi_p) % wj_p
+    ck = np.repeat(k0, volume) + local // (wi_p * wj_p)
+
+    # 5. Refinar: esfera x AABB do cluster no espaço da câmera
+    z0 = near * np.exp(ck / scale)
+    z1 = near * np.exp((ck + 1) / scale)
+    center, radius = centers[pair_light], radii[pair_light]
+    distance2 = (np.maximum(depth[pair_light] - z1, 0.0) + np.maximum(z0 - depth[pair_light], 0.0)) ** 2
+    for axis, tile, tiles_on_axis in ((0, ci, X), (1, cj, Y)):
+        n0 = 2.0 * tile / tiles_on_axis - 1.0
+        n1 = 2.0 * (tile + 1) / tiles_on_axis - 1.0
+        low = np.minimum(n0 * z0, n0 * z1) / focal[axis]
+        high = np.maximum(n1 * z0, n1 * z1) / focal[axis]
+        c = center[:, axis]
+        distance2 += (np.maximum(low - c, 0.0) + np.maximum(c - high, 0.0)) ** 2
+    inside = distance2 <= radius * radius
+
+    # 6. Ordenar por cluster (estável: as luzes de cada cluster ficam em ordem crescente)
+    cluster = (ci + X * (cj + Y * ck))[inside]
+    order = np.argsort(cluster, kind="stable")
+    indices = pair_light[inside][order].astype(np.uint32)
+    counts = np.bincount(cluster, minlength=num_clusters)
+    clusters = np.empty((num_clusters, 2), dtype=np.uint32)
+    clusters[:, 1] = counts
+    clusters[:, 0] = np.cumsum(counts) - counts
+    return clusters, indices
+
+
+class PointLights:
+    """
+    Luzes pontuais com alcance finito (arrays NumPy). Cada luz pode girar em
+    torno do eixo Y do Sol com velocidade própria (ex.: estrelas de um sistema
+    binário, eventos emissivos em órbita).
+    """
+
+    def __init__(self, positions, radii, colors, angular_speeds=None):
+        """
+        Args:
+            positions: Posições iniciais (N, 3)
+            radii: Alcance de cada luz (N,): a intensidade vai a zero nessa distância
+            colors: Cor * intensidade (N, 3)
+            angular_speeds: Graus por segundo em torno do eixo Y (N,), opcional
+        """
+        self.base_positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        self.positions = self.base_positions.copy()
+        self.radii = np.asarray(radii, dtype=np.float64)
+        self.colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+        self.angular_speeds = (np.zeros(len(self.radii)) if angular_speeds is None
+                               else np.radians(np.asarray(angular_speeds, dtype=np.float64)))
+
+    def __len__(self):
+        return len(self.radii)
+
+    def update(self, time):
+        """Gira as luzes em torno do eixo Y até o instante 'time'."""
+        angle = self.angular_speeds * time
+        cos, sin = np.cos(angle), np.sin(angle)
+        x, z = self.base_positions[:, 0], self.base_positions[:, 2]
+        self.positions[:, 0] = cos * x + sin * z
+        self.positions[:, 2] = -sin * x + cos * z
+
+    @classmethod
+    def random(cls, count, seed=0, inner=2.0, outer=8.0, radius=(0.5, 2.0)):
+        """Luzes coloridas num anel do plano XZ, entre 'inner' e 'outer' do Sol."""
+        rng = np.random.default_rng(seed)
+        distance = rng.uniform(inner, outer, count)
+        angle = rng.uniform(0.0, 2.0 * np.pi, count)
+        positions = np.stack([distance * np.cos(angle), rng.uniform(-0.5, 0.5, count),
+                              distance * np.sin(angle)], axis=1)
+        colors = rng.uniform(0.2, 1.0, (count, 3)) * rng.uniform(0.5, 1.5, (count, 1))
+        return cls(positions, rng.uniform(*radius, count), colors,
+                   rng.uniform(-20.0, 20.0, count))
+
+
+class ClusteredLighting:
+    """
+    Grade de clusters, texture buffers e o bloco ClusterData. update() roda
+    uma vez por frame na thread do OpenGL, depois da câmera.
+    """
+
+    def __init__(self, viewport, near, far, grid=CLUSTER_GRID, naive=False):
+        """
+        Args:
+            viewport: (largura, altura) em pixels
+            near, far: Planos da projeção da câmera
+            grid: (tiles em x, tiles em y, fatias)
+            naive: Percorrer todas as luzes em cada fragmento (para comparação)
+        """
+        self.viewport = viewport
+        self.near, self.far = near, far
+        self.grid = grid
+        self.naive = naive
+        self.ubo = ClusterUniforms()
+        self.max_references = int(glGetIntegerv(GL_MAX_TEXTURE_BUFFER_SIZE))
+
+        self.buffers = glGenBuffers(3)
+        self.textures = glGenTextures(3)
+        for buffer, texture, internal_format in zip(self.buffers, self.textures,
+                                                    (GL_RG32UI, GL_R32UI, GL_RGBA32F)):
+            glBindBuffer(GL_TEXTURE_BUFFER, buffer)
+            glBufferData(GL_TEXTURE_BUFFER, 16, None, GL_STREAM_DRAW)
+            glBindTexture(GL_TEXTURE_BUFFER, texture)
+            glTexBuffer(GL_TEXTURE_BUFFER, internal_format, buffer)
+        glBindTexture(GL_TEXTURE_BUFFER, 0)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+
+        # Métricas do último frame
+        self.light_count = 0
+        self.references = 0
+        self.dropped = 0
+        self.occupied = 0
+        self.max_per_cluster = 0
+
+    def attach(self, program):
+        """Liga o bloco ClusterData e as unidades dos texture buffers no programa."""
+        self.ubo.attach(program)
+        bind_sampler_units(program)
+
+    def _upload(self, index, data):
+        glBindBuffer(GL_TEXTURE_BUFFER, self.buffers[index])
+        # Orphaning: o tamanho muda a cada frame e a GPU pode estar lendo o anterior
+        glBufferData(GL_TEXTURE_BUFFER, max(data.nbytes, 16), data if data.nbytes else None,
+                     GL_STREAM_DRAW)
+
+    def update(self, view, projection, lights):
+        """
+        Monta as listas de luzes por cluster e envia os três texture buffers e o bloco.
+
+        Args:
+            view, projection: Matrizes glm da câmera
+            lights: PointLights (já atualizadas para o frame)
+        """
+        view = np.array(view, dtype=np.float64)
+        projection = np.array(projection, dtype=np.float64)
+        focal = (projection[0][0], projection[1][1])
+        clusters, indices = assign_lights(view, focal, self.near, self.far,
+                                          lights.positions, lights.radii, self.grid)
+        if len(indices) > self.max_references:
+            # Texture buffer cheio: os clusters do fim perdem as luzes que passarem do limite
+            self.dropped = len(indices) - self.max_references
+            indices = indices[:self.max_references]
+            end = np.minimum(clusters[:, 0].astype(np.int64) + clusters[:, 1], self.max_references)
+            clusters[:, 1] = np.maximum(end - clusters[:, 0], 0)
+        else:
+            self.dropped = 0
+
+        light_data = np.zeros((len(lights), 2, 4), dtype=np.float32)
+        light_data[:, 0, :3] = lights.positions
+        light_data[:, 0, 3] = lights.radii
+        light_data[:, 1, :3] = lights.colors
+        self._upload(0, clusters)
+        self._upload(1, indices)
+        self._upload(2, light_data)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+
+        X, Y, Z = self.grid
+        scale, bias = slice_params(self.near, self.far, Z)
+        self.ubo.update(self.grid, len(lights),
+                        (self.viewport[0] / X, self.viewport[1] / Y), scale, bias, self.naive)
+        self.bind()
+
+        self.light_count = len(lights)
+        self.references = len(indices)
+        self.occupied = int(np.count_nonzero(clusters[:, 1]))
+        self.max_per_cluster = int(clusters[:, 1].max(initial=0))
+
+    def bind(self):
+        """Liga os texture buffers às suas unidades (as unidades 0 e 1 ficam para os materiais)."""
+        for unit, texture in zip((CLUSTER_UNIT, LIGHT_INDEX_UNIT, LIGHT_UNIT), self.textures):
+            glActiveTexture(GL_TEXTURE0 + unit)
+            glBindTexture(GL_TEXTURE_BUFFER, texture)
+        glActiveTexture(GL_TEXTURE0)
+
+    def metrics(self):
+        """Luzes, referências (pares luz-cluster) e ocupação da grade no último frame."""
+        X, Y, Z = self.grid
+        return {
+            "grid": list(self.grid),
+            "lights": self.light_count,
+            "references": self.references,
+            "dropped_references": self.dropped,
+            "occupied_clusters": self.occupied,
+            "clusters": X * Y * Z,
+            "max_lights_per_cluster": self.max_per_cluster,
+            "naive": self.naive,
+        }
+
+    def delete(self):
+        """Libera os texture buffers."""
+        glDeleteTextures(3, self.textures)
+        glDeleteBuffers(3, self.buffers)
@@ -0,0 +1,124 @@
+# culling.py
+"""
+Frustum culling hierárquico dos corpos celestes com esferas envolventes.
+
+Cada corpo tem duas esferas centradas na sua posição:
+    própria: o raio do corpo
+    da subárvore: envolve o corpo e as órbitas completas de todos os
+        descendentes (apoapse a * (1 + e) de cada filho + a subárvore dele),
+        então vale em qualquer instante e só muda se os elementos orbitais mudarem
+
+O teste percorre o SceneGraph um nível de profundidade por vez: uma subárvore
+totalmente fora do frustum descarta todos os descendentes, e uma totalmente
+dentro aceita todos, sem testá-los. Só os filhos de subárvores que cruzam a
+borda do frustum são testados, em lote, contra os 6 planos.
+"""
+import numpy as np
+
+OUTSIDE = 0
+INSIDE = 1
+PARTIAL = 2  # cruza a borda: os filhos precisam ser testados
+
+
+def frustum_planes(view_projection):
+    """
+    Os 6 planos (esquerda, direita, baixo, cima, perto, longe) de uma matriz
+    projection * view (glm), como um array (6, 4) [nx, ny, nz, d] normalizado,
+    com a normal apontando para dentro: dentro <=> n·p + d >= 0 em todos.
+    """
+    # np.array de uma matriz glm devolve a forma matemática (linha, coluna)
+    m = np.array(view_projection, dtype=np.float64)
+    planes = np.array([m[3] + m[0], m[3] - m[0],
+                       m[3] + m[1], m[3] - m[1],
+                       m[3] + m[2], m[3] - m[2]])
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes
+
+
+def sphere_distances(planes, spheres):
+    """Distância com sinal do centro de cada esfera (N, 4) [x, y, z, r] a cada plano: (N, 6)."""
+    return spheres[:, :3] @ planes[:, :3].T + planes[:, 3]
+
+
+def classify_spheres(planes, spheres):
+    """OUTSIDE, INSIDE ou PARTIAL para cada esfera (N, 4) contra o frustum."""
+    distances = sphere_distances(planes, spheres)
+    radius = spheres[:, 3:4]
+    outside = (distances < -radius).any(axis=1)
+    inside = (distances >= radius).all(axis=1)
+    return np.where(outside, OUTSIDE, np.where(inside, INSIDE, PARTIAL)).astype(np.int8)
+
+
+class FrustumCuller:
+    """
+    Culling hierárquico sobre um SceneGraph (arrays na ordem das linhas do grafo).
+
+    Com freeze(), os planos do frame atual ficam congelados: a câmera pode sair
+    do lugar e mostrar o que está sendo descartado (depuração).
+    """
+
+    def __init__(self, scene):
+        """
+        Args:
+            scene: SceneGraph com a hierarquia (usa radius, parent, level_bounds e órbitas)
+        """
+        self.scene = scene
+        self.frozen_planes = None
+        self.tests = 0  # esferas testadas no último cull()
+        self.update_bounds()
+
+    def update_bounds(self):
+        """Recalcula o raio das esferas das subárvores (após mudar os elementos orbitais)."""
+        scene = self.scene
+        bounds = scene.radius.astype(np.float64).copy()
+        # Maior distância de cada filho até o pai em qualquer ponto da órbita
+        reach = scene.orbit_radius * (1.0 + scene.eccentricity)
+        # De baixo para cima: cada nível já tem as subárvores completas ao subir para o pai
+        for start, end in reversed(scene.level_bounds[1:]):
+            np.maximum.at(bounds, scene.parent[start:end], reach[start:end] + bounds[start:end])
+        self.bounds = bounds
+
+    @property
+    def frozen(self):
+        return self.frozen_planes is not None
+
+    def freeze(self, planes):
+        """Congela o frustum em 'planes' (ou descongela com None)."""
+        self.frozen_planes = None if planes is None else np.array(planes)
+
+    def cull(self, planes, positions=None):
+        """
+        Testa os corpos nas posições atuais do grafo (chamar após scene.update)
+        ou em 'positions' (N, 3) na ordem das linhas (ex.: interpoladas pela simulação).
+        Retorna a máscara booleana de visibilidade na ordem das linhas do grafo.
+        """
+        if self.frozen_planes is not None:
+            planes = self.frozen_planes
+        scene = self.scene
+        if positions is None:
+            positions = scene.positions
+        state = np.empty(scene.count, dtype=np.int8)
+        visible = np.zeros(scene.count, dtype=bool)
+        self.tests = 0
+
+        for level, (start, end) in enumerate(scene.level_bounds):
+            if level == 0:
+                tested = np.arange(start, end)
+            else:
+                # Subárvores já decididas passam a decisão para os filhos
+                inherited = state[scene.parent[start:end]]
+                state[start:end] = inherited
+                visible[start:end] = inherited == INSIDE
+                tested = start + np.flatnonzero(inherited == PARTIAL)
+            if len(tested) == 0:
+                continue
+            self.tests += len(tested)
+
+            spheres = np.empty((len(tested), 4))
+            spheres[:, :3] = positions[tested]
+            spheres[:, 3] = self.bounds[tested]
+            state[tested] = classify_spheres(planes, spheres)
+            # O próprio corpo (a subárvore pode cruzar o frustum sem que ele apareça)
+            spheres[:, 3] = scene.radius[tested]
+            visible[tested] = classify_spheres(planes, spheres) != OUTSIDE
+        return visible
@@ -0,0 +1,359 @@
+# ephemeris.py
+"""
+Efemérides pré-calculadas: posições de todos os corpos num intervalo de tempo,
+guardadas como polinômios de Chebyshev por trechos (como as efemérides do JPL).
+
+Cada corpo tem o seu passo (uma fração do período orbital, SEGMENTS_PER_ORBIT
+trechos por órbita) e, em cada trecho, DEGREE + 1 coeficientes para 4
+componentes: a posição relativa ao pai (x, y, z) e a longitude verdadeira
+(radianos, contínua dentro do trecho), que gira o corpo como em SceneGraph.update.
+
+A tabela é montada uma vez a partir dos elementos orbitais (propagador de
+orbits.py), com os corpos divididos entre os processos de um ProcessPoolExecutor,
+e salva num contêiner binário (.eph) aberto com np.memmap. Avaliar todos os
+corpos num instante qualquer custa uma busca do trecho e a recorrência de
+Clenshaw em lote, sem a equação de Kepler, então pular décadas na linha do
+tempo custa o mesmo que avançar um frame.
+
+Formato do arquivo (little-endian):
+    cabeçalho (HEADER_DTYPE)
+    tabela de corpos (BODY_DTYPE * bodies)
+    coeficientes float64 (DEGREE + 1, trechos, 4), alinhados a 16 bytes
+
+Os coeficientes ficam em planos, um por grau: a busca dos trechos de todos os
+corpos (np.take no eixo 1) já entrega cada c_j contíguo para a recorrência.
+
+Uso pela linha de comando:
+    python3 ephemeris.py info     # tabelas em cache, intervalo e tamanho
+    python3 ephemeris.py clear    # apaga o cache
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+
+from orbits import perifocal_basis, orbit_offsets
+
+EPHEMERIS_DIR = os.path.join(".cache", "ephemeris")
+
+MAGIC = b"EPHC"
+FORMAT_VERSION = 1
+ALIGNMENT = 16
+
+DEGREE = 8               # grau dos polinômios de cada trecho
+SEGMENTS_PER_ORBIT = 8   # trechos por período orbital (o erro cai com (2π / trechos)^(grau + 1))
+COMPONENTS = 4           # x, y, z relativos ao pai e longitude verdadeira
+
+# Elementos orbitais lidos do SceneGraph (um valor por linha)
+ELEMENTS = (
+    "orbit_radius", "orbit_speed", "orbit_phase", "eccentricity",
+    "inclination", "ascending_node", "periapsis", "orbit_mask",
+)
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("degree", "<u2"),
+    ("bodies", "<u4"),
+    ("segments", "<u8"),
+    ("start", "<f8"),
+    ("end", "<f8"),
+    ("key", "S20"),
+])
+BODY_DTYPE = np.dtype([
+    ("first", "<u8"),      # primeiro trecho do corpo na tabela de coeficientes
+    ("interval", "<f8"),   # duração de cada trecho (segundos)
+    ("segments", "<u4"),
+])
+
+
+def scene_elements(scene):
+    """Elementos orbitais de um SceneGraph, na ordem das linhas."""
+    return {name: np.array(getattr(scene, name), dtype=np.float64) for name in ELEMENTS}
+
+
+def ephemeris_key(elements, start, end, degree=DEGREE, segments_per_orbit=SEGMENTS_PER_ORBIT):
+    """SHA-1 (20 bytes) dos elementos, do intervalo, dos parâmetros do ajuste e da versão."""
+    digest = hashlib.sha1()
+    for name in ELEMENTS:
+        digest.update(np.ascontiguousarray(elements[name], dtype="<f8").tobytes())
+    digest.update(np.array([start, end, degree, segments_per_orbit, FORMAT_VERSION],
+                           dtype="<f8").tobytes())
+    return digest.digest()
+
+
+def ephemeris_path(key, cache_dir=EPHEMERIS_DIR):
+    """Caminho do .eph de uma chave."""
+    return os.path.join(cache_dir, key.hex()[:16] + ".eph")
+
+
+def segment_layout(orbit_speed, eccentricity, orbit_mask, start, end,
+                   segments_per_orbit=SEGMENTS_PER_ORBIT):
+    """
+    Passo e número de trechos de cada corpo. Órbitas excêntricas ganham trechos
+    na proporção da velocidade angular no periastro, (1 + e)² / (1 - e²)^1.5
+    vezes a média. Corpos sem órbita (raízes ou parados) têm um único trecho
+    cobrindo todo o intervalo.
+
+    Returns:
+        (interval (N,) em segundos, segments (N,) int64)
+    Raises:
+        ValueError: Se alguma excentricidade estiver fora de [0, 1) (órbita não elíptica)
+    """
+    if np.any((eccentricity < 0.0) | (eccentricity >= 1.0)):
+        raise ValueError("Efemérides só para órbitas elípticas: excentricidade fora de [0, 1)")
+    span = end - start
+    speed = np.abs(orbit_speed) * (orbit_mask > 0)
+    peak = (1.0 + eccentricity) ** 2 / (1.0 - eccentricity ** 2) ** 1.5
+    with np.errstate(divide="ignore"):
+        step = np.where(speed > 0, 360.0 / (speed * peak * segments_per_orbit), span)
+    segments = np.maximum(np.ceil(span / np.minimum(step, span)), 1).astype(np.int64)
+    return span / segments, segments
+
+
+def chebyshev_matrix(degree):
+    """
+    Nós de Chebyshev em [-1, 1] e a matriz (grau + 1, nós) que leva os valores
+    nos nós aos coeficientes: c_j = (2/n) Σ f(x_k) cos(π j (k + 1/2) / n), c_0 pela metade.
+    """
+    n = degree + 1
+    angle = np.pi * (np.arange(n) + 0.5) / n
+    matrix = 2.0 / n * np.cos(np.outer(np.arange(n), angle))
+    matrix[0] *= 0.5
+    return np.cos(angle), matrix
+
+
+def fit_bodies(elements, start, end, degree=DEGREE, segments_per_orbit=SEGMENTS_PER_ORBIT):
+    """
+    Ajusta os polinômios de um grupo de corpos (roda nos processos de build_ephemeris).
+
+    Args:
+        elements: Dicionário com os arrays de ELEMENTS (um valor por corpo)
+        start, end: Intervalo de tempo coberto (segundos)
+    Returns:
+        (interval (N,), segments (N,), coeficientes (Σ segments, degree + 1, 4))
+    """
+    interval, segments = segment_layout(elements["orbit_speed"], elements["eccentricity"],
+                                        elements["orbit_mask"], start, end, segments_per_orbit)
+    nodes, matrix = chebyshev_matrix(degree)
+    n = degree + 1
+
+    # 1. Instantes de amostragem: os nós de cada trecho de cada corpo
+    body = np.repeat(np.arange(len(segments)), segments)
+    segment = np.arange(len(body)) - np.repeat(np.cumsum(segments) - segments, segments)
+    times = start + (segment[:, None] + (nodes + 1.0) * 0.5) * interval[body][:, None]
+
+    # 2. Posições relativas ao pai e longitude verdadeira pelo propagador kepleriano
+    row = np.repeat(body, n)
+    P, Q = perifocal_basis(elements["inclination"], elements["ascending_node"], elements["periapsis"])
+    mean_anomaly = np.radians(elements["orbit_phase"][row] + times.ravel() * elements["orbit_speed"][row])
+    offsets, true_anomaly = orbit_offsets(elements["orbit_radius"][row], elements["eccentricity"][row],
+                                          mean_anomaly, P[row], Q[row])
+    mask = elements["orbit_mask"][row]
+    values = np.empty((len(body), n, COMPONENTS))
+    values[..., :3] = (offsets * mask[:, None]).reshape(len(body), n, 3)
+    longitude = (np.radians(elements["ascending_node"][row] + elements["periapsis"][row]) + true_anomaly) * mask
+    # Contínua dentro do trecho (um trecho cobre bem menos de meia órbita)
+    values[..., 3] = np.unwrap(longitude.reshape(len(body), n), axis=1)
+
+    # 3. Coeficientes: (trechos, grau + 1, componentes)
+    return interval, segments, np.einsum("jk,skc->sjc", matrix, values)
+
+
+def build_ephemeris(elements, start, end, path, workers=None, degree=DEGREE,
+                    segments_per_orbit=SEGMENTS_PER_ORBIT, chunk_bodies=256):
+    """
+    Ajusta as tabelas de todos os corpos (em paralelo, com processos) e grava o .eph.
+
+    Args:
+        elements: Elementos orbitais (ver scene_elements)
+        start, end: Intervalo de tempo coberto (segundos da cena)
+        path: Arquivo de saída (escrita atômica)
+        workers: Processos do pool (None: os.cpu_count(); 1: sem pool)
+        chunk_bodies: Corpos por tarefa enviada ao pool
+    Returns:
+        path
+    """
+    count = len(elements["orbit_radius"])
+    chunks = [{name: values[i:i + chunk_bodies] for name, values in elements.items()}
+              for i in range(0, count, chunk_bodies)]
+    args = (start, end, degree, segments_per_orbit)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        results = [fit_bodies(chunk, *args) for chunk in chunks]
+    else:
+        # spawn: o processo principal já tem threads (carregamento) e o contexto
+        # OpenGL, que um fork copiaria pela metade
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(fit_bodies, chunk, *args) for chunk in chunks]
+            results = [future.result() for future in futures]
+
+    bodies = np.zeros(count, dtype=BODY_DTYPE)
+    bodies["interval"] = np.concatenate([result[0] for result in results]) if results else []
+    bodies["segments"] = np.concatenate([result[1] for result in results]) if results else []
+    bodies["first"] = np.cumsum(bodies["segments"], dtype=np.uint64) - bodies["segments"]
+    total = int(bodies["segments"].sum())
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = FORMAT_VERSION
+    header["degree"] = degree
+    header["bodies"] = count
+    header["segments"] = total
+    header["start"] = start
+    header["end"] = end
+    header["key"] = ephemeris_key(elements, start, end, degree, segments_per_orbit)
+
+    offset = HEADER_DTYPE.itemsize + BODY_DTYPE.itemsize * count
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(bodies.tobytes())
+        f.seek(-(-offset // ALIGNMENT) * ALIGNMENT)
+        for j in range(degree + 1):
+            for result in results:
+                f.write(np.ascontiguousarray(result[2][:, j], dtype="<f8").tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+class Ephemeris:
+    """
+    Tabelas de um .eph mapeadas em memória. evaluate(t) devolve as posições
+    relativas ao pai e a longitude verdadeira de todos os corpos em lote.
+    """
+
+    def __init__(self, path):
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        header = data[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        if header["magic"] != MAGIC or header["version"] != FORMAT_VERSION:
+            raise ValueError(f"Arquivo de efemérides inválido: {path}")
+
+        self.path = path
+        self.key = bytes(header["key"])
+        self.start = float(header["start"])
+        self.end = float(header["end"])
+        self.degree = int(header["degree"])
+        self.count = int(header["bodies"])
+        table_end = HEADER_DTYPE.itemsize + BODY_DTYPE.itemsize * self.count
+        bodies = data[HEADER_DTYPE.itemsize:table_end].view(BODY_DTYPE)
+        # Cópias pequenas (um valor por corpo) no formato da avaliação
+        self.first = bodies["first"].astype(np.int64)
+        self.interval = bodies["interval"].astype(np.float64)
+        self.segments = bodies["segments"].astype(np.int64)
+
+        offset = -(-table_end // ALIGNMENT) * ALIGNMENT
+        size = int(header["segments"]) * (self.degree + 1) * COMPONENTS * 8
+        self.coefficients = data[offset:offset + size].view("<f8").reshape(
+            self.degree + 1, -1, COMPONENTS)
+        self.build_time = 0.0  # segundos gastos no ajuste (0 se veio do cache)
+
+    @property
+    def nbytes(self):
+        """Tamanho dos coeficientes em bytes."""
+        return self.coefficients.nbytes
+
+    def covers(self, time):
+        """True se 'time' está dentro do intervalo das tabelas."""
+        return self.start <= time <= self.end
+
+    def evaluate(self, time, bodies=None):
+        """
+        Posições relativas ao pai e longitude verdadeira no instante 'time'.
+
+        Args:
+            time: Instante (segundos), escalar ou array com um valor por corpo
+            bodies: Índices dos corpos (None: todos, na ordem das linhas)
+        Returns:
+            (offsets (N, 3), longitude verdadeira (N,) em radianos)
+        """
+        first, interval, segments = self.first, self.interval, self.segments
+        if bodies is not None:
+            first, interval, segments = first[bodies], interval[bodies], segments[bodies]
+
+        # 1. Trecho de cada corpo e o instante levado para [-1, 1]
+        elapsed = np.clip(np.asarray(time, dtype=np.float64) - self.start, 0.0, self.end - self.start)
+        position = elapsed / interval
+        segment = np.minimum(position.astype(np.int64), segments - 1)
+        tau = 2.0 * (position - segment) - 1.0
+        coefficients = np.take(self.coefficients, first + segment, axis=1)  # (grau + 1, N, 4)
+
+        # 2. Recorrência de Clenshaw, b_j = c_j + 2 tau b_(j+1) - b_(j+2), sem arrays temporários
+        two_tau = (2.0 * tau)[:, None]
+        b1 = coefficients[self.degree].copy()
+        b2 = np.zeros_like(b1)
+        result = np.empty_like(b1)
+        for j in range(self.degree - 1, 0, -1):
+            np.multiply(two_tau, b1, out=result)
+            result -= b2
+            result += coefficients[j]
+            b1, b2, result = result, b1, b2
+        # Último passo: f(tau) = c_0 + tau b_1 - b_2
+        np.multiply(0.5 * two_tau, b1, out=result)
+        result -= b2
+        result += coefficients[0]
+        return result[:, :3], result[:, 3]
+
+    def metrics(self):
+        """Resumo das tabelas para o relatório."""
+        return {
+            "bodies": self.count,
+            "segments": int(self.segments.sum()),
+            "degree": self.degree,
+            "span_s": [self.start, self.end],
+            "bytes": self.nbytes,
+            "build_s": self.build_time,
+        }
+
+
+def load_or_build(scene, start, end, workers=None, cache_dir=EPHEMERIS_DIR):
+    """
+    Abre as tabelas de 'scene' no intervalo [start, end] do cache, ou as ajusta
+    (em paralelo) e salva antes. Retorna um Ephemeris.
+    """
+    elements = scene_elements(scene)
+    key = ephemeris_key(elements, start, end)
+    path = ephemeris_path(key, cache_dir)
+    try:
+        ephemeris = Ephemeris(path)
+        if ephemeris.key == key:
+            return ephemeris
+    except (FileNotFoundError, ValueError):
+        pass
+    build_start = perf_counter()
+    build_ephemeris(elements, start, end, path, workers)
+    ephemeris = Ephemeris(path)
+    ephemeris.build_time = perf_counter() - build_start
+    return ephemeris
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerencia o cache de efemérides.")
+    parser.add_argument("command", choices=["clear", "info"])
+    parser.add_argument("--dir", default=EPHEMERIS_DIR, help="Diretório do cache")
+    args = parser.parse_args()
+
+    names = sorted(name for name in os.listdir(args.dir) if name.endswith(".eph")) \
+        if os.path.isdir(args.dir) else []
+    total = 0
+    for name in names:
+        path = os.path.join(args.dir, name)
+        total += os.path.getsize(path)
+        if args.command == "clear":
+            os.remove(path)
+            continue
+        ephemeris = Ephemeris(path)
+        print(f"{name}  {ephemeris.count} corpos  {int(ephemeris.segments.sum()):,} trechos  "
+              f"t = [{ephemeris.start:.0f}, {ephemeris.end:.0f}] s  {os.path.getsize(path) / 2**20:.2f} MB")
+    if args.command == "clear":
+        print(f"Cache limpo: {args.dir}")
+    print(f"{len(names)} arquivos, {total / 2**20:.2f} MB em {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+# headless.py
+"""
+Renderização sem janela (servidores sem display e sem GPU, ex.: Mesa llvmpipe).
+
+    create_context   contexto OpenGL 3.3 core via EGL (surfaceless) ou OSMesa
+    OffscreenTarget  FBO com cor RGBA8 + profundidade em resolução arbitrária
+    PBOReadback      leitura assíncrona com um anel de Pixel Buffer Objects
+    FrameWriter      thread que grava os frames em PNG ou RGBA cru
+
+O PyOpenGL escolhe a plataforma (GLX, EGL ou OSMesa) no primeiro import de
+OpenGL.GL: PYOPENGL_PLATFORM precisa estar definida antes (ver main.py).
+"""
+from collections import deque
+import ctypes
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+from PIL import Image
+from OpenGL.GL import (
+    GL_FRAMEBUFFER, GL_RENDERBUFFER, GL_RGBA8, GL_DEPTH_COMPONENT24, GL_COLOR_ATTACHMENT0,
+    GL_DEPTH_ATTACHMENT, GL_FRAMEBUFFER_COMPLETE, GL_PIXEL_PACK_BUFFER, GL_STREAM_READ,
+    GL_MAP_READ_BIT, GL_RGBA, GL_UNSIGNED_BYTE, GL_PACK_ALIGNMENT,
+    glGenFramebuffers, glBindFramebuffer, glGenRenderbuffers, glBindRenderbuffer,
+    glRenderbufferStorage, glFramebufferRenderbuffer, glCheckFramebufferStatus,
+    glDeleteFramebuffers, glDeleteRenderbuffers, glViewport,
+    glGenBuffers, glBindBuffer, glBufferData, glDeleteBuffers, glMapBufferRange, glUnmapBuffer,
+    glReadPixels, glPixelStorei
+)
+
+BACKENDS = ("egl", "osmesa")
+PBO_COUNT = 3
+WRITER_QUEUE_SIZE = 8
+
+
+def _create_egl_context():
+    from OpenGL import EGL
+
+    # Com EGL_PLATFORM=surfaceless o Mesa não precisa de X11 nem de Wayland
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("eglInitialize falhou")
+
+    config_attribs = (EGL.EGLint * 5)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE,
+    )
+    config = EGL.EGLConfig()
+    num_configs = EGL.EGLint()
+    EGL.eglChooseConfig(display, config_attribs, ctypes.pointer(config), 1,
+                        ctypes.pointer(num_configs))
+    if num_configs.value == 0:
+        raise RuntimeError("Nenhuma configuração EGL com OpenGL disponível")
+
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context_attribs = (EGL.EGLint * 7)(
+        EGL.EGL_CONTEXT_MAJOR_VERSION, 3,
+        EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+        EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+        EGL.EGL_NONE,
+    )
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, context_attribs)
+    if context == EGL.EGL_NO_CONTEXT:
+        raise RuntimeError("eglCreateContext falhou (OpenGL 3.3 core)")
+    # Sem superfície: todo desenho vai para o FBO (EGL_KHR_surfaceless_context)
+    if not EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context):
+        raise RuntimeError("eglMakeCurrent falhou")
+
+    def destroy():
+        EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroyContext(display, context)
+        EGL.eglTerminate(display)
+    return destroy
+
+
+def _create_osmesa_context():
+    from OpenGL import osmesa, arrays
+
+    attribs = arrays.GLintArray.asArray([
+        osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA,
+        osmesa.OSMESA_DEPTH_BITS, 24,
+        osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+        osmesa.OSMESA_CONTEXT_MAJOR_VERSION, 3,
+        osmesa.OSMESA_CONTEXT_MINOR_VERSION, 3,
+        0,
+    ])
+    context = osmesa.OSMesaCreateContextAttribs(attribs, None)
+    if not context:
+        raise RuntimeError("OSMesaCreateContextAttribs falhou (OpenGL 3.3 core)")
+    # O OSMesa exige um buffer de cor; 1x1 basta porque o desenho vai para o FBO
+    buffer = arrays.GLubyteArray.zeros((1, 1, 4))
+    if not osmesa.OSMesaMakeCurrent(context, buffer, GL_UNSIGNED_BYTE, 1, 1):
+        raise RuntimeError("OSMesaMakeCurrent falhou")
+
+    def destroy():
+        osmesa.OSMesaDestroyContext(context)
+    destroy.buffer = buffer  # o buffer precisa viver enquanto o contexto existir
+    return destroy
+
+
+def create_context(backend="egl"):
+    """
+    Cria e torna atual um contexto OpenGL 3.3 core sem janela.
+
+    Args:
+        backend: "egl" (PYOPENGL_PLATFORM=egl) ou "osmesa" (PYOPENGL_PLATFORM=osmesa)
+
+    Returns:
+        Função sem argumentos que destrói o contexto
+    """
+    if backend == "egl":
+        return _create_egl_context()
+    if backend == "osmesa":
+        return _create_osmesa_context()
+    raise ValueError(f"Backend headless desconhecido: {backend}")
+
+
+class OffscreenTarget:
+    """Framebuffer (cor RGBA8 + profundidade de 24 bits) para renderizar sem janela."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.FBO = glGenFramebuffers(1)
+        self.color, self.depth = glGenRenderbuffers(2)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBO)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.color)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Framebuffer incompleto ({status:#x}) em {width}x{height}")
+
+    def bind(self):
+        """Passa a desenhar no FBO, com o viewport do tamanho dele."""
+        glBindFramebuffer(GL_FRAMEBUFFER, self.FBO)
+        glViewport(0, 0, self.width, self.height)
+
+    def delete(self):
+        glDeleteFramebuffers(1, [self.FBO])
+        glDeleteRenderbuffers(2, [self.color, self.depth])
+
+
+class PBOReadback:
+    """
+    Leitura assíncrona do framebuffer com um anel de Pixel Buffer Objects.
+
+    glReadPixels com um PBO ligado só agenda a cópia e retorna na hora; o PBO é
+    mapeado 'count - 1' frames depois, quando a GPU já terminou aquele frame,
+    então a leitura não para o pipeline.
+    """
+
+    def __init__(self, width, height, count=PBO_COUNT):
+        """
+        Args:
+            width, height: Tamanho da área lida (a partir de (0, 0))
+            count: Tamanho do anel (2 ou 3)
+        """
+        self.width = width
+        self.height = height
+        self.size = width * height * 4
+        self.pbos = [int(pbo) for pbo in np.atleast_1d(glGenBuffers(count))]
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.size, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.pending = deque()  # (pbo, número do frame), do mais antigo ao mais novo
+        self.next = 0
+
+    def read(self, frame):
+        """
+        Agenda a leitura do framebuffer atual como 'frame'.
+        Retorna a lista de (frame, pixels (H, W, 4) uint8) que ficaram prontos.
+        """
+        ready = []
+        # Anel cheio: o frame mais antigo já teve count - 1 frames para terminar
+        if len(self.pending) == len(self.pbos):
+            ready.append(self._collect())
+
+        pbo = self.pbos[self.next]
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.pending.append((pbo, frame))
+        self.next = (self.next + 1) % len(self.pbos)
+        return ready
+
+    def _collect(self):
+        pbo, frame = self.pending.popleft()
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        address = glMapBufferRange(GL_PIXEL_PACK_BUFFER, 0, self.size, GL_MAP_READ_BIT)
+        mapped = (ctypes.c_ubyte * self.size).from_address(int(address))
+        # Copiar antes de desmapear: o gravador usa os pixels em outra thread
+        pixels = np.frombuffer(mapped, dtype=np.uint8).copy()
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        return frame, pixels.reshape(self.height, self.width, 4)
+
+    def flush(self):
+        """Coleta todas as leituras pendentes (fim da sequência)."""
+        ready = []
+        while self.pending:
+            ready.append(self._collect())
+        return ready
+
+    def delete(self):
+        glDeleteBuffers(len(self.pbos), self.pbos)
+
+
+class FrameWriter:
+    """
+    Grava frames numa thread em background, por uma fila limitada (se o disco
+    ficar para trás, write() bloqueia em vez de acumular frames na memória).
+
+    Formatos: "png" (frame_00000.png) ou "raw" (frame_00000.rgba, RGBA8 sem
+    cabeçalho, de cima para baixo). Ao fechar grava sequence.json com o tamanho,
+    o formato e o número de frames.
+    """
+
+    def __init__(self, directory, format="png", queue_size=WRITER_QUEUE_SIZE, metadata=None):
+        """
+        Args:
+            directory: Diretório de saída (criado se não existir)
+            format: "png" ou "raw"
+            queue_size: Frames esperando gravação antes de write() bloquear
+            metadata: Campos extras para o sequence.json (ex.: passo de tempo)
+        """
+        if format not in ("png", "raw"):
+            raise ValueError(f"Formato de saída desconhecido: {format}")
+        self.directory = directory
+        self.format = format
+        self.metadata = dict(metadata or {})
+        self.frames_written = 0
+        self.shape = None
+        self.error = None
+        os.makedirs(directory, exist_ok=True)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._run, name="frame-writer", daemon=True)
+        self.thread.start()
+
+    def path(self, frame):
+        extension = "png" if self.format == "png" else "rgba"
+        return os.path.join(self.directory, f"frame_{frame:05d}.{extension}")
+
+    def write(self, frame, pixels):
+        """Enfileira os pixels (H, W, 4) do framebuffer (origem embaixo, como no OpenGL)."""
+        if self.error is not None:
+            raise self.error
+        self.queue.put((frame, pixels))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            frame, pixels = item
+            try:
+                # O OpenGL lê de baixo para cima; as imagens são gravadas de cima para baixo
+                image = np.ascontiguousarray(pixels[::-1])
+                if self.format == "png":
+                    Image.fromarray(image, "RGBA").save(self.path(frame))
+                else:
+                    image.tofile(self.path(frame))
+                self.shape = image.shape
+                self.frames_written += 1
+            except Exception as e:  # reportado na thread principal em write()/close()
+                self.error = e
+
+    def close(self):
+        """Espera a fila esvaziar, encerra a thread e grava o sequence.json."""
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        info = dict(self.metadata, format=self.format, frames=self.frames_written)
+        if self.shape is not None:
+            info.update(height=self.shape[0], width=self.shape[1], channels=self.shape[2])
+        with open(os.path.join(self.directory, "sequence.json"), "w") as f:
+            json.dump(info, f, indent=2)
@@ -0,0 +1,160 @@
+# instancing.py
+"""
+Caminho de renderização instanciado para muitos corpos que compartilham a malha da esfera.
+
+As model matrices de todos os corpos vão para um único VBO de instâncias
+(localizações 5 a 8, com divisor 1). Os corpos são ordenados por
+(material, nível de LOD); as malhas ficam numa MeshArena e cada material vira um
+glMultiDrawElementsIndirect com um comando por nível (baseInstance aponta a faixa de
+matrizes). Sem draw indirect (GL 3.3), cada comando vira um glDrawElementsInstancedBaseVertex.
+"""
+from collections import namedtuple
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+from render_queue import DrawMaterial
+
+# Primeira localização do atributo por instância (mat4 ocupa 4 localizações)
+INSTANCE_LOCATION = 5
+MATRIX_BYTES = 16 * 4
+
+# Classe de material: corpos com o mesmo material podem ser desenhados juntos
+Material = namedtuple("Material", ["texture_id", "normal_map_id", "is_sun"])
+
+
+def build_materials(planets, sun=None):
+    """
+    Agrupa os planetas por material (texturas + flag de Sol).
+    Retorna (lista de Material, array (N,) com o índice do material de cada planeta).
+    """
+    materials = []
+    lookup = {}
+    indices = np.empty(len(planets), dtype=np.int32)
+    for i, planet in enumerate(planets):
+        material = Material(planet.texture_id, planet.normal_map_id, planet is sun)
+        if material not in lookup:
+            lookup[material] = len(materials)
+            materials.append(material)
+        indices[i] = lookup[material]
+    return materials, indices
+
+
+def draw_material(material):
+    """Estado OpenGL de um Material para a RenderQueue (texturas nas unidades 0 e 1 + flags)."""
+    normal_map = None if material.normal_map_id is None else (GL_TEXTURE_2D, material.normal_map_id)
+    return DrawMaterial(
+        textures=((GL_TEXTURE_2D, material.texture_id), normal_map),
+        uniforms=(("isSun", 1 if material.is_sun else 0),
+                  ("useNormalMap", 0 if material.normal_map_id is None else 1)),
+    )
+
+
+class InstancedRenderer:
+    """
+    Desenha lotes de instâncias agrupadas por (malha, material).
+    O VBO de instâncias é reenviado a cada frame (orphaning com GL_STREAM_DRAW).
+    """
+
+    def __init__(self, shader):
+        """
+        Args:
+            shader: Programa compilado de basic_instanced.vert + basic.frag
+        """
+        self.shader = shader
+        self.VBO = glGenBuffers(1)
+        self.capacity = 0
+        self.attached = set()
+        self.isSun_loc = glGetUniformLocation(shader, "isSun")
+        self.useNormalMap_loc = glGetUniformLocation(shader, "useNormalMap")
+
+    def _attach(self, VAO):
+        """Habilita as localizações 5-8 como atributos por instância no VAO."""
+        glBindVertexArray(VAO)
+        for column in range(4):
+            glEnableVertexAttribArray(INSTANCE_LOCATION + column)
+            glVertexAttribDivisor(INSTANCE_LOCATION + column, 1)
+        self.attached.add(VAO)
+
+    def _upload(self, matrices):
+        """Envia as matrizes (N, 4, 4) para o VBO de instâncias."""
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        self.capacity = max(self.capacity, len(matrices))
+        # Orphaning: realocar o buffer evita esperar a GPU terminar o frame anterior
+        glBufferData(GL_ARRAY_BUFFER, self.capacity * MATRIX_BYTES, None, GL_STREAM_DRAW)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, matrices.nbytes, matrices)
+
+    def _point_instances(self, first):
+        """Aponta os atributos por instância para a instância 'first' (GL 3.3 não tem base instance)."""
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        for column in range(4):
+            offset = int(first) * MATRIX_BYTES + column * 16
+            glVertexAttribPointer(INSTANCE_LOCATION + column, 4, GL_FLOAT, GL_FALSE,
+                                  MATRIX_BYTES, ctypes.c_void_p(offset))
+
+    def draw(self, matrices, arena, levels, level_indices, materials, material_indices, stats=None):
+        """
+        Desenha todas as instâncias com um glMultiDrawElementsIndirect por material
+        (todos os níveis de LOD juntos), ou um glDrawElementsInstancedBaseVertex por
+        (nível, material) sem draw indirect.
+
+        Args:
+            matrices: Model matrices (N, 4, 4) float32 em ordem de coluna
+            arena: MeshArena com as malhas dos níveis
+            levels: Lista de LODLevel (malhas disponíveis)
+            level_indices: Índice do nível de cada instância (N,)
+            materials: Lista de Material
+            material_indices: Índice do material de cada instância (N,)
+            stats: FrameStats opcional para contar triângulos e draw calls
+        """
+        if len(matrices) == 0:
+            return
+
+        # Ordenar por (material, nível): cada (material, nível) é uma faixa contígua
+        # de instâncias e cada material uma faixa contígua de comandos
+        keys = np.asarray(material_indices, dtype=np.int64) * len(levels) + level_indices
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        self._upload(np.ascontiguousarray(matrices[order]))
+
+        starts = np.flatnonzero(np.diff(sorted_keys)) + 1
+        starts = np.concatenate(([0], starts))
+        ends = np.concatenate((starts[1:], [len(sorted_keys)]))
+        meshes = [levels[key % len(levels)].mesh for key in sorted_keys[starts].tolist()]
+        commands = arena.build_commands(meshes, ends - starts, starts)
+        arena.upload_commands(commands)
+
+        # Comandos de cada material: [material_starts[k], material_starts[k + 1])
+        command_ends = np.cumsum([len(mesh.parts) for mesh in meshes])
+        range_materials = sorted_keys[starts] // len(levels)
+        boundaries = np.flatnonzero(np.diff(range_materials)) + 1
+        material_starts = np.concatenate(([0], command_ends[boundaries - 1], [len(commands)]))
+        run_materials = range_materials[np.concatenate(([0], boundaries))].tolist()
+
+        glUseProgram(self.shader)
+        if arena.VAO not in self.attached:
+            self._attach(arena.VAO)
+        glBindVertexArray(arena.VAO)
+        self._point_instances(0)
+
+        draw_calls = 0
+        for k, first in enumerate(material_starts[:-1].tolist()):
+            material = materials[run_materials[k]]
+            glUniform1i(self.isSun_loc, 1 if material.is_sun else 0)
+            glActiveTexture(GL_TEXTURE0)
+            glBindTexture(GL_TEXTURE_2D, material.texture_id)
+            glActiveTexture(GL_TEXTURE1)
+            if material.normal_map_id is not None:
+                glBindTexture(GL_TEXTURE_2D, material.normal_map_id)
+                glUniform1i(self.useNormalMap_loc, 1)
+            else:
+                glUniform1i(self.useNormalMap_loc, 0)
+
+            draw_calls += arena.draw(first, int(material_starts[k + 1]) - first,
+                                     self._point_instances)
+
+        glBindVertexArray(0)
+        if stats is not None:
+            stats.add("triangles", int(np.sum(commands[:, 0] // 3 * commands[:, 1].astype(np.int64))))
+            stats.add("draw_calls", draw_calls)
@@ -0,0 +1,149 @@
+# lod.py
+"""
+Nível de detalhe (LOD) por distância para os corpos celestes.
+
+Uma cadeia de esferas (ex.: 8x8 até 256x256) é criada uma única vez e, a cada
+frame, cada Planet recebe um nível a partir do raio projetado na tela em pixels.
+As esferas usam o layout de 14 floats ou o compacto de 20 bytes (utils.VERTEX_FORMATS)
+e ficam todas numa mesma MeshArena (um VBO, um EBO e um VAO para a cadeia inteira).
+"""
+import math
+
+import numpy as np
+from OpenGL.GL import GL_UNSIGNED_SHORT
+
+from mesh_cache import load_mesh
+from mesh_arena import MeshArena
+
+DEFAULT_RESOLUTIONS = (8, 16, 32, 64, 128, 256)
+
+# Gerador do mesh_cache para cada layout de vértice
+MESH_GENERATORS = {"float": "sphere", "packed": "sphere_packed"}
+
+
+class LODLevel:
+    """Uma esfera da cadeia de LOD já enviada para a GPU (uma malha da MeshArena)."""
+
+    def __init__(self, index, resolution, arena, mesh):
+        self.index = index
+        self.resolution = resolution
+        self.mesh = mesh
+        self.VAO = arena.VAO
+        self.vertex_bytes = mesh.vertex_count * arena.stride
+        self.index_count = mesh.index_count
+        self.index_type = GL_UNSIGNED_SHORT
+        self.triangle_count = self.index_count // 3
+
+
+class LODSelector:
+    """
+    Escolhe o nível de detalhe de cada corpo pelo raio projetado na tela.
+
+    O número de setores desejado é o perímetro projetado dividido pelo tamanho
+    alvo de aresta em pixels. A histerese cria uma faixa morta em torno de cada
+    limiar: só sobe de nível quando o raio passa o limiar por (1 + hysteresis)
+    e só desce quando cai abaixo dele por (1 - hysteresis).
+    """
+
+    def __init__(self, resolutions=DEFAULT_RESOLUTIONS, edge_pixels=8.0, hysteresis=0.15,
+                 vertex_format="float", indirect=None):
+        """
+        Args:
+            resolutions: Resoluções (stacks = sectors) da cadeia, em ordem crescente
+            edge_pixels: Tamanho alvo da aresta de um triângulo na tela (pixels)
+            hysteresis: Fração de margem em torno dos limiares de troca
+            vertex_format: Layout dos vértices ("float" ou "packed")
+            indirect: Desenho da arena com glMultiDrawElementsIndirect (None: se suportado)
+        """
+        self.vertex_format = vertex_format
+        self.indirect = indirect
+        self.arena = None  # criada com o primeiro nível (requer contexto OpenGL)
+        self.generator = MESH_GENERATORS[vertex_format]
+        self.resolutions = np.asarray(sorted(resolutions))
+        self.edge_pixels = edge_pixels
+        self.hysteresis = hysteresis
+        self.levels = [None] * len(self.resolutions)
+        self.available = np.zeros(len(self.resolutions), dtype=np.int64)
+        self.current = np.zeros(0, dtype=np.int64)  # nível atual por linha do SceneGraph (-1: nenhum)
+
+    def build(self, resolutions=None):
+        """
+        Gera (ou carrega do cache) e envia as esferas da cadeia. Requer contexto OpenGL.
+
+        Args:
+            resolutions: Só estas resoluções (padrão: a cadeia inteira)
+        """
+        for index, resolution in enumerate(self.resolutions):
+            if resolutions is None or resolution in resolutions:
+                vertices, indices = load_mesh(
+                    self.generator, radius=1.0, stacks=int(resolution), sectors=int(resolution)
+                )
+                self.set_level(index, vertices, indices)
+
+    def set_level(self, index, vertices, indices):
+        """
+        Envia a malha do nível 'index' (ex.: gerada numa thread de trabalho).
+        Enquanto um nível não existe, select usa o nível carregado mais próximo abaixo dele.
+        """
+        if self.arena is None:
+            self.arena = MeshArena(self.vertex_format, indirect=self.indirect)
+        if self.levels[index] is not None:
+            self.arena.free(self.levels[index].mesh)
+        mesh = self.arena.add(vertices, indices)
+        self.levels[index] = LODLevel(index, int(self.resolutions[index]), self.arena, mesh)
+        loaded = [i for i, level in enumerate(self.levels) if level is not None]
+        self.available = np.array([
+            max((i for i in loaded if i <= wanted), default=loaded[0])
+            for wanted in range(len(self.levels))
+        ])
+
+    @property
+    def vertex_bytes(self):
+        """Bytes de vértices dos níveis já enviados."""
+        return sum(level.vertex_bytes for level in self.levels if level is not None)
+
+    def projected_radius(self, centers, radii, camera, viewport_height):
+        """
+        Raio projetado na tela (pixels) de esferas com centros (N, 3) e raios (N,).
+        Usa o fator de escala vertical da projeção: projection[1][1] = 1 / tan(fov / 2).
+        """
+        projection = camera.get_projection()
+        focal = projection[1][1] * viewport_height * 0.5
+        eye = np.array(camera.position, dtype=np.float64)
+        distance = np.linalg.norm(centers - eye, axis=1)
+        # Dentro (ou encostado) da esfera: tratar como ocupando a tela inteira
+        distance = np.maximum(distance - radii, 1e-6)
+        return radii * focal / distance
+
+    def _level_for(self, radius_px):
+        """Índice do menor nível cujos setores cobrem o perímetro projetado."""
+        needed = 2.0 * math.pi * radius_px / self.edge_pixels
+        index = np.searchsorted(self.resolutions, needed)
+        return np.minimum(index, len(self.resolutions) - 1)
+
+    def select(self, rows, centers, radii, camera, viewport_height, count=None):
+        """
+        Escolhe o nível de cada corpo (após o SceneGraph.update do frame atual).
+        Retorna os índices em self.levels (N,) na mesma ordem de 'rows'.
+
+        Args:
+            rows: Linhas dos corpos no SceneGraph (N,), a chave do estado da histerese
+            centers, radii: Arrays (N, 3) e (N,) dos corpos
+            count: Número de linhas do grafo; se mudar, o estado é descartado
+                (padrão: o suficiente para as linhas recebidas)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if count is None:
+            count = max(len(self.current), int(rows.max()) + 1 if len(rows) else 0)
+        if count != len(self.current):
+            self.current = np.full(count, -1, dtype=np.int64)  # -1: sem nível anterior
+        radius_px = self.projected_radius(centers, radii, camera, viewport_height)
+
+        # Faixa permitida: o raio encolhido pela margem dá o menor nível, o aumentado o maior
+        min_level = self._level_for(radius_px * (1.0 - self.hysteresis))
+        max_level = self._level_for(radius_px * (1.0 + self.hysteresis))
+
+        previous = self.current[rows]
+        current = np.clip(np.where(previous < 0, min_level, previous), min_level, max_level)
+        self.current[rows] = current
+        return self.available[current]
@@ -1,16 +1,52 @@
 # main.py
+import os
+import sys
+
+# O PyOpenGL escolhe a plataforma (GLX, EGL ou OSMesa) no primeiro import de OpenGL.GL,
+# então o modo headless precisa defini-la antes de qualquer outro import
+if "--headless" in sys.argv:
+    _backend = "osmesa" if "osmesa" in sys.argv or "--gl-backend=osmesa" in sys.argv else "egl"
+    os.environ.setdefault("PYOPENGL_PLATFORM", _backend)
+    if _backend == "egl":
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 import numpy as np
 import glm
 import ctypes
-
-from utils import load_shader, load_texture, generate_starfield_texture
-from meshes import generate_sphere
+import argparse
+import json
+from time import perf_counter
+try:
+    import resource  # pico de memória (não existe no Windows)
+except ImportError:
+    resource = None
+
+from utils import load_shader, create_placeholder_texture, VERTEX_FORMATS
+from shader_cache import default_cache as shader_cache
+from mesh_cache import default_cache as mesh_cache
+from async_loader import AsyncLoader
+from texture_streaming import TextureStreamer, STREAM_BUDGET_BYTES
+from lod import LODSelector
+from instancing import InstancedRenderer, build_materials, draw_material
+from render_queue import RenderQueue, PASS_OPAQUE, PASS_NAMES
+from scene_graph import SceneGraph
+from ephemeris import load_or_build
+from culling import FrustumCuller, frustum_planes
+from terrain import CubeSphereTerrain, MAX_CHUNKS, CLOSE_RADIUS_PX
+from simulation import Simulation, TICK_RATE
+from stats import FrameStats
 from planet import Planet
 from camera import Camera
-from skybox import Skybox
+from skybox import Skybox, SKYBOX_SHADERS, QUERY_TARGETS
+from uniform_buffers import FrameUniforms, LightUniforms, attach_uniform_blocks
+from clustered_lighting import ClusteredLighting, PointLights
+from profiler import Profiler, EXPORT_FORMATS
+from overlay import TextOverlay
+from scenarios import SCENARIOS, NO_KEYS, InputRecorder, InputReplay
+from headless import BACKENDS, PBO_COUNT, create_context, OffscreenTarget, PBOReadback, FrameWriter
 
 # Escala de Tempo para acelerar as órbitas e rotações
 TIME_SCALE = 8000.0
@@ -29,141 +65,275 @@ MOON_ROTATION_SPEED = (360.0 / MOON_ROTATION_PERIOD) * TIME_SCALE
 EARTH_ORBITAL_SPEED = (360.0 / EARTH_ORBITAL_PERIOD) * TIME_SCALE
 MOON_ORBITAL_SPEED = (360.0 / MOON_ORBITAL_PERIOD) * TIME_SCALE
 
+# Um ano em segundos da cena (unidade da linha do tempo: --epoch, --ephemeris, PageUp/PageDown)
+YEAR = EARTH_ORBITAL_PERIOD / TIME_SCALE
+SCRUB_SPEED = 2.0  # anos por segundo com '.' / ',' seguradas
+
+# Elementos orbitais reais (graus); as velocidades acima são o movimento médio
+EARTH_ECCENTRICITY = 0.0167
+EARTH_PERIHELION = 102.9
+MOON_ECCENTRICITY = 0.0549
+MOON_INCLINATION = 5.145
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sistema Solar em OpenGL")
+    parser.add_argument("--asteroids", type=int, default=0,
+                        help="Número de asteroides extras no cinturão (cena de estresse)")
+    parser.add_argument("--no-instancing", action="store_true",
+                        help="Começar com o laço de desenho por objeto (tecla I alterna)")
+    parser.add_argument("--sky-size", type=int, default=1024,
+                        help="Largura/altura da textura do campo de estrelas (ex.: 8192)")
+    parser.add_argument("--sky-seed", type=int, default=0, help="Semente do campo de estrelas")
+    parser.add_argument("--skybox", choices=sorted(SKYBOX_SHADERS), default="cubemap",
+                        help="cubemap (triângulo de tela cheia, desenhado por último) ou sphere (esfera original)")
+    parser.add_argument("--measure-sky", nargs="?", const="auto", choices=["auto"] + sorted(QUERY_TARGETS),
+                        help="Medir o Skybox com query: invocações do fragment shader, amostras ou tempo de GPU")
+    parser.add_argument("--profile-out", default=None,
+                        help="Ao sair, exportar os tempos do profiler neste arquivo")
+    parser.add_argument("--profile-format", choices=EXPORT_FORMATS, default="json",
+                        help="csv, json (percentis e amostras) ou chrome (chrome://tracing)")
+    parser.add_argument("--no-gpu-timers", action="store_true",
+                        help="Não medir os passes na GPU (queries GL_TIME_ELAPSED)")
+    parser.add_argument("--width", type=int, default=800, help="Largura da janela ou do FBO")
+    parser.add_argument("--height", type=int, default=600, help="Altura da janela ou do FBO")
+    parser.add_argument("--stream-budget", type=float, default=STREAM_BUDGET_BYTES / 2**20,
+                        help="MB de níveis de mipmap enviados à GPU por frame pelo streaming")
+    parser.add_argument("--terrain-chunks", type=int, default=MAX_CHUNKS,
+                        help="Orçamento de chunks do terreno cube-sphere da Terra e da Lua (0 desliga)")
+    parser.add_argument("--vertex-format", choices=VERTEX_FORMATS, default="packed",
+                        help="Layout dos vértices das esferas do LOD: 14 floats ou compacto (20 bytes)")
+    parser.add_argument("--no-indirect", action="store_true",
+                        help="Desenhar a arena de malhas sem glMultiDrawElementsIndirect (caminho GL 3.3)")
+    parser.add_argument("--lights", type=int, default=0,
+                        help="Luzes pontuais coloridas em órbita do Sol (clustered forward shading)")
+    parser.add_argument("--naive-lights", action="store_true",
+                        help="Percorrer todas as luzes pontuais em cada fragmento, sem clusters")
+    parser.add_argument("--ephemeris", type=float, default=0.0, metavar="ANOS",
+                        help="Órbitas de tabelas de Chebyshev pré-calculadas para os primeiros ANOS (0 desliga)")
+    parser.add_argument("--ephemeris-workers", type=int, default=None,
+                        help="Processos que ajustam as tabelas das efemérides (padrão: um por CPU)")
+    parser.add_argument("--epoch", type=float, default=0.0, metavar="ANOS",
+                        help="Instante inicial das órbitas na linha do tempo")
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE,
+                        help="Ticks por segundo da simulação em passo fixo (órbitas e câmera)")
+
+    replay = parser.add_argument_group("execução reproduzível (benchmark, headless)")
+    replay.add_argument("--benchmark", action="store_true",
+                        help="Relógio fixo, sem limite de FPS e sem entrada ao vivo; encerra após --frames")
+    replay.add_argument("--scenario", choices=sorted(SCENARIOS),
+                        help="Cena e caminho de câmera roteirizado (define --asteroids)")
+    replay.add_argument("--replay", default=None, help="Reproduzir a entrada gravada com --record")
+    replay.add_argument("--record", default=None, help="Gravar a entrada (teclado e mouse) neste arquivo")
+    replay.add_argument("--report", default=None,
+                        help="Gravar um relatório JSON (percentis do frame, fases da inicialização, memória)")
+    replay.add_argument("--frames", type=int, default=300,
+                        help="Número de frames a renderizar (headless e benchmark)")
+    replay.add_argument("--frame-step", type=float, default=1.0 / 60.0,
+                        help="Passo fixo do relógio da simulação por frame (segundos)")
+
+    headless = parser.add_argument_group("modo headless (sem janela, ex.: Mesa llvmpipe)")
+    headless.add_argument("--headless", action="store_true",
+                          help="Renderizar num FBO, sem janela, e gravar os frames em disco")
+    headless.add_argument("--gl-backend", choices=BACKENDS, default="egl",
+                          help="Contexto sem janela: EGL surfaceless ou OSMesa")
+    headless.add_argument("--no-save", action="store_true",
+                          help="Não ler nem gravar os frames (só glFinish ao fim de cada frame)")
+    headless.add_argument("--output", default="frames", help="Diretório dos frames gravados")
+    headless.add_argument("--format", choices=["png", "raw"], default="png",
+                          help="png ou raw (RGBA8 sem cabeçalho, ver sequence.json)")
+    headless.add_argument("--pbo-count", type=int, choices=[2, 3], default=PBO_COUNT,
+                          help="Tamanho do anel de PBOs da leitura assíncrona")
+    return parser.parse_args()
+
+
+def create_asteroid_belt(count, parent, texture_id, normal_map_id, seed=0):
+    """
+    Cria 'count' asteroides pequenos orbitando 'parent' entre 6 e 10 unidades.
+    Usa um gerador com semente para que a cena seja sempre a mesma.
+    """
+    rng = np.random.default_rng(seed)
+    radii = rng.uniform(0.02, 0.06, count)
+    orbit_radii = rng.uniform(6.0, 10.0, count)
+    # Terceira lei de Kepler (aprox.): velocidade angular ~ r^-1.5, relativa à Terra (r = 4)
+    orbit_speeds = EARTH_ORBITAL_SPEED * (orbit_radii / 4.0) ** -1.5
+    rotation_speeds = rng.uniform(-2.0, 2.0, count) * EARTH_ROTATION_SPEED
+    phases = rng.uniform(0.0, 360.0, count)
+    eccentricities = rng.uniform(0.0, 0.2, count)
+    inclinations = rng.uniform(0.0, 10.0, count)
+    nodes = rng.uniform(0.0, 360.0, count)
+    periapses = rng.uniform(0.0, 360.0, count)
+
+    asteroids = []
+    for i in range(count):
+        asteroid = Planet(
+            radius=float(radii[i]),
+            rotation_speed=float(rotation_speeds[i]),
+            orbit_radius=float(orbit_radii[i]),
+            orbit_speed=float(orbit_speeds[i]),
+            parent=parent,
+            texture_id=texture_id,
+            normal_map_id=normal_map_id,
+            eccentricity=float(eccentricities[i]),
+            inclination=float(inclinations[i]),
+            ascending_node=float(nodes[i]),
+            periapsis=float(periapses[i]),
+        )
+        # Fase inicial da órbita: espalhar os asteroides ao longo do anel
+        asteroid.orbit_phase = float(phases[i])
+        asteroids.append(asteroid)
+    return asteroids
+
+
+def peak_memory_mb():
+    """Pico de memória residente do processo em MB (None se a plataforma não informar)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def write_report(path, args, profiler, startup, frames, streamer, terrains, lod, lighting, ephemeris):
+    """Relatório do benchmark em JSON: percentis do frame e dos escopos, inicialização e memória."""
+    summary = profiler.summary()
+    report = {
+        "scenario": args.scenario,
+        "replay": args.replay,
+        "headless": args.headless,
+        "resolution": [args.width, args.height],
+        "frame_step": args.frame_step,
+        "frames": frames,
+        "renderer": glGetString(GL_RENDERER).decode(),
+        "frame_ms": summary.get("cpu:frame"),
+        "scopes": summary,
+        "startup_s": startup,
+        "shader_cache": {
+            "hits": shader_cache().hits,
+            "misses": shader_cache().misses,
+            "rejected": shader_cache().rejected,
+            "time_saved_s": shader_cache().time_saved,
+        },
+        "meshes": {
+            "vertex_format": lod.vertex_format,
+            "lod_vertex_bytes": lod.vertex_bytes,
+            "cache_hits": mesh_cache().hits,
+            "cache_misses": mesh_cache().misses,
+            "optimization": mesh_cache().optimization,
+            "arena": lod.arena.metrics(),
+        },
+        "texture_streaming": streamer.metrics(),
+        "lighting": lighting.metrics(),
+        "ephemeris": None if ephemeris is None else ephemeris.metrics(),
+        "terrain": {terrain.name: terrain.metrics() for terrain in terrains.values()},
+        "peak_memory_mb": peak_memory_mb(),
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
 
 def main():
-    pygame.init()
-    display = (800, 600)
-    pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
-    pygame.display.set_caption("Sistema Solar - Fase 1: Esfera com Textura")
+    start_time = perf_counter()
+    startup = {}  # segundos desde o início até o fim de cada fase
+
+    args = parse_args()
+    scenario = SCENARIOS[args.scenario] if args.scenario else None
+    if scenario is not None:
+        args.asteroids = scenario.asteroids
+    # Relógio fixo e sequência determinística de frames
+    fixed_clock = args.headless or args.benchmark
+    display = (args.width, args.height)
+    if args.headless:
+        # Sem janela: contexto EGL/OSMesa e um FBO do tamanho pedido
+        destroy_context = create_context(args.gl_backend)
+        target = OffscreenTarget(*display)
+        target.bind()
+        save_frames = not args.no_save
+        if save_frames:
+            readback = PBOReadback(*display, count=args.pbo_count)
+            writer = FrameWriter(args.output, args.format,
+                                 metadata={"frame_step": args.frame_step})
+    else:
+        pygame.init()
+        pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
+        pygame.display.set_caption("Sistema Solar - Fase 1: Esfera com Textura")
+        glViewport(0, 0, *display)
 
-    glViewport(0, 0, 800, 600)
     glEnable(GL_DEPTH_TEST)
-    # Capturar mouse para controle FPS: ocultar cursor e prender dentro da janela
-    pygame.mouse.set_visible(False)
-    pygame.event.set_grab(True)
-    # Limpar movimento relativo inicial
-    pygame.mouse.get_rel()
+    startup["context"] = perf_counter() - start_time
+    if not args.headless:
+        # Capturar mouse para controle FPS: ocultar cursor e prender dentro da janela
+        pygame.mouse.set_visible(False)
+        pygame.event.set_grab(True)
+        # Limpar movimento relativo inicial
+        pygame.mouse.get_rel()
 
     try:
         shader = load_shader("shaders/basic.vert", "shaders/basic.frag")
+        instanced_shader = load_shader("shaders/basic_instanced.vert", "shaders/basic.frag")
         glUseProgram(shader)
+        startup["shaders"] = perf_counter() - start_time
     except Exception as e:
         print(e)
-        pygame.quit()
-        return
-
-    # Carregar Texturas (Certifique-se que as imagens estão em 'assets/textures/')
-    try:
-        sun_tex = load_texture("assets/textures/sun.png")
-        earth_tex = load_texture("assets/textures/earth.jpg")
-        moon_tex = load_texture("assets/textures/moon.jpg")
-    except FileNotFoundError as e:
-        print(f"ERRO: Não foi possível carregar a textura. Verifique o caminho: {e}")
-        pygame.quit()
+        if not args.headless:
+            pygame.quit()
         return
 
-    # Carregar Normal Maps (Opcional - se não existirem, usaremos normal padrão)
-    sun_normal = None
-    earth_normal = None
-    moon_normal = None
-    
-    try:
-        sun_normal = load_texture("assets/textures/sun_normal.png")
-        print("Normal map do Sol carregado com sucesso")
-    except FileNotFoundError:
-        print("Normal map do Sol não encontrado - usando normal padrão")
-
-    try:
-        earth_normal = load_texture("assets/textures/earth_normal.jpg")
-        print("Normal map da Terra carregado com sucesso")
-    except FileNotFoundError:
-        print("Normal map da Terra não encontrado - usando normal padrão")
-
-    try:
-        moon_normal = load_texture("assets/textures/moon_normal.jpg")
-        print("Normal map da Lua carregado com sucesso")
-    except FileNotFoundError:
-        print("Normal map da Lua não encontrado - usando normal padrão")
-
-    # Gerar Malha da Esfera
-    sphere_verts, sphere_inds = generate_sphere(radius=1.0, stacks=30, sectors=30)
-
-    # Configurar Buffers (VAO, VBO, EBO)
-    VAO = glGenVertexArrays(1)
-    VBO = glGenBuffers(1)
-    EBO = glGenBuffers(1)
-
-    glBindVertexArray(VAO)
-
-    # VBO: Envia os dados dos vértices
-    glBindBuffer(GL_ARRAY_BUFFER, VBO)
-    glBufferData(GL_ARRAY_BUFFER, sphere_verts.nbytes, sphere_verts, GL_STATIC_DRAW)
-
-    # EBO: Envia os índices
-    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, EBO)
-    glBufferData(
-        GL_ELEMENT_ARRAY_BUFFER, sphere_inds.nbytes, sphere_inds, GL_STATIC_DRAW
-    )
-
-    # Configurar os Atributos (Layout do Vertex Shader)
-    # Novo formato: 14 floats por vértice [x,y,z, u,v, nx,ny,nz, tx,ty,tz, bx,by,bz]
-    stride = 14 * 4  # 14 floats * 4 bytes
-
-    # Local 0: Posição (x, y, z) - Offset 0
-    glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
-    glEnableVertexAttribArray(0)
-
-    # Local 1: TexCoord (u, v) - Offset de 3 floats (12 bytes)
-    glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * 4))
-    glEnableVertexAttribArray(1)
-
-    # Local 2: Normal (nx, ny, nz) - Offset de 5 floats (20 bytes)
-    glVertexAttribPointer(2, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(5 * 4))
-    glEnableVertexAttribArray(2)
-
-    # Local 3: Tangent (tx, ty, tz) - Offset de 8 floats (32 bytes)
-    glVertexAttribPointer(3, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(8 * 4))
-    glEnableVertexAttribArray(3)
-
-    # Local 4: Bitangent (bx, by, bz) - Offset de 11 floats (44 bytes)
-    glVertexAttribPointer(4, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(11 * 4))
-    glEnableVertexAttribArray(4)
+    # Carregamento assíncrono: as texturas reais chegam depois, cada corpo começa
+    # com uma textura 1x1 provisória e a janela já renderiza no primeiro frame
+    loader = AsyncLoader()
+    placeholder_tex = create_placeholder_texture()
+    black_tex = create_placeholder_texture((0, 0, 0, 255))
+
+    # Gerar a cadeia de esferas do LOD (ou carregar do cache em disco) e criar os buffers
+    # Só o nível mais simples é criado agora; os outros chegam pelo carregador
+    lod = LODSelector(vertex_format=args.vertex_format, indirect=False if args.no_indirect else None)
+    lod.build(resolutions=[lod.resolutions[0]])
+    for index, resolution in enumerate(lod.resolutions[1:], start=1):
+        loader.request_mesh(
+            lod.generator,
+            lambda mesh, index=index: lod.set_level(index, *mesh),
+            radius=1.0, stacks=int(resolution), sectors=int(resolution),
+        )
+    frame_stats = FrameStats()
 
     # Instanciar Câmera com controle FPS
     # Ajustei a sensibilidade do mouse para 0.15 (graus por pixel) para resposta mais perceptível
-    camera = Camera(position=glm.vec3(0, 0, 8), fov=45.0, aspect_ratio=800/600, speed=8.0, mouse_sensitivity=0.15)
+    camera = Camera(position=glm.vec3(0, 0, 8), fov=45.0, aspect_ratio=display[0] / display[1], speed=8.0, mouse_sensitivity=0.15)
 
-    # Obter localizações Uniforms
-    model_loc = glGetUniformLocation(shader, "model")
-    view_loc = glGetUniformLocation(shader, "view")
-    proj_loc = glGetUniformLocation(shader, "projection")
+    # Obter localizações Uniforms (câmera e luz ficam nos UBOs FrameData e LightData;
+    # model, isSun e useNormalMap são enviadas pela RenderQueue)
     tex_loc = glGetUniformLocation(shader, "textureSampler")  # Localização da sampler
     normal_map_loc = glGetUniformLocation(shader, "normalMapSampler")  # Localização do normal map
 
-    # Obter localizações Uniforms de Iluminação
-    lightPos_loc = glGetUniformLocation(shader, "lightPos")
-    viewPos_loc = glGetUniformLocation(shader, "viewPos")
-    lightColor_loc = glGetUniformLocation(shader, "lightColor")
-    ambientStrength_loc = glGetUniformLocation(shader, "ambientStrength")
-    isSun_loc = glGetUniformLocation(shader, "isSun")
-    useNormalMap_loc = glGetUniformLocation(shader, "useNormalMap")  # Flag para usar normal map
-
     # Configurações de Luz (Sol) e Ambiente
     light_pos = glm.vec3(0.0, 0.0, 0.0)  # O Sol está na origem
     light_color = glm.vec3(1.0, 1.0, 1.0)  # Luz branca
     ambient_strength = 0.25  # Diminuímos a luz ambiente para realçar o efeito difuso
 
-    # Enviar Uniforms de Luz (Estáticas)
-    glUniform3fv(lightPos_loc, 1, glm.value_ptr(light_pos))
-    glUniform3fv(lightColor_loc, 1, glm.value_ptr(light_color))
-    glUniform1f(ambientStrength_loc, ambient_strength)
+    # Blocos uniform compartilhados (pontos de ligação fixos): a luz é enviada uma vez,
+    # a câmera uma vez por frame, com um glBufferSubData cada
+    frame_ubo = FrameUniforms()
+    light_ubo = LightUniforms()
+    light_ubo.update(light_pos, light_color, ambient_strength)
+
+    # Luzes pontuais além do Sol, distribuídas por clusters do frustum a cada frame
+    point_lights = PointLights.random(args.lights)
+    lighting = ClusteredLighting(display, camera.near, camera.far, naive=args.naive_lights)
+    for program in (shader, instanced_shader):
+        lighting.attach(program)
 
-    # Enviar Projeção (estática)
+    # Projeção (estática)
     projection = camera.get_projection()
-    glUniformMatrix4fv(proj_loc, 1, GL_FALSE, glm.value_ptr(projection))
 
-    # Inicializar Clock para delta time
-    clock = pygame.time.Clock()
+    # Samplers do shader instanciado
+    glUseProgram(instanced_shader)
+    glUniform1i(glGetUniformLocation(instanced_shader, "textureSampler"), 0)
+    glUniform1i(glGetUniformLocation(instanced_shader, "normalMapSampler"), 1)
+    glUseProgram(shader)
+
+    # Inicializar Clock para delta time (no modo headless o relógio avança um passo fixo por frame)
+    clock = None if args.headless else pygame.time.Clock()
 
     # Estado do controle do mouse (prendido / liberado). TAB alterna.
     mouse_enabled = True
@@ -173,11 +343,21 @@ def main():
     glUniform1i(normal_map_loc, 1) # Normal map na unidade 1
 
     # Criar e configurar Skybox
-    skybox = Skybox(radius=200.0, stacks=20, sectors=20)
-    skybox_shader = load_shader("shaders/skybox.vert", "shaders/skybox.frag")
-    starfield_texture = generate_starfield_texture(width=1024, height=1024, star_density=0.01)
+    skybox = Skybox(radius=200.0, stacks=20, sectors=20, mode=args.skybox)
+    skybox_shader = load_shader(*SKYBOX_SHADERS[args.skybox])
     skybox.set_shader(skybox_shader)
-    skybox.set_texture(starfield_texture)
+    print(shader_cache().summary())
+    for program in (shader, instanced_shader, skybox_shader):
+        attach_uniform_blocks(program, frame_ubo, light_ubo)
+    if args.measure_sky:
+        skybox.enable_query(None if args.measure_sky == "auto" else args.measure_sky)
+    sky_params = dict(width=args.sky_size, height=args.sky_size, star_density=0.01, seed=args.sky_seed)
+    if skybox.mode == "cubemap":
+        # Sem textura o Skybox não é desenhado (o fundo fica preto até o cubemap chegar)
+        loader.request_starfield_cubemap(skybox.set_texture, **sky_params)
+    else:
+        skybox.set_texture(black_tex)
+        loader.request_starfield(skybox.set_texture, **sky_params)
 
     # Instanciar os Corpos Celestes com velocidades baseadas em períodos reais
     sun = Planet(
@@ -186,8 +366,8 @@ def main():
         orbit_radius=0.0,
         orbit_speed=0.0,
         parent=None,
-        texture_id=sun_tex,
-        normal_map_id=sun_normal,
+        texture_id=placeholder_tex,
+        normal_map_id=None,
     )
 
     earth = Planet(
@@ -196,8 +376,10 @@ def main():
         orbit_radius=4.0,
         orbit_speed=EARTH_ORBITAL_SPEED,
         parent=sun,
-        texture_id=earth_tex,
-        normal_map_id=earth_normal,
+        texture_id=placeholder_tex,
+        normal_map_id=None,
+        eccentricity=EARTH_ECCENTRICITY,
+        periapsis=EARTH_PERIHELION,
     )
 
     moon = Planet(
@@ -206,109 +388,403 @@ def main():
         orbit_radius=1.0,
         orbit_speed=MOON_ORBITAL_SPEED,
         parent=earth,
-        texture_id=moon_tex,
-        normal_map_id=moon_normal,
+        texture_id=placeholder_tex,
+        normal_map_id=None,
+        eccentricity=MOON_ECCENTRICITY,
+        inclination=MOON_INCLINATION,
     )
 
     all_planets = [sun, earth, moon]
+    asteroids = []
+    if args.asteroids > 0:
+        asteroids = create_asteroid_belt(args.asteroids, sun, placeholder_tex, None)
+        all_planets += asteroids
+        print(f"Cena de estresse: {len(all_planets)} corpos")
+
+    # Trocar a textura provisória pela real quando o envio terminar
+    materials_dirty = [False]
+
+    def assign(bodies, attribute):
+        def on_ready(texture_id):
+            for body in bodies:
+                setattr(body, attribute, texture_id)
+            materials_dirty[0] = True
+        return on_ready
+
+    # Streaming de mipmaps: cada textura chega só com os níveis pequenos e os maiores
+    # são enviados conforme o tamanho na tela dos corpos que a usam
+    streamer = TextureStreamer(upload_budget=int(args.stream_budget * 2**20), synchronous=fixed_clock)
+    index_of = {id(body): i for i, body in enumerate(all_planets)}
+
+    def stream(texture_path, bodies, attribute):
+        owners = [index_of[id(body)] for body in bodies]
+        streamer.request(loader, texture_path, owners, assign(bodies, attribute))
+
+    stream("assets/textures/sun.png", [sun], "texture_id")
+    stream("assets/textures/earth.jpg", [earth], "texture_id")
+    stream("assets/textures/moon.jpg", [moon] + asteroids, "texture_id")
+    # Normal maps são opcionais: se não existirem, o corpo continua com a normal padrão
+    stream("assets/textures/sun_normal.png", [sun], "normal_map_id")
+    stream("assets/textures/earth_normal.jpg", [earth], "normal_map_id")
+    stream("assets/textures/moon_normal.jpg", [moon] + asteroids, "normal_map_id")
+
+    # Motor de transformações em lote: cada Planet vira uma visão sobre uma linha do grafo
+    scene = SceneGraph(all_planets)
+    # Culling hierárquico: a esfera de cada corpo envolve as órbitas das suas luas
+    culler = FrustumCuller(scene)
+    toggle_freeze = False
+
+    # Efemérides: órbitas de tabelas de Chebyshev (do cache, ou ajustadas agora com um
+    # pool de processos); fora do intervalo coberto volta ao propagador kepleriano
+    ephemeris = None
+    if args.ephemeris > 0:
+        ephemeris = load_or_build(scene, 0.0, args.ephemeris * YEAR, workers=args.ephemeris_workers)
+        scene.set_ephemeris(ephemeris)
+        source = f"ajustadas em {ephemeris.build_time:.2f} s" if ephemeris.build_time else "do cache"
+        print(f"Efemérides: {ephemeris.count} corpos, {args.ephemeris:g} anos, "
+              f"{ephemeris.nbytes / 2**20:.1f} MB ({source})")
+        startup["ephemeris"] = perf_counter() - start_time
+
+    # Vistos de perto, Terra e Lua viram cube-sphere com quadtree de chunks (ver terrain.py)
+    terrains = {}
+    if args.terrain_chunks > 0:
+        for body, name in ((earth, "earth"), (moon, "moon")):
+            terrains[all_planets.index(body)] = CubeSphereTerrain(
+                name, max_chunks=args.terrain_chunks, synchronous=fixed_clock)
+
+    # Simulação em passo fixo com câmera própria; o renderizador interpola os snapshots.
+    # Com relógio fixo os ticks rodam nesta thread (frames reproduzíveis), senão numa thread própria
+    sim_camera = Camera(position=glm.vec3(camera.position), fov=camera.fov, aspect_ratio=camera.aspect_ratio,
+                        speed=camera.speed, mouse_sensitivity=camera.mouse_sensitivity)
+    sim = Simulation(scene, sim_camera, tick_rate=args.tick_rate, epoch=args.epoch * YEAR)
+
+    # Caminho instanciado: um glDrawElementsInstanced por (nível de LOD, material)
+    instanced = InstancedRenderer(instanced_shader)
+    materials, material_indices = build_materials(all_planets, sun=sun)
+    use_instancing = not args.no_instancing
+    render_queue = RenderQueue()
+
+    # Profiler: escopos de CPU e queries de tempo de GPU por passe; F3 mostra o overlay.
+    # Só uma query GL_TIME_ELAPSED pode estar ativa: --measure-sky gpu_ns desliga as do profiler
+    profiler = Profiler(gpu=not args.no_gpu_timers and skybox.query_kind != "gpu_ns")
+    gpu_pass = lambda pass_: profiler.gpu_switch(None if pass_ is None else PASS_NAMES[pass_])
+    overlay = None
+    show_overlay = False
+    frame_time_total = 0.0
+    loading_reported = False
+
+    # Entrada roteirizada/gravada: caminho de câmera do cenário, reprodução ou gravação
+    followed = {"sun": sun, "earth": earth, "moon": moon}
+    follow_row = None
+    if scenario is not None and scenario.follow is not None:
+        follow_row = all_planets.index(followed[scenario.follow])
+    replay = InputReplay(args.replay) if args.replay else None
+    recorder = InputRecorder() if args.record else None
+    replay_clock = 0.0
+    startup["scene"] = perf_counter() - start_time
+
+    if fixed_clock:
+        # Frames reproduzíveis: a cena inteira já está na GPU antes do primeiro frame
+        loader.wait()
+        materials, material_indices = build_materials(all_planets, sun=sun)
+        materials_dirty[0] = False
+        startup["assets"] = perf_counter() - start_time
+    else:
+        sim.start()
+
     # Loop Principal
-    running = True
+    running = not fixed_clock or args.frames > 0
     while running:
-        # Calcular delta time
-        delta_time = clock.tick(60) / 1000.0
-        
-        # Capturar eventos
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT or (
-                event.type == KEYDOWN and event.key == K_ESCAPE
-            ):
-                running = False
-
-            # Alternar captura do mouse com TAB (prender/soltar)
-            if event.type == KEYDOWN and event.key == K_TAB:
-                mouse_enabled = not mouse_enabled
+        if fixed_clock:
+            # Relógio fixo: a sequência é a mesma a cada execução (e sem o limite de 60 FPS)
+            delta_time = args.frame_step
+            time = frame_stats.frame * args.frame_step
+            if clock is not None:
+                clock.tick()
+        else:
+            # Calcular delta time
+            delta_time = clock.tick(60) / 1000.0
+            time = pygame.time.get_ticks() / 1000.0
+        profiler.begin_frame()  # depois da espera do tick(60)
+
+        # Enviar à GPU o que as threads de trabalho já prepararam (limitado por frame)
+        with profiler.cpu("loader.pump"):
+            loader.pump()
+        if materials_dirty[0]:
+            materials, material_indices = build_materials(all_planets, sun=sun)
+            materials_dirty[0] = False
+
+        if args.headless:
+            keys, mouse_delta = NO_KEYS, (0, 0)
+        else:
+            with profiler.cpu("input"):
+                # Capturar eventos
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT or (
+                        event.type == KEYDOWN and event.key == K_ESCAPE
+                    ):
+                        running = False
+
+                    # Alternar captura do mouse com TAB (prender/soltar)
+                    if event.type == KEYDOWN and event.key == K_TAB:
+                        mouse_enabled = not mouse_enabled
+                        if mouse_enabled:
+                            pygame.mouse.set_visible(False)
+                            pygame.event.set_grab(True)
+                            # limpar delta residual
+                            pygame.mouse.get_rel()
+                        else:
+                            pygame.mouse.set_visible(True)
+                            pygame.event.set_grab(False)
+                            pygame.mouse.get_rel()
+
+                    # Alternar entre o caminho instanciado e o laço por objeto com I
+                    if event.type == KEYDOWN and event.key == K_i:
+                        use_instancing = not use_instancing
+                        frame_time_total = 0.0
+
+                    # Congelar/descongelar o frustum do culling com F (depuração)
+                    if event.type == KEYDOWN and event.key == K_f:
+                        toggle_freeze = True
+
+                    # Linha do tempo: PageUp/PageDown pulam um ano, Home volta à época 0
+                    if event.type == KEYDOWN and event.key in (K_PAGEUP, K_PAGEDOWN):
+                        sim.scrub(YEAR if event.key == K_PAGEUP else -YEAR)
+                    if event.type == KEYDOWN and event.key == K_HOME:
+                        sim.seek(0.0)
+
+                    # Mostrar/ocultar o overlay do profiler com F3
+                    if event.type == KEYDOWN and event.key == K_F3:
+                        show_overlay = not show_overlay
+                        if overlay is None:
+                            overlay = TextOverlay(display)
+
+                # Capturar entrada (teclado e mouse)
+                keys_pressed = pygame.key.get_pressed()
+                # '.' e ',' seguradas percorrem a linha do tempo para frente e para trás
+                scrub = keys_pressed[K_PERIOD] - keys_pressed[K_COMMA]
+                if scrub:
+                    sim.scrub(scrub * SCRUB_SPEED * YEAR * delta_time)
+                keys = {
+                    'w': keys_pressed[K_w],
+                    's': keys_pressed[K_s],
+                    'a': keys_pressed[K_a],
+                    'd': keys_pressed[K_d],
+                    'up': keys_pressed[K_UP],
+                    'down': keys_pressed[K_DOWN],
+                    'left': keys_pressed[K_LEFT],
+                    'right': keys_pressed[K_RIGHT],
+                }
+                # Obter delta do mouse apenas se o mouse estiver habilitado
                 if mouse_enabled:
-                    pygame.mouse.set_visible(False)
-                    pygame.event.set_grab(True)
-                    # limpar delta residual
-                    pygame.mouse.get_rel()
+                    mouse_delta = pygame.mouse.get_rel()
                 else:
-                    pygame.mouse.set_visible(True)
-                    pygame.event.set_grab(False)
+                    # consumir movimento, garantir zeros
                     pygame.mouse.get_rel()
-        
-        # Capturar entrada (teclado e mouse)
-        keys_pressed = pygame.key.get_pressed()
-        keys = {
-            'w': keys_pressed[K_w],
-            's': keys_pressed[K_s],
-            'a': keys_pressed[K_a],
-            'd': keys_pressed[K_d],
-            'up': keys_pressed[K_UP],
-            'down': keys_pressed[K_DOWN],
-            'left': keys_pressed[K_LEFT],
-            'right': keys_pressed[K_RIGHT],
-        }
-        # Obter delta do mouse apenas se o mouse estiver habilitado
-        if mouse_enabled:
-            mouse_delta = pygame.mouse.get_rel()
-        else:
-            # consumir movimento, garantir zeros
-            pygame.mouse.get_rel()
-            mouse_delta = (0, 0)
-        
-        # Atualizar câmera
-        camera.update(keys, mouse_delta, delta_time)
-        
-        # Enviar matrizes de câmera atualizadas
-        view = camera.get_view()
-        glUniformMatrix4fv(view_loc, 1, GL_FALSE, glm.value_ptr(view))
-        
-        # Enviar posição da câmera para o cálculo de iluminação Phong
-        glUniform3fv(viewPos_loc, 1, glm.value_ptr(camera.position))
-        
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        # Atualizar a Model Matrix (Rotação e Translação)
-        time = pygame.time.get_ticks() / 1000.0
-
-        # Renderizar Skybox primeiro
-        skybox.render(view, projection, camera.position)
-        
-        # Voltar ao shader principal para renderizar planetas
-        glUseProgram(shader)
-
-        for planet in all_planets:
-            # 1. Definir se o objeto é o Sol ou um Planeta
-            if planet == sun:
-                glUniform1i(isSun_loc, 1)  # É o Sol (DESLIGA O PHONG)
+                    mouse_delta = (0, 0)
+
+        if replay is not None:
+            delta_time, keys, mouse_delta = replay.next(delta_time)
+            if fixed_clock:
+                # A simulação segue os intervalos gravados, não o passo fixo
+                time = replay_clock
+                replay_clock += delta_time
+        elif fixed_clock:
+            keys, mouse_delta = NO_KEYS, (0, 0)
+        if recorder is not None:
+            recorder.add(delta_time, keys, mouse_delta)
+
+        # A simulação (órbitas e câmera) avança em ticks fixos; o frame usa o estado
+        # interpolado entre os dois últimos ticks (arrays na ordem das linhas do grafo)
+        sim.push_input(keys, mouse_delta)
+        with profiler.cpu("simulation"):
+            if fixed_clock:
+                sim.advance_to(time)
+                models, positions = sim.sample(time)
             else:
-                glUniform1i(isSun_loc, 0)  # É um Planeta (LIGA O PHONG)
-
-            planet.update(time)
-
-            # Enviar Model Matrix
-            glUniformMatrix4fv(model_loc, 1, GL_FALSE, glm.value_ptr(planet.model))
-            
-            # Bind da textura difusa (unidade 0)
-            glActiveTexture(GL_TEXTURE0)
-            glBindTexture(GL_TEXTURE_2D, planet.texture_id)
-            
-            # Bind do normal map (unidade 1) - se existir
-            glActiveTexture(GL_TEXTURE1)
-            if planet.normal_map_id is not None:
-                glBindTexture(GL_TEXTURE_2D, planet.normal_map_id)
-                glUniform1i(useNormalMap_loc, 1)  # Usar normal map
+                models, positions = sim.sample()
+                time = sim.render_time
+        matrices = models[scene.rows]
+        centers = positions[scene.rows]
+        radii = scene.radius[scene.rows]
+        if ephemeris is not None or sim.epoch:
+            frame_stats.set("year", round((sim.epoch + sim.sim_time) / YEAR, 2))
+        if not fixed_clock:
+            frame_stats.set("sim_hz", round(sim.measured_rate))
+            frame_stats.set("sim_lag_ms", round(sim.lag * 1000.0, 1))
+
+        # Atualizar câmera: pose interpolada da simulação ou caminho roteirizado
+        with profiler.cpu("camera.update"):
+            if scenario is not None and replay is None:
+                focus = glm.vec3(0.0) if follow_row is None else glm.vec3(*centers[follow_row])
+                scenario.path.apply(camera, time, focus)
             else:
-                glUniform1i(useNormalMap_loc, 0)  # Não usar normal map
-            
-            # Desenhar o planeta
-            glBindVertexArray(VAO)
-            glDrawElements(GL_TRIANGLES, len(sphere_inds), GL_UNSIGNED_INT, None)
+                sim.apply_camera(camera)
+
+        # Enviar matrizes e posição da câmera (usadas por todos os programas) num único UBO
+        with profiler.cpu("uniforms"):
+            view = camera.get_view()
+            frame_ubo.update(view, projection, camera.position, time)
 
-        pygame.display.flip()
+        # Listas de luzes por cluster (CPU) e texture buffers
+        with profiler.cpu("lighting"):
+            point_lights.update(time)
+            lighting.update(view, projection, point_lights)
+            frame_stats.set("lights", lighting.light_count)
+            frame_stats.set("light_refs", lighting.references)
 
-    pygame.quit()
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        # Skybox: a fila o coloca antes (esfera) ou depois (cubemap) dos planetas
+        skybox.submit(render_queue)
+
+        # Frustum culling: só os corpos visíveis seguem para o LOD e o desenho
+        with profiler.cpu("culling"):
+            planes = frustum_planes(projection * view)
+            if toggle_freeze:
+                toggle_freeze = False
+                culler.freeze(None if culler.frozen else planes)
+                print("Frustum congelado" if culler.frozen else "Frustum descongelado")
+            visible = np.flatnonzero(culler.cull(planes, positions)[scene.rows])
+        frame_stats.set("visible", len(visible))
+        frame_stats.set("culled", len(all_planets) - len(visible))
+        matrices, centers, radii = matrices[visible], centers[visible], radii[visible]
+        visible_materials = material_indices[visible]
+
+        # Níveis de mipmap pelo tamanho na tela dos corpos visíveis (envio limitado por frame)
+        with profiler.cpu("streaming"):
+            radius_px = lod.projected_radius(centers, radii, camera, display[1])
+            streamer.update(visible, radius_px, len(all_planets))
+            frame_stats.set("stream_kb", streamer.pump() // 1024)
+        frame_stats.set("tex_resident_kb", streamer.resident_bytes // 1024)
+
+        # Corpos grandes na tela saem da esfera do LOD e são desenhados pelo terreno
+        close = [k for k, index in enumerate(visible)
+                 if index in terrains and radius_px[k] >= CLOSE_RADIUS_PX]
+        if close:
+            with profiler.cpu("terrain"):
+                for k in close:
+                    terrain = terrains[visible[k]]
+                    terrain.update(matrices[k], camera, display[1], planes)
+                    frame_stats.add("terrain_chunks", int(terrain.visible.sum()))
+                    render_queue.submit_callback(PASS_OPAQUE, lambda terrain=terrain, model=matrices[k],
+                                                 material=materials[visible_materials[k]]:
+                                                 terrain.draw(shader, model, material, frame_stats))
+            keep = np.ones(len(visible), dtype=bool)
+            keep[close] = False
+            visible = visible[keep]
+            matrices, centers, radii = matrices[keep], centers[keep], radii[keep]
+            visible_materials = visible_materials[keep]
+
+        # Escolher o nível de detalhe de cada corpo pelo tamanho na tela
+        with profiler.cpu("lod.select"):
+            level_indices = lod.select(scene.rows[visible], centers, radii, camera, display[1],
+                                       scene.count)
+
+        if use_instancing:
+            render_queue.submit_callback(PASS_OPAQUE, lambda: instanced.draw(
+                matrices, lod.arena, lod.levels, level_indices, materials, visible_materials,
+                frame_stats))
+        else:
+            # Um comando por parte da malha de cada corpo (todas na arena do LOD); a fila
+            # ordena por (programa, malha, material, distância) e só troca o estado que muda
+            distances = np.linalg.norm(centers - np.asarray(camera.position), axis=1)
+            parts = [lod.levels[index].mesh.parts for index in level_indices]
+            body = np.repeat(np.arange(len(parts)), [len(p) for p in parts])
+            parts = np.concatenate(parts) if parts else np.zeros((0, 3), dtype=np.int64)
+            render_queue.submit_batch(
+                PASS_OPAQUE, shader, np.full(len(body), lod.arena.VAO), parts[:, 0],
+                [draw_material(material) for material in materials], visible_materials[body],
+                distances[body], matrices[body], np.full(len(body), GL_UNSIGNED_SHORT),
+                parts[:, 1], parts[:, 2],
+            )
+
+        # Cada passe da fila (skybox, planetas) vira um escopo de GPU
+        with profiler.cpu("render"):
+            render_queue.execute(frame_stats, on_pass=gpu_pass)
+        if skybox.last_query_result is not None:
+            frame_stats.set(f"sky_{skybox.query_kind}", skybox.last_query_result)
+
+        if args.headless:
+            if save_frames:
+                # Leitura assíncrona: recebe frames de alguns quadros atrás, já copiados pela GPU
+                with profiler.cpu("readback"), profiler.gpu("readback"):
+                    for done_frame, pixels in readback.read(frame_stats.frame):
+                        writer.write(done_frame, pixels)
+            else:
+                # Sem swap: esperar a GPU para que o tempo do frame inclua a renderização
+                with profiler.cpu("finish"):
+                    glFinish()
+            profiler.end_frame()
+            frame_stats.end_frame()
+            startup.setdefault("first_frame", perf_counter() - start_time)
+            if frame_stats.frame % 60 == 0 or frame_stats.frame == args.frames:
+                print(f"Frame {frame_stats.frame}/{args.frames} | {frame_stats.summary()}")
+            running = frame_stats.frame < args.frames
+            continue
+
+        if show_overlay:
+            if frame_stats.frame % 30 == 0 or overlay.lines is None:
+                terrain_lines = [line for terrain in terrains.values() for line in terrain.report_lines()]
+                overlay.set_text(profiler.report_lines() + [""] + streamer.report_lines() + terrain_lines)
+            overlay.render()
+
+        with profiler.cpu("swap"), profiler.gpu("swap"):
+            pygame.display.flip()
+        profiler.end_frame()
+        frame_stats.end_frame()
+        startup.setdefault("first_frame", perf_counter() - start_time)
+        if args.benchmark and frame_stats.frame >= args.frames:
+            running = False
+        frame_time_total += clock.get_rawtime() / 1000.0  # tempo de trabalho, sem a espera do tick(60)
+
+        loader.mark_first_frame()
+        if loader.done and loader.time_to_fully_loaded is not None and not loading_reported:
+            loading_reported = True
+            print(f"Primeiro frame em {loader.time_to_first_frame:.3f} s, "
+                  f"cena completa em {loader.time_to_fully_loaded:.3f} s "
+                  f"({loader.bytes_uploaded / 2**20:.1f} MB enviados)")
+
+        # Mostrar os contadores do frame no título da janela (a cada ~1 s)
+        if frame_stats.frame % 60 == 0:
+            mode = "instanciado" if use_instancing else "por objeto"
+            frame_ms = frame_time_total / 60 * 1000.0
+            frame_time_total = 0.0
+            loading = "" if loader.done else f"carregando {loader.progress:.0%} | "
+            pygame.display.set_caption(
+                f"Sistema Solar | {loading}{mode}: {frame_ms:.2f} ms/frame | {frame_stats.summary()}"
+            )
+
+    sim.stop()
+    loader.shutdown()
+    streamer.shutdown()
+    for terrain in terrains.values():
+        terrain.shutdown()
+    if recorder is not None:
+        recorder.save(args.record)
+        print(f"Entrada de {len(recorder.frames)} frames gravada em {args.record}")
+    if args.report:
+        profiler.finish()
+        write_report(args.report, args, profiler, startup, frame_stats.frame, streamer, terrains,
+                     lod, lighting, ephemeris)
+        print(f"Relatório gravado em {args.report}")
+    if args.profile_out:
+        profiler.finish()
+        profiler.export(args.profile_out, args.profile_format)
+        print("\n".join(profiler.report_lines()))
+        print(f"Profiler exportado em {args.profile_out} ({args.profile_format})")
+    profiler.delete()
+    if args.headless:
+        if save_frames:
+            for done_frame, pixels in readback.flush():
+                writer.write(done_frame, pixels)
+            writer.close()
+            print(f"{writer.frames_written} frames gravados em {args.output}/")
+            readback.delete()
+        target.delete()
+        destroy_context()
+    else:
+        pygame.quit()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,330 @@
+# mesh_arena.py
+"""
+Arena de geometria estática na GPU: um VBO, um EBO e um VAO para várias malhas.
+
+Cada malha recebe uma faixa de vértices e uma de índices, alocadas por listas
+livres (first-fit, com fusão das faixas vizinhas na liberação); quando não há
+espaço, os buffers dobram de tamanho e o conteúdo é copiado na GPU
+(glCopyBufferSubData). Os índices ficam relativos à malha (uint16) e cada
+desenho usa base vertex e first index:
+
+    malha -> partes [(count, first_index, base_vertex), ...]
+
+Malhas com mais de 65536 vértices viram várias partes, cada uma com índices
+que cabem em 16 bits a partir do seu base vertex (os vértices não são
+duplicados). Um passe inteiro vira comandos (count, instanceCount,
+firstIndex, baseVertex, baseInstance) num array NumPy, enviados com um
+glMultiDrawElementsIndirect (GL 4.3 ou ARB_multi_draw_indirect) ou, no
+GL 3.3, com um glDrawElementsInstancedBaseVertex por comando.
+"""
+import ctypes
+
+import numpy as np
+from OpenGL.GL import (
+    GL_ARRAY_BUFFER, GL_ELEMENT_ARRAY_BUFFER, GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER,
+    GL_DRAW_INDIRECT_BUFFER, GL_STATIC_DRAW, GL_STREAM_DRAW, GL_TRIANGLES, GL_UNSIGNED_SHORT,
+    GL_VERSION, GL_EXTENSIONS, GL_NUM_EXTENSIONS,
+    glGenVertexArrays, glGenBuffers, glBindVertexArray, glBindBuffer, glBufferData,
+    glBufferSubData, glCopyBufferSubData, glDeleteBuffers, glDeleteVertexArrays,
+    glDrawElementsInstancedBaseVertex, glMultiDrawElementsIndirect,
+    glGetString, glGetStringi, glGetIntegerv
+)
+
+from utils import configure_mesh_attributes, VERTEX_STRIDES
+
+INDEX_BYTES = 2  # índices uint16 relativos ao base vertex
+MAX_PART_VERTICES = 65536
+COMMAND_FIELDS = 5  # count, instanceCount, firstIndex, baseVertex, baseInstance
+COMMAND_BYTES = COMMAND_FIELDS * 4
+
+
+def supports_multi_draw_indirect():
+    """True se o contexto atual tem glMultiDrawElementsIndirect com base instance."""
+    version = glGetString(GL_VERSION).decode().split()[0].split(".")
+    if (int(version[0]), int(version[1])) >= (4, 3):
+        return bool(glMultiDrawElementsIndirect)
+    extensions = {glGetStringi(GL_EXTENSIONS, i).decode()
+                  for i in range(glGetIntegerv(GL_NUM_EXTENSIONS))}
+    return ({"GL_ARB_multi_draw_indirect", "GL_ARB_base_instance"} <= extensions
+            and bool(glMultiDrawElementsIndirect))
+
+
+class RangeAllocator:
+    """Alocador de faixas [offset, offset + size) com lista livre ordenada por offset."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.free_ranges = [(0, capacity)]
+
+    def allocate(self, size):
+        """Offset da primeira faixa livre com 'size' unidades, ou None."""
+        for i, (offset, free) in enumerate(self.free_ranges):
+            if free >= size:
+                if free == size:
+                    del self.free_ranges[i]
+                else:
+                    self.free_ranges[i] = (offset + size, free - size)
+                return offset
+        return None
+
+    def release(self, offset, size):
+        """Devolve a faixa à lista livre, fundindo com as vizinhas."""
+        ranges = self.free_ranges
+        i = 0
+        while i < len(ranges) and ranges[i][0] < offset:
+            i += 1
+        ranges.insert(i, (offset, size))
+        if i + 1 < len(ranges) and offset + size == ranges[i + 1][0]:
+            ranges[i] = (offset, size + ranges[i + 1][1])
+            del ranges[i + 1]
+        if i > 0 and ranges[i - 1][0] + ranges[i - 1][1] == offset:
+            ranges[i - 1] = (ranges[i - 1][0], ranges[i - 1][1] + ranges[i][1])
+            del ranges[i]
+
+    def grow(self, capacity):
+        """Aumenta a capacidade; o espaço novo entra no fim da lista livre."""
+        old = self.capacity
+        self.capacity = capacity
+        self.release(old, capacity - old)
+
+    @property
+    def used(self):
+        return self.capacity - sum(size for _, size in self.free_ranges)
+
+
+def split_parts(indices):
+    """
+    Divide os índices (globais da malha) em partes cujos índices, relativos ao
+    menor vértice da parte, cabem em uint16. Os triângulos seguem em ordem.
+
+    Returns:
+        (índices relativos uint16, partes (P, 3) = [count, first, base] relativos à malha)
+    """
+    tris = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    low, high = tris.min(axis=1), tris.max(axis=1)
+    if len(tris) == 0 or high.max() - low.min() < MAX_PART_VERTICES:
+        base = int(low.min()) if len(tris) else 0
+        return (tris.ravel() - base).astype(np.uint16), np.array([[tris.size, 0, base]])
+
+    parts = []
+    start, part_low, part_high = 0, int(low[0]), int(high[0])
+    for t, (tri_low, tri_high) in enumerate(zip(low.tolist(), high.tolist())):
+        new_low, new_high = min(part_low, tri_low), max(part_high, tri_high)
+        if new_high - new_low >= MAX_PART_VERTICES:
+            parts.append((start, t, part_low))
+            start, new_low, new_high = t, tri_low, tri_high
+        part_low, part_high = new_low, new_high
+    parts.append((start, len(tris), part_low))
+
+    local = np.empty(tris.size, dtype=np.uint16)
+    table = []
+    for first, last, base in parts:
+        local[first * 3:last * 3] = (tris[first:last] - base).ravel()
+        table.append((3 * (last - first), 3 * first, base))
+    return local, np.array(table, dtype=np.int64)
+
+
+class ArenaMesh:
+    """Uma malha dentro da MeshArena: faixas alocadas e partes do desenho (offsets absolutos)."""
+
+    __slots__ = ("vertex_offset", "vertex_count", "index_offset", "index_count", "parts")
+
+    def __init__(self, vertex_offset, vertex_count, index_offset, index_count, parts):
+        self.vertex_offset = vertex_offset
+        self.vertex_count = vertex_count
+        self.index_offset = index_offset
+        self.index_count = index_count
+        self.parts = parts  # (P, 3): count, first_index, base_vertex na arena
+
+    @property
+    def triangle_count(self):
+        return self.index_count // 3
+
+
+class MeshArena:
+    """
+    VBO + EBO compartilhados por malhas de um mesmo layout de vértice, com um VAO
+    e um buffer de comandos indiretos. Requer contexto OpenGL.
+    """
+
+    def __init__(self, vertex_format, vertex_capacity=1 << 16, index_capacity=1 << 18,
+                 indirect=None):
+        """
+        Args:
+            vertex_format: Layout dos vértices (utils.VERTEX_FORMATS)
+            vertex_capacity: Vértices alocados de início (o buffer cresce se preciso)
+            index_capacity: Índices alocados de início
+            indirect: Usar glMultiDrawElementsIndirect (None: se o contexto suportar)
+        """
+        self.vertex_format = vertex_format
+        self.stride = VERTEX_STRIDES[vertex_format]
+        self.vertices = RangeAllocator(vertex_capacity)
+        self.indices = RangeAllocator(index_capacity)
+        self.indirect = supports_multi_draw_indirect() if indirect is None else indirect
+        self.meshes = 0
+        self.grows = 0
+
+        self.VAO = glGenVertexArrays(1)
+        self.VBO, self.EBO, self.command_buffer = glGenBuffers(3)
+        glBindVertexArray(self.VAO)
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferData(GL_ARRAY_BUFFER, vertex_capacity * self.stride, None, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, index_capacity * INDEX_BYTES, None, GL_STATIC_DRAW)
+        configure_mesh_attributes(vertex_format)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        self.command_capacity = 0
+        self.commands = np.zeros((0, COMMAND_FIELDS), dtype=np.uint32)
+
+    # --- Alocação ---
+
+    def _grow(self, target, allocator, buffer, unit, needed):
+        """Cria um buffer maior, copia o conteúdo na GPU e o liga ao VAO. Retorna o novo ID."""
+        capacity = max(allocator.capacity * 2, allocator.capacity + needed)
+        new_buffer = glGenBuffers(1)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, new_buffer)
+        glBufferData(GL_COPY_WRITE_BUFFER, capacity * unit, None, GL_STATIC_DRAW)
+        glBindBuffer(GL_COPY_READ_BUFFER, buffer)
+        glCopyBufferSubData(GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER, 0, 0,
+                            allocator.capacity * unit)
+        glBindBuffer(GL_COPY_READ_BUFFER, 0)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+        glDeleteBuffers(1, [buffer])
+
+        glBindVertexArray(self.VAO)
+        glBindBuffer(target, new_buffer)
+        if target == GL_ARRAY_BUFFER:
+            configure_mesh_attributes(self.vertex_format)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindVertexArray(0)
+        allocator.grow(capacity)
+        self.grows += 1
+        return new_buffer
+
+    def add(self, vertices, indices):
+        """
+        Copia a malha para a arena.
+
+        Args:
+            vertices: Vértices no layout da arena (qualquer dtype, stride fixo)
+            indices: Índices da malha (uint16 ou uint32, relativos aos seus vértices)
+        Returns:
+            ArenaMesh
+        """
+        vertices = np.ascontiguousarray(vertices)
+        vertex_count = vertices.nbytes // self.stride
+        local, parts = split_parts(indices)
+
+        vertex_offset = self.vertices.allocate(vertex_count)
+        if vertex_offset is None:
+            self.VBO = self._grow(GL_ARRAY_BUFFER, self.vertices, self.VBO, self.stride,
+                                  vertex_count)
+            vertex_offset = self.vertices.allocate(vertex_count)
+        index_offset = self.indices.allocate(len(local))
+        if index_offset is None:
+            self.EBO = self._grow(GL_ELEMENT_ARRAY_BUFFER, self.indices, self.EBO, INDEX_BYTES,
+                                  len(local))
+            index_offset = self.indices.allocate(len(local))
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferSubData(GL_ARRAY_BUFFER, vertex_offset * self.stride, vertices.nbytes, vertices)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        # O EBO é estado do VAO: enviar com o VAO da arena ligado
+        glBindVertexArray(self.VAO)
+        glBufferSubData(GL_ELEMENT_ARRAY_BUFFER, index_offset * INDEX_BYTES, local.nbytes, local)
+        glBindVertexArray(0)
+
+        parts = parts + np.array([0, index_offset, vertex_offset])
+        self.meshes += 1
+        return ArenaMesh(vertex_offset, vertex_count, index_offset, len(local), parts)
+
+    def free(self, mesh):
+        """Devolve as faixas da malha às listas livres."""
+        self.vertices.release(mesh.vertex_offset, mesh.vertex_count)
+        self.indices.release(mesh.index_offset, mesh.index_count)
+        self.meshes -= 1
+
+    # --- Desenho ---
+
+    @staticmethod
+    def build_commands(meshes, instance_counts, base_instances):
+        """
+        Comandos indiretos (K, 5) uint32 para desenhar cada malha com suas instâncias;
+        uma linha por parte de cada malha.
+
+        Args:
+            meshes: Lista de ArenaMesh (R,)
+            instance_counts: Instâncias de cada malha (R,)
+            base_instances: Primeira instância de cada malha no buffer de instâncias (R,)
+        """
+        parts = [mesh.parts for mesh in meshes]
+        repeats = np.array([len(p) for p in parts], dtype=np.int64)
+        table = np.concatenate(parts)
+        commands = np.empty((len(table), COMMAND_FIELDS), dtype=np.uint32)
+        commands[:, 0] = table[:, 0]
+        commands[:, 1] = np.repeat(instance_counts, repeats)
+        commands[:, 2] = table[:, 1]
+        commands[:, 3] = table[:, 2]
+        commands[:, 4] = np.repeat(base_instances, repeats)
+        return commands
+
+    def upload_commands(self, commands):
+        """Envia os comandos do frame (só guardados, no caminho sem draw indirect)."""
+        self.commands = commands
+        if not self.indirect:
+            return
+        glBindBuffer(GL_DRAW_INDIRECT_BUFFER, self.command_buffer)
+        if len(commands) > self.command_capacity:
+            self.command_capacity = max(len(commands), 2 * self.command_capacity)
+            glBufferData(GL_DRAW_INDIRECT_BUFFER, self.command_capacity * COMMAND_BYTES, None,
+                         GL_STREAM_DRAW)
+        glBufferSubData(GL_DRAW_INDIRECT_BUFFER, 0, commands.nbytes, commands)
+        glBindBuffer(GL_DRAW_INDIRECT_BUFFER, 0)
+
+    def draw(self, first, count, set_base_instance=None):
+        """
+        Executa os comandos [first, first + count) do último upload_commands, com o
+        VAO da arena já ligado. Retorna o número de chamadas de desenho emitidas.
+
+        Args:
+            set_base_instance: No caminho sem draw indirect, função chamada com o
+                baseInstance de cada comando (ex.: reapontar os atributos por instância)
+        """
+        if count == 0:
+            return 0
+        if self.indirect:
+            glBindBuffer(GL_DRAW_INDIRECT_BUFFER, self.command_buffer)
+            glMultiDrawElementsIndirect(GL_TRIANGLES, GL_UNSIGNED_SHORT,
+                                        ctypes.c_void_p(first * COMMAND_BYTES), count, 0)
+            glBindBuffer(GL_DRAW_INDIRECT_BUFFER, 0)
+            return 1
+
+        for index_count, instances, first_index, base_vertex, base_instance in \
+                self.commands[first:first + count].tolist():
+            if set_base_instance is not None:
+                set_base_instance(base_instance)
+            glDrawElementsInstancedBaseVertex(
+                GL_TRIANGLES, index_count, GL_UNSIGNED_SHORT,
+                ctypes.c_void_p(first_index * INDEX_BYTES), instances, base_vertex)
+        return count
+
+    # --- Métricas ---
+
+    def metrics(self):
+        """Ocupação dos buffers e fragmentação das listas livres."""
+        return {
+            "indirect": self.indirect,
+            "meshes": self.meshes,
+            "vertex_bytes": [self.vertices.used * self.stride,
+                             self.vertices.capacity * self.stride],
+            "index_bytes": [self.indices.used * INDEX_BYTES,
+                            self.indices.capacity * INDEX_BYTES],
+            "free_ranges": [len(self.vertices.free_ranges), len(self.indices.free_ranges)],
+            "grows": self.grows,
+        }
+
+    def delete(self):
+        glDeleteBuffers(3, [self.VBO, self.EBO, self.command_buffer])
+        glDeleteVertexArrays(1, [self.VAO])
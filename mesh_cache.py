@@ -0,0 +1,255 @@
+# mesh_cache.py
+"""
+Cache persistente em disco das malhas geradas proceduralmente.
+
+Cada malha é salva como dois arquivos .npy (vértices intercalados e índices),
+com nome derivado de um hash de (gerador, parâmetros, versão do layout).
+Nas execuções seguintes os arrays são abertos com np.load(mmap_mode='r'),
+então os bytes vão direto para o glBufferData sem serem recalculados.
+
+Antes de salvar, as malhas passam por mesh_optimize.optimize_mesh (ordem dos
+triângulos e dos vértices para o cache da GPU, índices de 16 bits); o ACMR/ATVR
+de antes e depois fica num .stats.json ao lado dos arrays.
+
+Uso pela linha de comando:
+    python3 mesh_cache.py warm     # pré-gera as malhas usadas pelo main.py
+    python3 mesh_cache.py clear    # apaga o cache
+    python3 mesh_cache.py info     # mostra entradas e tamanho total
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from meshes import generate_sphere_vectorized, generate_sphere_packed, generate_skybox_sphere
+from mesh_optimize import optimize_mesh
+
+# Incrementar sempre que o formato dos vértices/índices de algum gerador mudar
+LAYOUT_VERSION = 2  # 2: malhas otimizadas para o cache de vértices, índices uint16
+
+CACHE_DIR = os.path.join(".cache", "meshes")
+MAX_CACHE_BYTES = 512 * 1024 * 1024  # 512 MB
+
+# Geradores conhecidos pelo cache (nome -> função(radius, stacks, sectors))
+GENERATORS = {
+    "sphere": generate_sphere_vectorized,
+    "sphere_packed": generate_sphere_packed,
+    "skybox_sphere": generate_skybox_sphere,
+}
+
+# Elementos do array de vértices de cada gerador por vértice (para reordená-los)
+VERTEX_COMPONENTS = {
+    "sphere": 14,
+    "sphere_packed": 1,
+    "skybox_sphere": 5,
+}
+
+# Malhas usadas pela cena padrão do main.py (pré-geradas pelo comando 'warm')
+DEFAULT_MESHES = [
+    ("sphere", {"radius": 1.0, "stacks": 30, "sectors": 30}),
+    ("skybox_sphere", {"radius": 200.0, "stacks": 20, "sectors": 20}),
+]
+
+
+class MeshCache:
+    """
+    Cache de malhas em disco com limite de tamanho.
+    Quando o total passa de max_bytes, as entradas menos usadas recentemente
+    (pelo mtime, atualizado a cada acerto) são removidas, sempre inteiras.
+    get_or_create pode ser chamado de várias threads (o AsyncLoader usa o cache
+    padrão nas threads de trabalho).
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        """
+        Args:
+            cache_dir: Diretório onde os arquivos .npy são salvos
+            max_bytes: Tamanho máximo do cache em bytes
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.optimization = {}  # "gerador {params}" -> ACMR/ATVR antes e depois
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(generator, **params):
+        """Hash estável de (gerador, parâmetros, versão do layout)."""
+        payload = json.dumps(
+            {"generator": generator, "params": params, "layout": LAYOUT_VERSION},
+            sort_keys=True,
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".vertices.npy", base + ".indices.npy"
+
+    def _stats_path(self, key):
+        return os.path.join(self.cache_dir, key + ".stats.json")
+
+    def load(self, generator, **params):
+        """
+        Retorna (vertices, indices) mapeados em memória, ou None se não estiver em cache.
+        """
+        vert_path, ind_path = self._paths(self.key(generator, **params))
+        try:
+            vertices = np.load(vert_path, mmap_mode="r")
+            indices = np.load(ind_path, mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+        # Marcar como usado recentemente (política LRU da evicção). Se outro processo
+        # acabou de remover a entrada, os arrays já estão mapeados: segue sem marcar
+        try:
+            os.utime(vert_path)
+            os.utime(ind_path)
+            stats_path = self._stats_path(self.key(generator, **params))
+            if os.path.exists(stats_path):
+                os.utime(stats_path)
+        except FileNotFoundError:
+            pass
+        return vertices, indices
+
+    def store(self, generator, vertices, indices, stats=None, **params):
+        """Salva os arrays (e as métricas, se houver) no cache (escrita atômica) e aplica a evicção."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        key = self.key(generator, **params)
+        if stats is not None:
+            tmp_path = self._stats_path(key) + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(stats, f)
+            os.replace(tmp_path, self._stats_path(key))
+        for path, array in zip(self._paths(key), (vertices, indices)):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp_path, path)
+        self.evict()
+
+    def stats(self, generator, **params):
+        """Métricas de otimização salvas com a malha, ou None."""
+        try:
+            with open(self._stats_path(self.key(generator, **params))) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def get_or_create(self, generator, **params):
+        """
+        Carrega a malha do cache ou a gera com GENERATORS[generator] e a salva.
+        Retorna (vertices, indices).
+        """
+        label = f"{generator} {json.dumps(params, sort_keys=True)}"
+        # Um lock para tudo: duas threads não geram a mesma malha nem disputam os
+        # arquivos da entrada (ou a evicção) no meio da escrita
+        with self._lock:
+            cached = self.load(generator, **params)
+            if cached is not None:
+                self.hits += 1
+                self.optimization[label] = self.stats(generator, **params)
+                return cached
+
+            self.misses += 1
+            vertices, indices = GENERATORS[generator](**params)
+            vertices, indices, stats = optimize_mesh(vertices, indices, VERTEX_COMPONENTS[generator])
+            self.store(generator, vertices, indices, stats, **params)
+            self.optimization[label] = stats
+            return vertices, indices
+
+    def _entries(self):
+        """Lista (caminho, tamanho, mtime) dos arquivos do cache."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith((".npy", ".stats.json")):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _groups(self):
+        """
+        Entradas do cache agrupadas pela chave (vértices, índices e métricas):
+        lista de (chave, caminhos, tamanho total, mtime mais recente).
+        """
+        groups = {}
+        for path, size, mtime in self._entries():
+            key = os.path.basename(path).split(".", 1)[0]
+            paths, total, last = groups.get(key, ([], 0, 0.0))
+            groups[key] = (paths + [path], total + size, max(last, mtime))
+        return [(key, *group) for key, group in groups.items()]
+
+    def size(self):
+        """Tamanho total do cache em bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """
+        Remove as entradas mais antigas até o cache caber em max_bytes. Cada
+        entrada sai inteira (os dois .npy e as métricas), nunca só um dos arquivos.
+        """
+        groups = sorted(self._groups(), key=lambda group: group[3])
+        total = sum(size for _, _, size, _ in groups)
+        for _, paths, size, _ in groups:
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                os.remove(path)
+            total -= size
+
+    def clear(self):
+        """Apaga todas as entradas do cache."""
+        for path, _, _ in self._entries():
+            os.remove(path)
+
+
+_default_cache = MeshCache()
+
+
+def load_mesh(generator, **params):
+    """Atalho para MeshCache.get_or_create usando o cache padrão."""
+    return _default_cache.get_or_create(generator, **params)
+
+
+def default_cache():
+    """O MeshCache usado por load_mesh (para ler as estatísticas)."""
+    return _default_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerencia o cache de malhas em disco.")
+    parser.add_argument("command", choices=["warm", "clear", "info"])
+    parser.add_argument("--dir", default=CACHE_DIR, help="Diretório do cache")
+    parser.add_argument("--max-mb", type=float, default=MAX_CACHE_BYTES / 2**20,
+                        help="Tamanho máximo do cache em MB")
+    args = parser.parse_args()
+
+    cache = MeshCache(args.dir, int(args.max_mb * 2**20))
+    if args.command == "warm":
+        for generator, params in DEFAULT_MESHES:
+            cache.get_or_create(generator, **params)
+        print(f"Cache pré-aquecido: {cache.misses} geradas, {cache.hits} já existentes")
+    elif args.command == "info":
+        for name in sorted(os.listdir(args.dir)) if os.path.isdir(args.dir) else []:
+            if name.endswith(".stats.json"):
+                with open(os.path.join(args.dir, name)) as f:
+                    stats = json.load(f)
+                before, after = stats["before"], stats["after"]
+                print(f"{name[:16]}  ACMR {before['acmr']:.3f} -> {after['acmr']:.3f}  "
+                      f"ATVR {before['atvr']:.3f} -> {after['atvr']:.3f}  "
+                      f"índices {stats['index_bytes'][0] / 1024:.0f} -> {stats['index_bytes'][1] / 1024:.0f} KB")
+    elif args.command == "clear":
+        cache.clear()
+        print(f"Cache limpo: {args.dir}")
+    print(f"{len(cache._entries())} arquivos, {cache.size() / 2**20:.2f} MB em {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# mesh_optimize.py
+"""
+Otimização das malhas para o cache de vértices pós-transformação da GPU.
+
+Roda uma vez, depois do gerador e antes de a malha ir para o cache em disco
+(ver mesh_cache.py):
+
+1. Triângulos reordenados com Tipsify (Sander, Nehab e Barczak, 2007): emite
+   leques em torno de um vértice e escolhe o próximo entre os vértices que
+   ainda estão no cache (FIFO de CACHE_SIZE entradas) e têm triângulos sobrando.
+2. Vértices reordenados pela ordem do primeiro uso nos índices, para que a
+   leitura do VBO seja quase sequencial (vértices sem uso são descartados).
+3. Índices em uint16 quando a malha tem até 65535 vértices.
+
+As métricas são as usuais, simulando um cache FIFO:
+    ACMR = vértices transformados / triângulos (ótimo ~0.5 em grades)
+    ATVR = vértices transformados / vértices usados (ótimo 1.0)
+"""
+import numpy as np
+
+CACHE_SIZE = 16  # entradas do cache FIFO simulado (e alvo do Tipsify)
+MAX_SHORT_VERTICES = 65535
+
+
+def cache_misses(indices, cache_size=CACHE_SIZE):
+    """Vértices transformados por um cache FIFO de 'cache_size' entradas."""
+    stamp = {}
+    misses = 0
+    for v in np.asarray(indices).tolist():
+        if misses - stamp.get(v, -cache_size) >= cache_size:
+            stamp[v] = misses
+            misses += 1
+    return misses
+
+
+def cache_stats(indices, cache_size=CACHE_SIZE):
+    """Retorna {"acmr", "atvr"} dos índices (triângulos) com um cache FIFO."""
+    misses = cache_misses(indices, cache_size)
+    used = len(np.unique(indices))
+    return {
+        "acmr": misses / max(len(indices) // 3, 1),
+        "atvr": misses / max(used, 1),
+    }
+
+
+def tipsify(indices, vertex_count, cache_size=CACHE_SIZE):
+    """
+    Reordena os triângulos para o cache de vértices (Tipsify).
+
+    Args:
+        indices: Índices (3 por triângulo)
+        vertex_count: Número de vértices da malha
+        cache_size: Tamanho do cache FIFO alvo
+    Returns:
+        Índices (mesmo dtype) com os triângulos na nova ordem
+    """
+    indices = np.asarray(indices)
+    tris = indices.reshape(-1, 3)
+
+    # Adjacência vértice -> triângulos (CSR)
+    corners = tris.ravel()
+    order = np.argsort(corners, kind="stable")
+    offsets = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(corners, minlength=vertex_count), out=offsets[1:])
+    adjacency = (order // 3).tolist()
+    offsets = offsets.tolist()
+
+    tri_list = tris.tolist()
+    live = np.bincount(corners, minlength=vertex_count).tolist()
+    cache_time = [-cache_size - 1] * vertex_count
+    emitted = [False] * len(tri_list)
+    dead_end = []
+    output = []
+    stamp = cache_size + 1
+    cursor = 0
+    fan = 0
+
+    while fan >= 0:
+        candidates = []
+        for t in adjacency[offsets[fan]:offsets[fan + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            output.append(t)
+            for v in tri_list[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if stamp - cache_time[v] > cache_size:
+                    cache_time[v] = stamp
+                    stamp += 1
+
+        # Próximo leque: o candidato com triângulos sobrando que fica mais tempo
+        # no cache depois de emitidos os seus triângulos
+        fan, best = -1, -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if stamp - cache_time[v] + 2 * live[v] <= cache_size:
+                    priority = stamp - cache_time[v]
+                if priority > best:
+                    fan, best = v, priority
+        if fan < 0:
+            # Beco sem saída: vértice recente com triângulos, senão o próximo na ordem
+            while dead_end:
+                v = dead_end.pop()
+                if live[v] > 0:
+                    fan = v
+                    break
+            else:
+                while cursor < vertex_count and live[cursor] == 0:
+                    cursor += 1
+                fan = cursor if cursor < vertex_count else -1
+
+    return tris[np.asarray(output, dtype=np.int64)].ravel()
+
+
+def reorder_vertices(vertices, indices, components):
+    """
+    Reordena os vértices pela ordem do primeiro uso nos índices.
+
+    Args:
+        vertices: Vértices intercalados (1D: 'components' valores por vértice)
+        indices: Índices da malha
+        components: Elementos de 'vertices' por vértice (ex.: 14 floats, 1 registro)
+    Returns:
+        (vertices, indices) renumerados; vértices sem uso são descartados
+    """
+    rows = np.asarray(vertices).reshape(-1, components)
+    unique, first = np.unique(indices, return_index=True)
+    used = unique[np.argsort(first, kind="stable")]
+    remap = np.full(len(rows), -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return np.ascontiguousarray(rows[used]).ravel(), remap[indices]
+
+
+def narrow_indices(indices, vertex_count):
+    """Índices em uint16 se os vértices couberem, senão uint32."""
+    dtype = np.uint16 if vertex_count <= MAX_SHORT_VERTICES else np.uint32
+    return np.asarray(indices).astype(dtype)
+
+
+def optimize_mesh(vertices, indices, components, cache_size=CACHE_SIZE):
+    """
+    Tipsify + reordenação dos vértices + índices de 16 bits, quando possível.
+
+    Args:
+        vertices, indices: Malha como sai do gerador
+        components: Elementos de 'vertices' por vértice
+        cache_size: Tamanho do cache FIFO alvo e da simulação
+    Returns:
+        (vertices, indices, stats) com stats = {"before", "after", "index_bytes"}
+    """
+    indices = np.asarray(indices)
+    vertex_count = len(vertices) // components
+    before = cache_stats(indices, cache_size)
+
+    ordered = tipsify(indices, vertex_count, cache_size)
+    vertices, ordered = reorder_vertices(vertices, ordered, components)
+    ordered = narrow_indices(ordered, len(vertices) // components)
+
+    stats = {
+        "cache_size": cache_size,
+        "before": before,
+        "after": cache_stats(ordered, cache_size),
+        "index_bytes": [int(indices.nbytes), int(ordered.nbytes)],
+    }
+    return vertices, ordered, stats
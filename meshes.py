@@ -131,3 +131,154 @@ def _compute_triangle_tangents(vertex_data, idx0, idx1, idx2):
     vertex_data[idx0]['bitangent'] += bitangent
     vertex_data[idx1]['bitangent'] += bitangent
     vertex_data[idx2]['bitangent'] += bitangent
+
+
+def _sphere_grid(radius, stacks, sectors):
+    """
+    Posições (N, 3) e UVs (N, 2) da grade de uma esfera UV, em float64,
+    na mesma ordem de vértices de generate_sphere.
+    """
+    i = np.arange(stacks + 1, dtype=np.float64)[:, None]
+    j = np.arange(sectors + 1, dtype=np.float64)[None, :]
+    stack_angle = np.pi / 2 - i * (np.pi / stacks)  # Latitude: de +90 a -90
+    sector_angle = j * (2 * np.pi / sectors)  # Longitude: 0 a 360
+
+    xy = radius * np.cos(stack_angle)
+    pos = np.empty((stacks + 1, sectors + 1, 3), dtype=np.float64)
+    pos[..., 0] = xy * np.cos(sector_angle)
+    pos[..., 1] = xy * np.sin(sector_angle)
+    pos[..., 2] = radius * np.sin(stack_angle)
+
+    uv = np.empty((stacks + 1, sectors + 1, 2), dtype=np.float64)
+    uv[..., 0] = j / sectors
+    uv[..., 1] = i / stacks
+    return pos.reshape(-1, 3), uv.reshape(-1, 2)
+
+
+def _sphere_triangles(stacks, sectors, inverted=False):
+    """
+    Triângulos (n_tris, 3) na mesma ordem do laço original: para cada (i, j)
+    o primeiro triângulo (exceto no topo) seguido do segundo (exceto na base).
+    Com inverted=True usa o winding invertido do Skybox.
+    """
+    k1 = np.arange(stacks)[:, None] * (sectors + 1) + np.arange(sectors)[None, :]
+    k2 = k1 + sectors + 1
+    if inverted:
+        first = np.stack([k1, k1 + 1, k2], axis=-1)
+        second = np.stack([k1 + 1, k2 + 1, k2], axis=-1)
+    else:
+        first = np.stack([k1, k2, k1 + 1], axis=-1)
+        second = np.stack([k1 + 1, k2, k2 + 1], axis=-1)
+    tris = np.stack([first, second], axis=2)  # (stacks, sectors, 2, 3)
+
+    keep = np.ones((stacks, 1, 2), dtype=bool)
+    keep[0, :, 0] = False
+    keep[stacks - 1, :, 1] = False
+    return tris[np.broadcast_to(keep, (stacks, sectors, 2))]
+
+
+def generate_sphere_vectorized(radius, stacks, sectors):
+    """
+    Versão vetorizada de generate_sphere (mesmo layout de 14 floats por vértice).
+    Posições, UVs e normais saem de broadcasting sobre a grade (stacks x sectors),
+    e as tangentes são acumuladas com np.add.at sobre o buffer de índices,
+    sem laços em Python nem arrays pequenos por vértice.
+    Retorna (vertices, indices) prontos para o OpenGL.
+    """
+    # 1. Posições, UVs e normais (normal = posição normalizada)
+    pos, uv = _sphere_grid(radius, stacks, sectors)
+    normal = pos / radius
+
+    # 2. Índices
+    tris = _sphere_triangles(stacks, sectors)
+
+    # 3. Tangentes por triângulo: T = f * (dV2*E1 - dV1*E2), acumuladas por vértice
+    p0, p1, p2 = pos[tris[:, 0]], pos[tris[:, 1]], pos[tris[:, 2]]
+    uv0, uv1, uv2 = uv[tris[:, 0]], uv[tris[:, 1]], uv[tris[:, 2]]
+    e1 = p1 - p0
+    e2 = p2 - p0
+    duv1 = uv1 - uv0
+    duv2 = uv2 - uv0
+    f = 1.0 / (duv1[:, 0] * duv2[:, 1] - duv2[:, 0] * duv1[:, 1] + 1e-8)
+    tri_tangent = f[:, None] * (duv2[:, 1, None] * e1 - duv1[:, 1, None] * e2)
+
+    tangent = np.zeros_like(pos)
+    for corner in range(3):
+        np.add.at(tangent, tris[:, corner], tri_tangent)
+
+    # 4. Gram-Schmidt: T = T - (T·N)N, normalizar e B = N × T
+    tangent -= np.sum(tangent * normal, axis=1, keepdims=True) * normal
+    tangent /= np.linalg.norm(tangent, axis=1, keepdims=True) + 1e-8
+    bitangent = np.cross(normal, tangent)
+
+    # 5. Intercalar [x,y,z, u,v, nx,ny,nz, tx,ty,tz, bx,by,bz]
+    vertices = np.concatenate([pos, uv, normal, tangent, bitangent], axis=1)
+    return vertices.astype(np.float32).ravel(), tris.astype(np.uint32).ravel()
+
+
+def generate_skybox_sphere(radius, stacks, sectors):
+    """
+    Esfera invertida do Skybox (normais para dentro), vetorizada.
+    Formato simplificado do vértice: [x, y, z, u, v] (5 floats).
+    Retorna (vertices, indices) prontos para o OpenGL.
+    """
+    pos, uv = _sphere_grid(radius, stacks, sectors)
+    # Para esfera invertida, negamos z para inverter normais
+    pos[:, 2] = -pos[:, 2]
+    vertices = np.concatenate([pos, uv], axis=1)
+    tris = _sphere_triangles(stacks, sectors, inverted=True)
+    return vertices.astype(np.float32).ravel(), tris.astype(np.uint32).ravel()
+
+
+# Layout compacto (20 bytes por vértice) para esferas de raio 1 (a escala vem da model matrix):
+#   posição xyz em int16 normalizado (+1 short de alinhamento), UV em uint16 normalizado,
+#   normal e tangente em GL_INT_2_10_10_10_REV; o w da tangente guarda o sinal da
+#   bitangente (B = w * N × T, reconstruída no vertex shader)
+PACKED_VERTEX_DTYPE = np.dtype([
+    ("position", "<i2", 4),
+    ("uv", "<u2", 2),
+    ("normal", "<u4"),
+    ("tangent", "<u4"),
+])
+
+
+def pack_2_10_10_10(vectors, w):
+    """
+    Empacota vetores (N, 3) em [-1, 1] e w (N,) em {-1, 0, 1} no formato
+    GL_INT_2_10_10_10_REV normalizado (x nos bits 0-9, ..., w nos bits 30-31).
+    """
+    q = np.clip(np.rint(vectors * 511.0), -511, 511).astype(np.int64) & 0x3FF
+    w = np.asarray(w, dtype=np.int64) & 0x3
+    return (q[:, 0] | (q[:, 1] << 10) | (q[:, 2] << 20) | (w << 30)).astype(np.uint32)
+
+
+def pack_vertices(vertices):
+    """
+    Converte vértices no layout de 14 floats para PACKED_VERTEX_DTYPE.
+    As posições precisam estar em [-1, 1] (esferas de raio 1).
+    Retorna um array estruturado (N,).
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 14)
+    pos, uv = vertices[:, 0:3], vertices[:, 3:5]
+    normal, tangent, bitangent = vertices[:, 5:8], vertices[:, 8:11], vertices[:, 11:14]
+    if np.abs(pos).max(initial=0.0) > 1.0 + 1e-6:
+        raise ValueError("Layout compacto requer posições em [-1, 1] (malha de raio 1)")
+
+    packed = np.zeros(len(vertices), dtype=PACKED_VERTEX_DTYPE)
+    packed["position"][:, :3] = np.clip(np.rint(pos * 32767.0), -32767, 32767)
+    packed["uv"] = np.clip(np.rint(uv * 65535.0), 0, 65535)
+    packed["normal"] = pack_2_10_10_10(normal, 0)
+    # Sinal da bitangente: +1 se B concorda com N × T (sempre, nas esferas geradas aqui)
+    handedness = np.where(np.sum(np.cross(normal, tangent) * bitangent, axis=1) < 0.0, -1, 1)
+    packed["tangent"] = pack_2_10_10_10(tangent, handedness)
+    return packed
+
+
+def generate_sphere_packed(radius, stacks, sectors):
+    """
+    generate_sphere_vectorized no layout compacto (PACKED_VERTEX_DTYPE, 20 bytes por
+    vértice em vez de 56). Só para radius = 1.
+    Retorna (vertices, indices) prontos para o OpenGL.
+    """
+    vertices, indices = generate_sphere_vectorized(radius, stacks, sectors)
+    return pack_vertices(vertices), indices
@@ -0,0 +1,98 @@
+# orbits.py
+"""
+Propagador kepleriano vetorizado (órbitas elípticas e inclinadas).
+
+Os elementos orbitais seguem a convenção clássica, com o plano de referência
+sendo o plano XZ da cena (Y para cima). Ângulos em graus, como no resto do projeto:
+    a     semi-eixo maior (orbit_radius)
+    e     excentricidade
+    i     inclinação
+    Ω     longitude do nó ascendente
+    ω     argumento do periastro
+    M0    anomalia média na época (orbit_phase)
+    n     movimento médio em graus/seg (orbit_speed, já multiplicado por TIME_SCALE)
+
+Com e = 0 e i = 0 o resultado é exatamente a órbita circular original de Planet.update.
+"""
+import numpy as np
+
+KEPLER_MAX_ITERATIONS = 8
+KEPLER_TOLERANCE = 1e-12
+
+
+def solve_kepler(mean_anomaly, eccentricity, max_iterations=KEPLER_MAX_ITERATIONS,
+                 tolerance=KEPLER_TOLERANCE):
+    """
+    Resolve a equação de Kepler M = E - e*sin(E) para todos os corpos de uma vez
+    com Newton-Raphson vetorizado e um limite fixo de iterações.
+
+    Args:
+        mean_anomaly: Anomalias médias (radianos), array (N,)
+        eccentricity: Excentricidades em [0, 1), array (N,)
+        max_iterations: Limite de iterações de Newton
+        tolerance: Para antes do limite se todas as correções forem menores que isso
+
+    Returns:
+        Anomalias excêntricas E (radianos), array (N,)
+    """
+    mean_anomaly = np.remainder(mean_anomaly, 2.0 * np.pi)
+    # Chute inicial: M para órbitas quase circulares, π para as muito excêntricas
+    E = np.where(eccentricity < 0.8, mean_anomaly, np.pi)
+    for _ in range(max_iterations):
+        delta = (E - eccentricity * np.sin(E) - mean_anomaly) / (1.0 - eccentricity * np.cos(E))
+        E -= delta
+        if np.max(np.abs(delta), initial=0.0) < tolerance:
+            break
+    return E
+
+
+def perifocal_basis(inclination, ascending_node, periapsis):
+    """
+    Vetores P (direção do periastro) e Q (90° à frente no plano da órbita) em
+    coordenadas da cena, arrays (N, 3). Dependem só dos elementos angulares,
+    então podem ser calculados uma vez e reaproveitados a cada frame.
+    """
+    i = np.radians(inclination)
+    node = np.radians(ascending_node)
+    w = np.radians(periapsis)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+    cos_n, sin_n = np.cos(node), np.sin(node)
+    cos_w, sin_w = np.cos(w), np.sin(w)
+
+    # Base perifocal no referencial "eclíptico" (x, y no plano, z para cima)
+    px = cos_n * cos_w - sin_n * sin_w * cos_i
+    py = sin_n * cos_w + cos_n * sin_w * cos_i
+    pz = sin_w * sin_i
+    qx = -cos_n * sin_w - sin_n * cos_w * cos_i
+    qy = -sin_n * sin_w + cos_n * cos_w * cos_i
+    qz = cos_w * sin_i
+
+    # Eclíptico -> cena: (x, y, z) -> (x, z, -y), para que o plano de referência seja XZ
+    P = np.stack([px, pz, -py], axis=-1)
+    Q = np.stack([qx, qz, -qy], axis=-1)
+    return P, Q
+
+
+def orbit_offsets(semi_major_axis, eccentricity, mean_anomaly, P, Q):
+    """
+    Posição de cada corpo relativa ao pai.
+
+    Args:
+        semi_major_axis: Semi-eixos maiores, array (N,)
+        eccentricity: Excentricidades, array (N,)
+        mean_anomaly: Anomalias médias (radianos), array (N,)
+        P, Q: Base perifocal de perifocal_basis, arrays (N, 3)
+
+    Returns:
+        (offsets (N, 3), anomalia verdadeira (N,) em radianos)
+    """
+    E = solve_kepler(mean_anomaly, eccentricity)
+    cos_E, sin_E = np.cos(E), np.sin(E)
+    b_over_a = np.sqrt(1.0 - eccentricity * eccentricity)
+
+    x = semi_major_axis * (cos_E - eccentricity)
+    y = semi_major_axis * b_over_a * sin_E
+    offsets = x[:, None] * P + y[:, None] * Q
+
+    true_anomaly = np.arctan2(b_over_a * sin_E, cos_E - eccentricity)
+    return offsets, true_anomaly
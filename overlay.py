@@ -0,0 +1,101 @@
+# overlay.py
+"""
+Overlay de texto na tela (ex.: o relatório do profiler).
+
+O texto é rasterizado pelo pygame.font numa superfície, enviado como textura
+só quando muda, e desenhado num retângulo no canto superior esquerdo com
+blending, por cima da cena.
+"""
+import pygame
+from OpenGL.GL import (
+    GL_TEXTURE_2D, GL_TEXTURE0, GL_RGBA, GL_RGBA8, GL_UNSIGNED_BYTE, GL_LINEAR,
+    GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER, GL_TRIANGLE_STRIP, GL_BLEND,
+    GL_DEPTH_TEST, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA,
+    glGenTextures, glBindTexture, glTexParameteri, glTexImage2D, glGenVertexArrays,
+    glBindVertexArray, glUseProgram, glGetUniformLocation, glUniform1i, glUniform4f,
+    glActiveTexture, glEnable, glDisable, glBlendFunc, glDrawArrays
+)
+
+from utils import load_shader
+
+FONT_SIZE = 16
+# Fonte monoespaçada para alinhar as colunas (o pygame usa a fonte padrão se nenhuma existir)
+FONT_NAMES = "dejavusansmono,liberationmono,consolas,couriernew,monospace"
+BACKGROUND = (0, 0, 0, 170)
+TEXT_COLOR = (230, 230, 230)
+
+
+class TextOverlay:
+    """Bloco de linhas de texto no canto superior esquerdo da tela."""
+
+    def __init__(self, screen_size, font_size=FONT_SIZE, margin=8):
+        """
+        Args:
+            screen_size: (largura, altura) do framebuffer em pixels
+            font_size: Altura da fonte em pixels
+            margin: Distância da borda da tela e do texto à borda do fundo, em pixels
+        """
+        pygame.font.init()
+        self.font = pygame.font.SysFont(FONT_NAMES, font_size)
+        self.screen_size = screen_size
+        self.margin = margin
+        self.size = (0, 0)
+        self.lines = None
+
+        self.shader = load_shader("shaders/overlay.vert", "shaders/overlay.frag")
+        glUseProgram(self.shader)
+        glUniform1i(glGetUniformLocation(self.shader, "textSampler"), 0)
+        self.rect_loc = glGetUniformLocation(self.shader, "rect")
+        self.VAO = glGenVertexArrays(1)  # vértices gerados no shader
+        self.texture_id = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def set_text(self, lines):
+        """Rasteriza as linhas e atualiza a textura (nada é feito se o texto não mudou)."""
+        lines = list(lines)
+        if lines == self.lines:
+            return
+        self.lines = lines
+        rendered = [self.font.render(line, True, TEXT_COLOR) for line in lines]
+        line_height = self.font.get_linesize()
+        width = max((surface.get_width() for surface in rendered), default=0) + 2 * self.margin
+        height = line_height * len(rendered) + 2 * self.margin
+
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill(BACKGROUND)
+        for i, text in enumerate(rendered):
+            surface.blit(text, (self.margin, self.margin + i * line_height))
+
+        # Linha de baixo primeiro, como o OpenGL espera
+        pixels = pygame.image.tostring(surface, "RGBA", True)
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        self.size = (width, height)
+
+    def render(self):
+        """Desenha o bloco por cima de tudo (sem teste de profundidade)."""
+        if not self.lines:
+            return
+        screen_w, screen_h = self.screen_size
+        width, height = self.size
+        x0 = -1.0 + 2.0 * self.margin / screen_w
+        y1 = 1.0 - 2.0 * self.margin / screen_h
+        x1 = x0 + 2.0 * width / screen_w
+        y0 = y1 - 2.0 * height / screen_h
+
+        glDisable(GL_DEPTH_TEST)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glUseProgram(self.shader)
+        glUniform4f(self.rect_loc, x0, y0, x1, y1)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glBindVertexArray(self.VAO)
+        glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+        glBindVertexArray(0)
+        glDisable(GL_BLEND)
+        glEnable(GL_DEPTH_TEST)
@@ -1,9 +1,49 @@
 # planet.py
 import glm
+import numpy as np
 import pygame
 
+from orbits import perifocal_basis, orbit_offsets
+
+
+class _RowField:
+    """
+    Atributo que mora numa linha do SceneGraph quando o planeta está anexado
+    a um, ou no próprio objeto enquanto ele é independente.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, planet, owner=None):
+        if planet is None:
+            return self
+        if planet.scene is not None:
+            return float(getattr(planet.scene, self.name)[planet.row])
+        return planet.__dict__[self.name]
+
+    def __set__(self, planet, value):
+        if planet.__dict__.get("scene") is not None:
+            getattr(planet.scene, self.name)[planet.row] = value
+            # Só marca o grafo como alterado: o recálculo fica para o próximo update
+            planet.scene.invalidate()
+        else:
+            planet.__dict__[self.name] = value
+
+
 class Planet:
-    def __init__(self, radius, rotation_speed, orbit_radius, orbit_speed, parent=None, texture_id=0, normal_map_id=None):
+    radius = _RowField()
+    rotation_speed = _RowField()
+    orbit_radius = _RowField()
+    orbit_speed = _RowField()
+    orbit_phase = _RowField()
+    eccentricity = _RowField()
+    inclination = _RowField()
+    ascending_node = _RowField()
+    periapsis = _RowField()
+
+    def __init__(self, radius, rotation_speed, orbit_radius, orbit_speed, parent=None, texture_id=0, normal_map_id=None,
+                 eccentricity=0.0, inclination=0.0, ascending_node=0.0, periapsis=0.0):
         """
         Inicializa um corpo celeste (Planeta, Lua ou Sol).
 
@@ -15,7 +55,16 @@ class Planet:
             parent (Planet, optional): O planeta que ele orbita. None para o Sol.
             texture_id (int): O ID da textura do OpenGL.
             normal_map_id (int, optional): O ID do normal map do OpenGL (None se não tiver).
+            eccentricity (float): Excentricidade da órbita (0 = circular).
+            inclination (float): Inclinação da órbita em relação ao plano XZ (graus).
+            ascending_node (float): Longitude do nó ascendente (graus).
+            periapsis (float): Argumento do periastro (graus).
+
+        Com excentricidade e inclinação diferentes de zero, orbit_radius é o semi-eixo
+        maior, orbit_speed o movimento médio e orbit_phase a anomalia média na época.
         """
+        self.scene = None  # SceneGraph ao qual o planeta está anexado (ver attach)
+        self.row = None
         self.radius = radius
         self.rotation_speed = rotation_speed
         self.orbit_radius = orbit_radius
@@ -23,11 +72,57 @@ class Planet:
         self.parent = parent
         self.texture_id = texture_id
         self.normal_map_id = normal_map_id
+        self.orbit_phase = 0.0  # Ângulo inicial da órbita (graus)
+        self.eccentricity = eccentricity
+        self.inclination = inclination
+        self.ascending_node = ascending_node
+        self.periapsis = periapsis
+        # Efemérides pré-calculadas (ver use_ephemeris): tabela e índice do corpo nela
+        self.ephemeris = None
+        self.ephemeris_body = None
         
         # Matrizes de Transformação
-        self.model = glm.mat4(1.0)
+        self._model = glm.mat4(1.0)
         self.initial_translation = glm.translate(glm.mat4(1.0), glm.vec3(orbit_radius, 0.0, 0.0))
         
+    def attach(self, scene, row):
+        """
+        Transforma o planeta numa visão sobre a linha 'row' do SceneGraph.
+        A partir daí os parâmetros e a model matrix vêm dos arrays do grafo.
+        """
+        self.scene = scene
+        self.row = row
+
+    @property
+    def model(self):
+        """Model matrix atual (glm.mat4)."""
+        if self.scene is not None:
+            # A linha já está em ordem de coluna, a mesma do construtor do glm.mat4
+            return glm.mat4(*self.scene.models[self.row].ravel().tolist())
+        return self._model
+
+    @model.setter
+    def model(self, value):
+        self._model = value
+
+    def use_ephemeris(self, ephemeris, body):
+        """
+        Tira a órbita (posição relativa ao pai e longitude verdadeira) das tabelas
+        de 'ephemeris' em vez da órbita circular ou kepleriana, dentro do intervalo
+        coberto. Anexado a um SceneGraph, vale SceneGraph.set_ephemeris.
+
+        Args:
+            ephemeris: ephemeris.Ephemeris (None volta à órbita analítica)
+            body: Índice do corpo nas tabelas
+        """
+        self.ephemeris = ephemeris
+        self.ephemeris_body = body
+
+    def is_circular(self):
+        """True se a órbita é o caso circular e coplanar (e = 0, i = 0, sem nó/periastro)."""
+        return (self.eccentricity == 0.0 and self.inclination == 0.0
+                and self.ascending_node == 0.0 and self.periapsis == 0.0)
+
     def update(self, time):
         """
         Calcula e atualiza a matriz de transformação (Model Matrix) 
@@ -36,6 +131,12 @@ class Planet:
         Args:
             time (float): Tempo total em segundos desde o início da aplicação.
         """
+        if self.scene is not None:
+            # Anexado a um SceneGraph: todos os corpos são atualizados em lote
+            # (a primeira chamada no frame calcula, as demais não fazem nada)
+            self.scene.update(time)
+            return
+
         # 1. Rotação Própria (Giro do planeta em seu próprio eixo)
         # O ângulo de rotação é baseado no tempo e na velocidade de rotação.
         rotation_angle = glm.radians(time * self.rotation_speed)
@@ -50,9 +151,30 @@ class Planet:
         scale_matrix = glm.scale(glm.mat4(1.0), glm.vec3(self.radius))
         
         # 3. Translação (Órbita em torno do Pai)
-        if self.parent:
+        if self.parent and self.ephemeris is not None and self.ephemeris.covers(time):
+            # Efemérides: posição relativa ao pai e longitude verdadeira dos polinômios
+            offset, true_longitude = self.ephemeris.evaluate(time, [self.ephemeris_body])
+            parent_pos = glm.vec3(self.parent.model[3][0], self.parent.model[3][1], self.parent.model[3][2])
+            translation = glm.translate(glm.mat4(1.0), parent_pos + glm.vec3(*offset[0].tolist()))
+            orbit_rotation = glm.rotate(glm.mat4(1.0), float(true_longitude[0]), glm.vec3(0.0, 1.0, 0.0))
+            self.model = translation * orbit_rotation * rotation_matrix * scale_matrix
+        elif self.parent and not self.is_circular():
+            # Órbita kepleriana: posição relativa ao pai pelo propagador vetorizado
+            P, Q = perifocal_basis(np.array([self.inclination]), np.array([self.ascending_node]),
+                                   np.array([self.periapsis]))
+            mean_anomaly = np.radians([self.orbit_phase + time * self.orbit_speed])
+            offset, true_anomaly = orbit_offsets(np.array([self.orbit_radius]),
+                                                 np.array([self.eccentricity]), mean_anomaly, P, Q)
+            parent_pos = glm.vec3(self.parent.model[3][0], self.parent.model[3][1], self.parent.model[3][2])
+            translation = glm.translate(glm.mat4(1.0), parent_pos + glm.vec3(*offset[0].tolist()))
+
+            # O corpo acompanha a longitude verdadeira (como a rotação de órbita do caso circular)
+            true_longitude = self.ascending_node + self.periapsis + np.degrees(true_anomaly[0])
+            orbit_rotation = glm.rotate(glm.mat4(1.0), glm.radians(float(true_longitude)), glm.vec3(0.0, 1.0, 0.0))
+            self.model = translation * orbit_rotation * rotation_matrix * scale_matrix
+        elif self.parent:
             # Rotação de órbita em torno do pai (eixo Y)
-            orbit_angle = glm.radians(time * self.orbit_speed)
+            orbit_angle = glm.radians(self.orbit_phase + time * self.orbit_speed)
             orbit_rotation = glm.rotate(glm.mat4(1.0), orbit_angle, glm.vec3(0.0, 1.0, 0.0))
             
             # Translação inicial para a órbita (posiciona o planeta no raio de órbita)
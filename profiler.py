@@ -0,0 +1,287 @@
+# profiler.py
+"""
+Profiler de frame: escopos de CPU (time.perf_counter_ns) e de GPU (queries
+GL_TIME_ELAPSED), com histórico dos últimos frames para percentis e exportação.
+
+    profiler.begin_frame()
+    with profiler.cpu("camera.update"):
+        camera.update(...)
+    profiler.gpu_switch("planets")   # encerra o escopo de GPU anterior e abre outro
+    ...
+    profiler.end_frame()
+
+As queries de GPU usam dois conjuntos alternados: as do frame N são lidas no
+fim do frame N + 1, quando a GPU já terminou, sem parar o pipeline. Um
+resultado que ainda não estiver pronto é descartado (contado em 'gpu_dropped')
+em vez de esperar.
+"""
+from collections import deque
+import csv
+import json
+import time
+
+import numpy as np
+from OpenGL.GL import (
+    GL_TIME_ELAPSED, GL_QUERY_RESULT, GL_QUERY_RESULT_AVAILABLE,
+    glGenQueries, glDeleteQueries, glBeginQuery, glEndQuery, glGetQueryObjectuiv, glFinish
+)
+
+HISTORY_FRAMES = 600  # ~10 s a 60 FPS
+PERCENTILES = (50, 95, 99)
+EXPORT_FORMATS = ("csv", "json", "chrome")
+
+
+class _CPUScope:
+    """Context manager de um escopo de CPU (uma classe simples custa menos que @contextmanager)."""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add_cpu(self.name, self.start, time.perf_counter_ns() - self.start)
+        return False
+
+
+class _GPUScope:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.gpu_begin(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.gpu_end()
+        return False
+
+
+class Profiler:
+    """
+    Coleta os tempos de cada frame em registros
+    {"frame", "start", "cpu": {nome: [(início_ns, duração_ns), ...]}, "gpu": {nome: ns}}
+    guardados num deque com os últimos 'history' frames (o histograma móvel).
+    """
+
+    def __init__(self, history=HISTORY_FRAMES, gpu=True):
+        """
+        Args:
+            history: Número de frames mantidos para percentis e exportação
+            gpu: Medir os escopos de GPU com queries GL_TIME_ELAPSED
+                (exige contexto OpenGL; só uma query desse tipo pode estar ativa)
+        """
+        self.history = deque(maxlen=history)
+        self.gpu_enabled = gpu
+        self.frame = 0
+        self.current = None
+        self.gpu_dropped = 0
+
+        # Dois conjuntos de queries: o do frame atual e o do frame anterior (ainda na GPU)
+        self._pools = ([], [])
+        self._pending = [None, None]  # (registro, [(nome, query), ...]) por conjunto
+        self._used = []
+        self._active_gpu = None
+        self._epoch = time.perf_counter_ns()
+
+    # --- Frame ---
+
+    def begin_frame(self):
+        """Abre o registro do frame (chamar depois da espera do clock.tick)."""
+        self.current = {"frame": self.frame, "start": time.perf_counter_ns(), "cpu": {}, "gpu": {},
+                        "gpu_submit": {}}
+        self._used = []
+
+    def end_frame(self):
+        """
+        Fecha o frame: registra o tempo total de CPU ("frame"), guarda o registro
+        no histórico e lê as queries de GPU do frame anterior.
+        """
+        if self.current is None:
+            return
+        self.gpu_end()
+        record = self.current
+        self.add_cpu("frame", record["start"], time.perf_counter_ns() - record["start"])
+        slot = self.frame % 2
+        self._pending[slot] = (record, self._used)
+        self._read_slot(1 - slot, wait=False)
+        self.history.append(record)
+        self.current = None
+        self.frame += 1
+
+    def finish(self):
+        """Espera a GPU e lê todas as queries pendentes (fim da execução, antes de exportar)."""
+        self.gpu_end()
+        if self.gpu_enabled:
+            glFinish()
+        for slot in (0, 1):
+            self._read_slot(slot, wait=True)
+
+    def _read_slot(self, slot, wait):
+        pending = self._pending[slot]
+        if pending is None:
+            return
+        record, used = pending
+        for name, query in used:
+            if not wait and not glGetQueryObjectuiv(query, GL_QUERY_RESULT_AVAILABLE):
+                self.gpu_dropped += 1
+                continue
+            elapsed = int(glGetQueryObjectuiv(query, GL_QUERY_RESULT))
+            record["gpu"][name] = record["gpu"].get(name, 0) + elapsed
+        self._pending[slot] = None
+
+    # --- Escopos ---
+
+    def cpu(self, name):
+        """Context manager que mede o bloco com perf_counter_ns."""
+        return _CPUScope(self, name)
+
+    def add_cpu(self, name, start_ns, duration_ns):
+        """Registra uma medida de CPU no frame atual (ignorada fora de um frame)."""
+        if self.current is not None:
+            self.current["cpu"].setdefault(name, []).append((start_ns, duration_ns))
+
+    def gpu(self, name):
+        """Context manager que mede o bloco na GPU (não pode conter outro escopo de GPU)."""
+        return _GPUScope(self, name)
+
+    def gpu_begin(self, name):
+        """Inicia uma query GL_TIME_ELAPSED para 'name' (encerra a que estiver ativa)."""
+        if not self.gpu_enabled or self.current is None:
+            return
+        self.gpu_end()
+        pool = self._pools[self.frame % 2]
+        if len(self._used) == len(pool):
+            pool.append(int(np.atleast_1d(glGenQueries(1))[0]))
+        query = pool[len(self._used)]
+        glBeginQuery(GL_TIME_ELAPSED, query)
+        self._used.append((name, query))
+        self._active_gpu = name
+        self.current["gpu_submit"].setdefault(name, time.perf_counter_ns())
+
+    def gpu_end(self):
+        """Encerra a query de GPU ativa, se houver."""
+        if self._active_gpu is not None:
+            glEndQuery(GL_TIME_ELAPSED)
+            self._active_gpu = None
+
+    def gpu_switch(self, name):
+        """Troca de escopo de GPU (ex.: a cada passe da RenderQueue); None só encerra."""
+        if name is None:
+            self.gpu_end()
+        elif name != self._active_gpu:
+            self.gpu_begin(name)
+
+    # --- Estatísticas ---
+
+    @staticmethod
+    def _total(record, key):
+        kind, name = key.split(":", 1)
+        if kind == "cpu":
+            spans = record["cpu"].get(name)
+            return None if spans is None else sum(duration for _, duration in spans)
+        return record["gpu"].get(name)
+
+    def keys(self):
+        """Escopos vistos no histórico, como "cpu:nome" e "gpu:nome"."""
+        cpu, gpu = set(), set()
+        for record in self.history:
+            cpu.update(record["cpu"])
+            gpu.update(record["gpu"])
+        return [f"cpu:{name}" for name in sorted(cpu)] + [f"gpu:{name}" for name in sorted(gpu)]
+
+    def samples(self, key):
+        """Tempo total por frame (ms) do escopo 'key', só dos frames em que ele apareceu."""
+        values = [self._total(record, key) for record in self.history]
+        return np.array([v for v in values if v is not None], dtype=np.float64) / 1e6
+
+    def summary(self):
+        """{chave: {"p50", "p95", "p99", "mean", "max", "count"}} em ms."""
+        result = {}
+        for key in self.keys():
+            values = self.samples(key)
+            if len(values) == 0:
+                continue
+            stats = {f"p{q}": float(p) for q, p in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+            stats.update(mean=float(values.mean()), max=float(values.max()), count=len(values))
+            result[key] = stats
+        return result
+
+    def report_lines(self):
+        """Linhas de texto com os percentis de cada escopo (para o overlay ou o terminal)."""
+        lines = [f"{'escopo':<22}{'p50':>8}{'p95':>8}{'p99':>8}  ms ({len(self.history)} frames)"]
+        for key, stats in self.summary().items():
+            lines.append(f"{key:<22}{stats['p50']:>8.3f}{stats['p95']:>8.3f}{stats['p99']:>8.3f}")
+        if self.gpu_dropped:
+            lines.append(f"queries de GPU descartadas: {self.gpu_dropped}")
+        return lines
+
+    # --- Exportação ---
+
+    def export(self, path, format="json"):
+        """Grava o histórico em 'path' no formato "csv", "json" ou "chrome" (trace)."""
+        exporters = {"csv": self.export_csv, "json": self.export_json,
+                     "chrome": self.export_chrome_trace}
+        if format not in exporters:
+            raise ValueError(f"Formato de exportação desconhecido: {format}")
+        exporters[format](path)
+
+    def export_csv(self, path):
+        """Uma linha por (frame, escopo): frame, tipo (cpu/gpu), nome, ms."""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "kind", "name", "ms"])
+            for record in self.history:
+                for key in [f"cpu:{name}" for name in record["cpu"]] + \
+                           [f"gpu:{name}" for name in record["gpu"]]:
+                    kind, name = key.split(":", 1)
+                    writer.writerow([record["frame"], kind, name,
+                                     f"{self._total(record, key) / 1e6:.6f}"])
+
+    def export_json(self, path):
+        """Percentis de cada escopo e as amostras por frame."""
+        data = {
+            "frames": len(self.history),
+            "gpu_dropped": self.gpu_dropped,
+            "summary": self.summary(),
+            "samples": {key: self.samples(key).round(6).tolist() for key in self.keys()},
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def export_chrome_trace(self, path):
+        """
+        Formato "Trace Event" do Chrome (chrome://tracing, Perfetto): escopos de
+        CPU na thread 0 com os instantes reais; escopos de GPU na thread 1, com a
+        duração medida e o início no instante em que foram enviados pela CPU.
+        """
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 0, "tid": 0, "args": {"name": "CPU"}},
+            {"name": "thread_name", "ph": "M", "pid": 0, "tid": 1, "args": {"name": "GPU"}},
+        ]
+        for record in self.history:
+            for name, spans in record["cpu"].items():
+                for start, duration in spans:
+                    events.append({"name": name, "cat": "cpu", "ph": "X", "pid": 0, "tid": 0,
+                                   "ts": (start - self._epoch) / 1e3, "dur": duration / 1e3,
+                                   "args": {"frame": record["frame"]}})
+            for name, duration in record["gpu"].items():
+                start = record["gpu_submit"].get(name, record["start"])
+                events.append({"name": name, "cat": "gpu", "ph": "X", "pid": 0, "tid": 1,
+                               "ts": (start - self._epoch) / 1e3, "dur": duration / 1e3,
+                               "args": {"frame": record["frame"]}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def delete(self):
+        for pool in self._pools:
+            if pool:
+                glDeleteQueries(len(pool), pool)
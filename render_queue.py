@@ -0,0 +1,322 @@
+# render_queue.py
+"""
+Fila de renderização com chaves de ordenação de 64 bits.
+
+Cada draw é enviado como um comando; a chave empacota, do bit mais alto para o
+mais baixo, o que é mais caro de trocar:
+
+    passe (4 bits) | programa (8) | VAO (12) | material/texturas (16) | profundidade (24)
+
+A fila é ordenada com np.argsort e o executor só emite as transições de estado
+que de fato mudam em relação ao comando anterior (programa, VAO, unidades de
+textura, uniforms do material e estado de profundidade). As trocas evitadas
+são contadas em "binds_skipped" no FrameStats.
+"""
+from collections import namedtuple
+import ctypes
+
+import numpy as np
+from OpenGL.GL import (
+    GL_TRIANGLES, GL_UNSIGNED_INT, GL_UNSIGNED_SHORT, GL_FALSE, GL_TRUE, GL_LESS, GL_LEQUAL, GL_TEXTURE0,
+    glUseProgram, glBindVertexArray, glActiveTexture, glBindTexture, glGetUniformLocation,
+    glUniform1i, glUniformMatrix4fv, glDepthMask, glDepthFunc, glDrawElements, glDrawArrays,
+    glDrawElementsBaseVertex
+)
+
+# Passes, na ordem em que são executados
+PASS_SKY_FIRST = 0  # Skybox em esfera (antes de tudo, sem escrever profundidade)
+PASS_OPAQUE = 1     # Corpos opacos, da frente para trás
+PASS_SKY_LAST = 2   # Skybox de tela cheia (depois dos opacos, só onde a profundidade é 1.0)
+
+# Estado de profundidade de cada passe: (escrever profundidade, função de comparação)
+PASS_DEPTH = {
+    PASS_SKY_FIRST: (False, GL_LEQUAL),
+    PASS_OPAQUE: (True, GL_LESS),
+    PASS_SKY_LAST: (False, GL_LEQUAL),
+}
+DEFAULT_DEPTH = (True, GL_LESS)
+
+# Nome de cada passe (ex.: escopos de GPU do profiler)
+PASS_NAMES = {PASS_SKY_FIRST: "skybox", PASS_OPAQUE: "planets", PASS_SKY_LAST: "skybox"}
+
+# Largura (bits) de cada campo da chave, do mais significativo ao menos
+KEY_FIELDS = (("pass", 4), ("program", 8), ("vao", 12), ("material", 16), ("depth", 24))
+KEY_SHIFTS = {}
+_shift = 64
+for _name, _bits in KEY_FIELDS:
+    _shift -= _bits
+    KEY_SHIFTS[_name] = _shift
+DEPTH_MAX = (1 << KEY_FIELDS[-1][1]) - 1
+
+# Modos de desenho
+DRAW_ELEMENTS = 0
+DRAW_ARRAYS = 1
+DRAW_NONE = 2  # só executa o callback (ex.: outro renderizador)
+
+# Estado de um material: texturas por unidade ((alvo, id) ou None = não importa)
+# e uniforms inteiras ((nome, valor), ...)
+DrawMaterial = namedtuple("DrawMaterial", ["textures", "uniforms"])
+
+
+def pack_keys(pass_, program, vao, material, depth):
+    """
+    Empacota os campos (escalares ou arrays de inteiros) em chaves uint64.
+    'depth' é a profundidade normalizada em [0, 1] (0 = mais perto).
+    """
+    depth = np.clip(np.asarray(depth, dtype=np.float64), 0.0, 1.0)
+    fields = {
+        "pass": pass_, "program": program, "vao": vao, "material": material,
+        "depth": np.rint(depth * DEPTH_MAX),
+    }
+    keys = np.zeros(np.shape(depth), dtype=np.uint64)
+    for name, bits in KEY_FIELDS:
+        value = np.asarray(fields[name]).astype(np.uint64)
+        if np.any(value >> np.uint64(bits)):
+            raise ValueError(f"Campo '{name}' da chave não cabe em {bits} bits")
+        keys |= value << np.uint64(KEY_SHIFTS[name])
+    return keys
+
+
+class RenderQueue:
+    """
+    Coleta comandos de desenho durante o frame e os executa ordenados pela chave.
+
+    Programas, VAOs e materiais ganham índices pequenos (na ordem em que aparecem)
+    para caber nos campos da chave; os índices são mantidos entre frames, então a
+    ordem dos lotes é estável.
+    """
+
+    def __init__(self, far=500.0):
+        """
+        Args:
+            far: Distância que corresponde à profundidade 1.0 da chave
+        """
+        self.far = far
+        self.programs = {}   # ID do programa -> índice
+        self.vaos = {}       # ID do VAO -> índice
+        self.materials = {}  # DrawMaterial -> índice
+        self.program_ids = []
+        self.vao_ids = []
+        self.material_list = []
+        self._locations = {}  # (programa, nome) -> localização
+        self.clear()
+
+    def clear(self):
+        """Descarta os comandos do frame."""
+        self._batches = []
+        self._matrices = []
+        self._callbacks = []
+        self._num_matrices = 0
+
+    def _index(self, table, ids, value, limit_bits):
+        if value not in table:
+            if len(ids) >= 1 << limit_bits:
+                raise ValueError("Muitos valores distintos para a chave de ordenação")
+            table[value] = len(ids)
+            ids.append(value)
+        return table[value]
+
+    def _location(self, program, name):
+        key = (program, name)
+        if key not in self._locations:
+            self._locations[key] = glGetUniformLocation(program, name)
+        return self._locations[key]
+
+    def submit(self, pass_, program, VAO, count, material, indexed=True, depth=0.0,
+               model=None, before=None, after=None, index_type=GL_UNSIGNED_INT):
+        """
+        Enfileira um único comando.
+
+        Args:
+            pass_: PASS_SKY_FIRST, PASS_OPAQUE ou PASS_SKY_LAST
+            program: Programa de shader
+            VAO: VAO da malha (0 se o shader gera os vértices)
+            count: Número de índices (ou de vértices se indexed=False)
+            material: DrawMaterial
+            indexed: glDrawElements (True) ou glDrawArrays (False)
+            depth: Distância até a câmera (ordena da frente para trás no passe)
+            model: Model matrix (4, 4) em ordem de coluna, enviada em "model" (opcional)
+            before, after: Funções chamadas logo antes e logo depois do desenho
+                (ex.: iniciar e encerrar uma query)
+            index_type: GL_UNSIGNED_INT ou GL_UNSIGNED_SHORT
+        """
+        mode = DRAW_ELEMENTS if indexed else DRAW_ARRAYS
+        matrices = None if model is None else np.asarray(model, dtype=np.float32)[None]
+        hooks = None if before is None and after is None else (before, after)
+        self._submit(pass_, program, [VAO], [count], [material], [0], [depth], matrices, mode,
+                     [hooks], [index_type])
+
+    def submit_batch(self, pass_, program, vaos, counts, materials, material_indices,
+                     depths, matrices, index_types=None, first_indices=None, base_vertices=None):
+        """
+        Enfileira um comando indexado por corpo, de uma vez.
+
+        Args:
+            vaos, counts: VAO e número de índices de cada corpo (N,)
+            materials: Lista de DrawMaterial
+            material_indices: Índice em 'materials' de cada corpo (N,)
+            depths: Distância de cada corpo até a câmera (N,)
+            matrices: Model matrices (N, 4, 4) em ordem de coluna
+            index_types: Tipo dos índices de cada corpo (N,) (padrão: GL_UNSIGNED_INT)
+            first_indices, base_vertices: Primeiro índice e base vertex de cada corpo (N,),
+                para malhas que dividem um buffer (ex.: MeshArena; padrão: 0)
+        """
+        self._submit(pass_, program, vaos, counts, materials, material_indices, depths,
+                     np.asarray(matrices, dtype=np.float32), DRAW_ELEMENTS, None, index_types,
+                     first_indices, base_vertices)
+
+    def submit_callback(self, pass_, callback, depth=0.0):
+        """
+        Enfileira uma função que desenha por conta própria (ex.: o InstancedRenderer).
+        Depois dela o executor considera todo o estado OpenGL desconhecido.
+        """
+        self._submit(pass_, 0, [0], [0], [DrawMaterial((), ())], [0], [depth], None, DRAW_NONE,
+                     [(callback, None)])
+
+    def _submit(self, pass_, program, vaos, counts, materials, material_indices, depths,
+                matrices, mode, callbacks, index_types=None, first_indices=None,
+                base_vertices=None):
+        program_index = self._index(self.programs, self.program_ids, program, 8)
+        vao_table = np.array([self._index(self.vaos, self.vao_ids, int(VAO), 12) for VAO in vaos],
+                             dtype=np.int64)
+        material_table = np.array(
+            [self._index(self.materials, self.material_list, m, 16) for m in materials],
+            dtype=np.int64)
+        material_ids = material_table[np.asarray(material_indices, dtype=np.int64)]
+        depths = np.asarray(depths, dtype=np.float64) / self.far
+        n = len(vao_table)
+
+        if matrices is not None:
+            rows = np.arange(self._num_matrices, self._num_matrices + n)
+            self._matrices.append(matrices)
+            self._num_matrices += n
+        else:
+            rows = np.full(n, -1)
+        callback_ids = np.full(n, -1)
+        if callbacks is not None:
+            for i, hooks in enumerate(callbacks):
+                if hooks is not None:
+                    callback_ids[i] = len(self._callbacks)
+                    self._callbacks.append(hooks)
+
+        self._batches.append({
+            "key": pack_keys(pass_, program_index, vao_table, material_ids, depths),
+            "pass": np.full(n, pass_), "program": np.full(n, program_index),
+            "vao": vao_table, "material": material_ids,
+            "count": np.asarray(counts, dtype=np.int64), "mode": np.full(n, mode),
+            "index_type": np.full(n, GL_UNSIGNED_INT, dtype=np.int64) if index_types is None
+            else np.asarray(index_types, dtype=np.int64),
+            "first": np.zeros(n, dtype=np.int64) if first_indices is None
+            else np.asarray(first_indices, dtype=np.int64),
+            "base": np.zeros(n, dtype=np.int64) if base_vertices is None
+            else np.asarray(base_vertices, dtype=np.int64),
+            "row": rows, "callback": callback_ids,
+        })
+
+    def __len__(self):
+        return sum(len(batch["key"]) for batch in self._batches)
+
+    def execute(self, stats=None, on_pass=None):
+        """
+        Ordena os comandos do frame e os executa, emitindo só o estado que muda.
+        Ao final restaura o estado de profundidade padrão e esvazia a fila.
+        Retorna (trocas de estado emitidas, trocas evitadas).
+
+        Args:
+            stats: FrameStats que recebe os contadores (opcional)
+            on_pass: Função chamada com o número do passe sempre que um passe
+                começa, e com None depois do último (ex.: Profiler.gpu_switch)
+        """
+        if not self._batches:
+            return 0, 0
+        columns = {name: np.concatenate([batch[name] for batch in self._batches])
+                   for name in self._batches[0]}
+        order = np.argsort(columns["key"], kind="stable")
+        matrices = np.concatenate(self._matrices) if self._matrices else None
+        sorted_columns = [columns[name][order].tolist()
+                          for name in ("pass", "program", "vao", "material", "count",
+                                       "mode", "index_type", "first", "base", "row", "callback")]
+
+        emitted = skipped = 0
+        state = {}  # estado atual conhecido: None = desconhecido
+
+        def change(slot, value):
+            nonlocal emitted, skipped
+            if slot in state and state[slot] == value:
+                skipped += 1
+                return False
+            state[slot] = value
+            emitted += 1
+            return True
+
+        current_pass = None
+        for pass_, program_index, vao_index, material_index, count, mode, index_type, first, base, \
+                row, callback in zip(*sorted_columns):
+            if on_pass is not None and pass_ != current_pass:
+                on_pass(pass_)
+            current_pass = pass_
+            depth_state = PASS_DEPTH[pass_]
+            if change("depth", depth_state):
+                glDepthMask(GL_TRUE if depth_state[0] else GL_FALSE)
+                glDepthFunc(depth_state[1])
+
+            before, after = self._callbacks[callback] if callback >= 0 else (None, None)
+            if mode == DRAW_NONE:
+                before()
+                state.clear()  # o callback pode ter mudado qualquer coisa
+                continue
+
+            program = self.program_ids[program_index]
+            if change("program", program):
+                glUseProgram(program)
+
+            VAO = self.vao_ids[vao_index]
+            if change("vao", VAO):
+                glBindVertexArray(VAO)
+
+            material = self.material_list[material_index]
+            for unit, texture in enumerate(material.textures):
+                if texture is None:
+                    continue
+                if change(("texture", unit), texture):
+                    if state.get("active_unit") != unit:
+                        glActiveTexture(GL_TEXTURE0 + unit)
+                        state["active_unit"] = unit
+                    glBindTexture(*texture)
+            for name, value in material.uniforms:
+                if change(("uniform", program, name), value):
+                    glUniform1i(self._location(program, name), value)
+
+            if row >= 0:
+                glUniformMatrix4fv(self._location(program, "model"), 1, GL_FALSE, matrices[row])
+            if before is not None:
+                before()
+
+            if mode == DRAW_ELEMENTS and (first or base):
+                size = 2 if index_type == GL_UNSIGNED_SHORT else 4
+                glDrawElementsBaseVertex(GL_TRIANGLES, count, index_type,
+                                         ctypes.c_void_p(first * size), base)
+            elif mode == DRAW_ELEMENTS:
+                glDrawElements(GL_TRIANGLES, count, index_type, None)
+            else:
+                glDrawArrays(GL_TRIANGLES, 0, count)
+            if after is not None:
+                after()
+            if stats is not None:
+                stats.add("triangles", count // 3)
+                stats.add("draw_calls")
+
+        if on_pass is not None:
+            on_pass(None)
+
+        # Deixar o estado como o resto do código espera
+        if state.get("depth") != DEFAULT_DEPTH:
+            glDepthMask(GL_TRUE)
+            glDepthFunc(GL_LESS)
+        glBindVertexArray(0)
+
+        if stats is not None:
+            stats.add("binds", emitted)
+            stats.add("binds_skipped", skipped)
+        self.clear()
+        return emitted, skipped
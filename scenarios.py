@@ -0,0 +1,113 @@
+# scenarios.py
+"""
+Cenários de benchmark reproduzíveis: caminhos de câmera roteirizados e
+gravação/reprodução da entrada (teclado e mouse), no lugar de
+pygame.key.get_pressed() e pygame.mouse.get_rel().
+
+Com o relógio fixo (--frame-step) e um caminho ou uma gravação, cada execução
+renderiza exatamente a mesma sequência de frames.
+"""
+from collections import namedtuple
+import json
+import math
+
+import glm
+
+INPUT_KEYS = ("w", "s", "a", "d", "up", "down", "left", "right")
+NO_KEYS = dict.fromkeys(INPUT_KEYS, False)
+
+
+class OrbitPath:
+    """Câmera girando ao redor do alvo a uma distância e altura fixas, olhando para ele."""
+
+    def __init__(self, radius, height, period):
+        """
+        Args:
+            radius: Distância horizontal até o alvo
+            height: Altura acima do plano do alvo
+            period: Segundos (de simulação) por volta completa
+        """
+        self.radius = radius
+        self.height = height
+        self.period = period
+
+    def apply(self, camera, time, target):
+        angle = 2.0 * math.pi * time / self.period
+        offset = glm.vec3(self.radius * math.cos(angle), self.height, self.radius * math.sin(angle))
+        camera.look_at(target + offset, target)
+
+
+class FlybyPath:
+    """
+    Passagem rasante: a câmera cruza em linha reta ao lado do alvo (que a
+    acompanha na órbita), chegando a 'closest' unidades dele no meio do trajeto.
+    """
+
+    def __init__(self, span, closest, duration):
+        """
+        Args:
+            span: Meia extensão do trajeto (de -span a +span ao lado do alvo)
+            closest: Menor distância até o alvo, no meio do trajeto
+            duration: Segundos (de simulação) de uma ponta à outra; depois recomeça
+        """
+        self.span = span
+        self.closest = closest
+        self.duration = duration
+
+    def apply(self, camera, time, target):
+        s = (time % self.duration) / self.duration
+        x = -self.span + 2.0 * self.span * s
+        offset = glm.vec3(x, 0.3 * self.closest, self.closest)
+        camera.look_at(target + offset, target)
+
+
+# asteroids: corpos extras do cinturão; follow: corpo seguido pela câmera (None = origem)
+Scenario = namedtuple("Scenario", ["asteroids", "path", "follow", "description"])
+
+SCENARIOS = {
+    "three_body": Scenario(0, OrbitPath(radius=9.0, height=3.0, period=10.0), None,
+                           "Sol, Terra e Lua, câmera orbitando o Sol"),
+    "belt_10k": Scenario(10_000, OrbitPath(radius=16.0, height=6.0, period=10.0), None,
+                         "Cinturão com 10.000 asteroides"),
+    "earth_flyby": Scenario(0, FlybyPath(span=4.0, closest=0.8, duration=10.0), "earth",
+                            "Passagem rasante pela Terra (LOD mais alto, planeta cobrindo a tela)"),
+}
+
+
+class InputRecorder:
+    """Grava, por frame, o delta time, as teclas pressionadas e o movimento do mouse."""
+
+    def __init__(self):
+        self.frames = []
+
+    def add(self, delta_time, keys, mouse_delta):
+        pressed = [name for name in INPUT_KEYS if keys.get(name)]
+        self.frames.append([delta_time, pressed, int(mouse_delta[0]), int(mouse_delta[1])])
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"version": 1, "frames": self.frames}, f)
+
+
+class InputReplay:
+    """
+    Reproduz uma gravação do InputRecorder. O delta time gravado é usado na
+    câmera para que ela refaça o mesmo trajeto; terminada a gravação, não há entrada.
+    """
+
+    def __init__(self, path):
+        with open(path) as f:
+            self.frames = json.load(f)["frames"]
+        self.index = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def next(self, default_delta):
+        """Retorna (delta_time, keys, mouse_delta) do próximo frame gravado."""
+        if self.index >= len(self.frames):
+            return default_delta, NO_KEYS, (0, 0)
+        delta_time, pressed, dx, dy = self.frames[self.index]
+        self.index += 1
+        keys = dict(NO_KEYS, **dict.fromkeys(pressed, True))
+        return delta_time, keys, (dx, dy)
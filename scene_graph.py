@@ -0,0 +1,178 @@
+# scene_graph.py
+"""
+Motor de transformações em estrutura de arrays (SoA) para a hierarquia de corpos.
+
+Todos os corpos ficam em arrays NumPy contíguos (raio, velocidades, raio de órbita,
+índice do pai). A hierarquia é ordenada topologicamente uma única vez e, a cada
+update(time), todas as model matrices são calculadas em lote, um nível de
+profundidade por vez. O resultado é um único array (N, 4, 4) float32 em ordem
+de coluna, pronto para glBufferData / glUniformMatrix4fv.
+"""
+import numpy as np
+
+from orbits import perifocal_basis, orbit_offsets
+from ephemeris import scene_elements
+
+# Campos por corpo guardados em arrays (um valor por linha)
+FIELDS = (
+    "radius", "rotation_speed", "orbit_radius", "orbit_speed", "orbit_phase",
+    "eccentricity", "inclination", "ascending_node", "periapsis",
+)
+
+
+class SceneGraph:
+    """
+    Hierarquia de corpos celestes em arrays contíguos.
+
+    Reproduz Planet.update:
+        filho: T(posição do pai + órbita) * R_y(longitude verdadeira) * R_y(rotação + 90°) * S(raio)
+        raiz:  R_y(rotação + 90°) * S(raio)
+    As órbitas são keplerianas (ver orbits.py); o caso circular é e = 0, i = 0.
+    Com efemérides (set_ephemeris), as órbitas dentro do intervalo das tabelas
+    vêm dos polinômios de Chebyshev em vez do propagador.
+    """
+
+    def __init__(self, planets=()):
+        """
+        Constrói o grafo a partir de uma lista de Planet (em qualquer ordem) e
+        transforma cada planeta numa visão sobre a sua linha.
+
+        Args:
+            planets: Planetas da cena; os pais precisam estar na lista
+        """
+        planets = list(planets)
+        n = len(planets)
+        position = {id(planet): i for i, planet in enumerate(planets)}
+
+        parent = np.full(n, -1, dtype=np.int64)
+        for i, planet in enumerate(planets):
+            if planet.parent is not None:
+                parent[i] = position[id(planet.parent)]
+
+        # Ordenação topológica: profundidade de cada corpo na hierarquia
+        depth = np.zeros(n, dtype=np.int64)
+        has_parent = parent >= 0
+        for _ in range(n):
+            new_depth = np.where(has_parent, depth[parent] + 1, 0)
+            if np.array_equal(new_depth, depth):
+                break
+            depth = new_depth
+        else:
+            if n:
+                raise ValueError("Hierarquia de planetas com ciclo")
+
+        order = np.argsort(depth, kind="stable")
+        row_of = np.empty(n, dtype=np.int64)
+        row_of[order] = np.arange(n)
+
+        self.count = n
+        self.depth = depth[order]
+        self.parent = np.where(parent[order] >= 0, row_of[np.maximum(parent[order], 0)], -1)
+        self.orbit_mask = (self.parent >= 0).astype(np.float64)  # 0 para as raízes
+        for field in FIELDS:
+            values = np.array([getattr(planet, field) for planet in planets], dtype=np.float64)
+            setattr(self, field, values[order] if n else values)
+
+        # Faixas [início, fim) de cada nível de profundidade
+        levels = np.arange(self.depth.max() + 1 if n else 0)
+        self.level_bounds = list(zip(
+            np.searchsorted(self.depth, levels, side="left"),
+            np.searchsorted(self.depth, levels, side="right"),
+        ))
+
+        # Matrizes em ordem de coluna: models[i, coluna, linha]
+        self.models = np.zeros((n, 4, 4), dtype=np.float32)
+        self.models[:, 3, 3] = 1.0
+        self.positions = np.zeros((n, 3), dtype=np.float64)
+        self.time = None
+        self.ephemeris = None
+        self.dirty = False
+        self.invalidate()
+
+        for planet, row in zip(planets, row_of):
+            planet.attach(self, int(row))
+        self.rows = row_of  # linha de cada planeta na ordem original da lista
+
+    def invalidate(self):
+        """
+        Marca os elementos orbitais como alterados e força o recálculo das
+        matrizes no próximo update. Custa O(1): os dados derivados são
+        refeitos uma única vez, no próximo update (ver _refresh).
+        """
+        self.time = None
+        self.dirty = True
+
+    def _refresh(self):
+        """
+        Recalcula os dados derivados dos elementos orbitais (base perifocal) e
+        confere se as efemérides ainda valem, uma vez por lote de alterações.
+        """
+        self.dirty = False
+        self.P, self.Q = perifocal_basis(self.inclination, self.ascending_node, self.periapsis)
+        # Tabelas ajustadas para outros elementos orbitais deixam de valer
+        if self.ephemeris is not None:
+            current = scene_elements(self)
+            if any(not np.array_equal(current[name], values)
+                   for name, values in self._ephemeris_elements.items()):
+                self.ephemeris = None
+
+    def set_ephemeris(self, ephemeris):
+        """
+        Passa a tirar as órbitas de um ephemeris.Ephemeris (tabelas na ordem das
+        linhas deste grafo). None volta ao propagador kepleriano.
+        """
+        if ephemeris is not None and ephemeris.count != self.count:
+            raise ValueError(f"Efemérides de {ephemeris.count} corpos para um grafo de {self.count}")
+        self.ephemeris = ephemeris
+        self._ephemeris_elements = scene_elements(self)
+        self.time = None
+
+    def update(self, time):
+        """
+        Calcula todas as model matrices para o instante 'time' (segundos).
+        Chamadas repetidas com o mesmo tempo não recalculam nada.
+        """
+        if self.dirty:
+            self._refresh()
+        if time == self.time:
+            return self.models
+        self.time = time
+
+        # 1. Órbitas: posição relativa ao pai e longitude verdadeira, das efemérides
+        # ou do propagador kepleriano (fora do intervalo das tabelas)
+        if self.ephemeris is not None and self.ephemeris.covers(time):
+            offsets, true_longitude = self.ephemeris.evaluate(time)
+        else:
+            mean_anomaly = np.radians(self.orbit_phase + time * self.orbit_speed)
+            offsets, true_anomaly = orbit_offsets(
+                self.orbit_radius, self.eccentricity, mean_anomaly, self.P, self.Q
+            )
+            true_longitude = (np.radians(self.ascending_node + self.periapsis) + true_anomaly) * self.orbit_mask
+
+        # 2. Rotação própria (+90° de correção dos pólos). A rotação da órbita também
+        # gira o corpo (longitude verdadeira); as raízes não têm órbita.
+        theta = np.radians(time * self.rotation_speed) + np.pi / 2 + true_longitude
+
+        # 3. Rotação e escala: bloco 3x3 de todos os corpos
+        cos_r = np.cos(theta) * self.radius
+        sin_r = np.sin(theta) * self.radius
+        models = self.models
+        models[:, 0, 0] = cos_r
+        models[:, 0, 2] = -sin_r
+        models[:, 1, 1] = self.radius
+        models[:, 2, 0] = sin_r
+        models[:, 2, 2] = cos_r
+
+        # 4. Translação: posição do pai + órbita, um nível de profundidade por vez
+        positions = self.positions
+        for level, (start, end) in enumerate(self.level_bounds):
+            if level == 0:
+                # Raízes (sem pai) ficam na origem
+                positions[start:end] = 0.0
+                continue
+            # np.take é bem mais rápido que indexação sofisticada para linhas (N, 3)
+            np.take(positions, self.parent[start:end], axis=0, out=positions[start:end])
+            positions[start:end] += offsets[start:end]
+
+        models[:, 3, :3] = positions
+        return models
@@ -0,0 +1,258 @@
+# shader_cache.py
+"""
+Cache persistente em disco dos programas de shader já linkados.
+
+Depois de compilar e linkar um programa, o binário do driver
+(glGetProgramBinary) é salvo num arquivo cujo nome é o hash de (código dos
+shaders, GL_RENDERER, GL_VERSION). Nas execuções seguintes o programa é
+criado direto do binário com glProgramBinary, sem compilar nada. Se o driver
+recusar o binário (atualização do driver, formato não suportado), o arquivo
+é apagado e o programa é compilado do código-fonte normalmente.
+
+Uso pela linha de comando:
+    python3 shader_cache.py clear    # apaga o cache
+    python3 shader_cache.py info     # mostra entradas e tamanho total
+"""
+import argparse
+import ctypes
+import hashlib
+import os
+import struct
+import time
+
+import numpy as np
+from OpenGL.GL import (
+    GL_VERTEX_SHADER, GL_FRAGMENT_SHADER, GL_TRUE, GL_LINK_STATUS, GL_RENDERER, GL_VERSION,
+    GL_PROGRAM_BINARY_LENGTH, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_NUM_PROGRAM_BINARY_FORMATS,
+    glCreateProgram, glAttachShader, glDetachShader, glDeleteShader, glDeleteProgram,
+    glLinkProgram, glGetProgramiv, glGetProgramInfoLog, glProgramParameteri,
+    glGetProgramBinary, glProgramBinary, glGetString, glGetIntegerv
+)
+from OpenGL.GL.shaders import compileShader
+from OpenGL.error import GLError, NullFunctionError
+
+CACHE_DIR = os.path.join(".cache", "shaders")
+
+# Cabeçalho de cada arquivo: formato do binário (uint32) e tempo de compilação+link (float64, s)
+HEADER = struct.Struct("<Id")
+
+
+class ProgramCache:
+    """
+    Cache de programas linkados. Conta acertos, faltas e binários recusados pelo
+    driver, e estima o tempo economizado (tempo de compilação gravado na falta
+    menos o tempo de carregar o binário no acerto).
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        """
+        Args:
+            cache_dir: Diretório onde os binários são salvos
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.compile_time = 0.0  # gasto compilando (faltas)
+        self.time_saved = 0.0    # economizado nos acertos
+        self._supported = None
+
+    def supported(self):
+        """
+        True se o driver atual oferece algum formato de binário de programa e as
+        funções glProgramBinary/glGetProgramBinary estão carregadas no contexto.
+        """
+        if self._supported is None:
+            self._supported = (bool(glProgramBinary) and bool(glGetProgramBinary)
+                               and int(glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS)) > 0)
+        return self._supported
+
+    @staticmethod
+    def key(vertex_src, fragment_src):
+        """Hash do código dos shaders e do driver (o binário só vale para o mesmo driver)."""
+        digest = hashlib.sha1()
+        for part in (vertex_src.encode("utf-8"), fragment_src.encode("utf-8"),
+                     glGetString(GL_RENDERER), glGetString(GL_VERSION)):
+            digest.update(part)
+            digest.update(b"\0")
+        return digest.hexdigest()[:16]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".bin")
+
+    def load(self, key):
+        """Cria o programa a partir do binário salvo. Retorna o ID ou None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) <= HEADER.size:
+            return None
+        binary_format, compile_time = HEADER.unpack_from(data)
+        binary = np.frombuffer(data, dtype=np.uint8, offset=HEADER.size)
+
+        start = time.perf_counter()
+        program = glCreateProgram()
+        try:
+            glProgramBinary(program, binary_format, binary.ctypes.data_as(ctypes.c_void_p), binary.size)
+            linked = glGetProgramiv(program, GL_LINK_STATUS)
+        except (GLError, NullFunctionError):
+            # Formato desconhecido ou função ausente: tratado como binário recusado
+            linked = False
+        if not linked:
+            # Driver recusou (outra versão ou formato): descartar e recompilar
+            glDeleteProgram(program)
+            self._drop(path)
+            self.rejected += 1
+            return None
+        self.time_saved += max(0.0, compile_time - (time.perf_counter() - start))
+        os.utime(path)
+        return program
+
+    def store(self, key, program, compile_time):
+        """
+        Salva o binário do programa linkado (escrita atômica). Se o driver não
+        entregar o binário, a entrada é descartada e o programa só não fica no cache.
+        """
+        path = self._path(key)
+        try:
+            length = int(glGetProgramiv(program, GL_PROGRAM_BINARY_LENGTH))
+            if length == 0:
+                return
+            binary = np.empty(length, dtype=np.uint8)
+            written = ctypes.c_int()
+            binary_format = ctypes.c_uint()
+            glGetProgramBinary(program, length, ctypes.byref(written), ctypes.byref(binary_format),
+                               binary.ctypes.data_as(ctypes.c_void_p))
+        except (GLError, NullFunctionError):
+            self._drop(path)
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(binary_format.value, compile_time))
+            f.write(binary[:written.value].tobytes())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _drop(path):
+        """Remove a entrada do cache, se existir."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def compile(vertex_src, fragment_src, retrievable=False, names=("vertex", "fragment")):
+        """
+        Compila e linka o programa do código-fonte. Com retrievable=True pede ao
+        driver para manter o binário disponível (precisa ser antes do link).
+        """
+        shaders = []
+        for source, kind, name in zip((vertex_src, fragment_src),
+                                      (GL_VERTEX_SHADER, GL_FRAGMENT_SHADER), names):
+            try:
+                shaders.append(compileShader(source, kind))
+            except RuntimeError as e:
+                print(f"ERRO ao compilar {name}:\n{e}")
+                raise
+
+        program = glCreateProgram()
+        for shader in shaders:
+            glAttachShader(program, shader)
+        if retrievable:
+            glProgramParameteri(program, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
+        glLinkProgram(program)
+        for shader in shaders:
+            glDetachShader(program, shader)
+            glDeleteShader(shader)
+        if not glGetProgramiv(program, GL_LINK_STATUS):
+            log = glGetProgramInfoLog(program)
+            glDeleteProgram(program)
+            raise RuntimeError(f"Falha ao linkar {names[0]} + {names[1]}:\n{log}")
+        return program
+
+    def get_or_create(self, vertex_path, fragment_path):
+        """
+        Carrega o programa do cache ou o compila do código-fonte e o salva.
+        Retorna o ID do programa.
+        """
+        with open(vertex_path, "r") as f:
+            vertex_src = f.read()
+        with open(fragment_path, "r") as f:
+            fragment_src = f.read()
+        names = (f"Vertex Shader ({vertex_path})", f"Fragment Shader ({fragment_path})")
+
+        if not self.supported():
+            return self.compile(vertex_src, fragment_src, names=names)
+
+        key = self.key(vertex_src, fragment_src)
+        program = self.load(key)
+        if program is not None:
+            self.hits += 1
+            return program
+
+        self.misses += 1
+        start = time.perf_counter()
+        program = self.compile(vertex_src, fragment_src, retrievable=True, names=names)
+        elapsed = time.perf_counter() - start
+        self.compile_time += elapsed
+        self.store(key, program, elapsed)
+        return program
+
+    def summary(self):
+        """Texto curto com acertos, faltas e tempo economizado."""
+        if not self.supported():
+            return "cache de shaders indisponível (driver sem formatos de binário)"
+        text = (f"shaders: {self.hits} do cache, {self.misses} compilados "
+                f"({self.compile_time * 1000:.1f} ms), {self.time_saved * 1000:.1f} ms economizados")
+        if self.rejected:
+            text += f", {self.rejected} binários recusados pelo driver"
+        return text
+
+    def _entries(self):
+        """Lista (caminho, tamanho) dos arquivos do cache."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [(os.path.join(self.cache_dir, name), os.path.getsize(os.path.join(self.cache_dir, name)))
+                for name in os.listdir(self.cache_dir) if name.endswith(".bin")]
+
+    def clear(self):
+        """Apaga todas as entradas do cache."""
+        for path, _ in self._entries():
+            os.remove(path)
+
+
+_default_cache = ProgramCache()
+
+
+def load_program(vertex_path, fragment_path):
+    """Atalho para ProgramCache.get_or_create usando o cache padrão."""
+    return _default_cache.get_or_create(vertex_path, fragment_path)
+
+
+def default_cache():
+    """O ProgramCache usado por load_program (para ler as estatísticas)."""
+    return _default_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerencia o cache de programas de shader.")
+    parser.add_argument("command", choices=["clear", "info"])
+    parser.add_argument("--dir", default=CACHE_DIR, help="Diretório do cache")
+    args = parser.parse_args()
+
+    # Não precisa de contexto OpenGL: só lida com os arquivos
+    cache = ProgramCache(args.dir)
+    if args.command == "clear":
+        cache.clear()
+        print(f"Cache limpo: {args.dir}")
+    entries = cache._entries()
+    print(f"{len(entries)} programas, {sum(size for _, size in entries) / 2**10:.1f} KB em {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
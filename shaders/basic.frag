@@ -3,23 +3,73 @@
 in vec2 TexCoord;
 in vec3 Normal;
 in vec3 FragPos;
-
-// Vetores em espaço tangente
-in vec3 TangentLightPos;
-in vec3 TangentViewPos;
-in vec3 TangentFragPos;
+// Base tangente em world space (para o normal map)
+in vec3 Tangent;
+in vec3 Bitangent;
 
 out vec4 FragColor;
 
 uniform sampler2D textureSampler;
 uniform sampler2D normalMapSampler;
 
-// Uniforms de Iluminação
-uniform vec3 lightColor;
-uniform float ambientStrength;
+// Estado da câmera, compartilhado por todos os programas (UBO, ponto de ligação 0)
+layout (std140) uniform FrameData {
+    mat4 view;
+    mat4 projection;
+    mat4 viewProjection;
+    vec3 viewPos;  // posição da câmera (world space)
+    float time;
+};
+
+// Luz do Sol (UBO, ponto de ligação 1)
+layout (std140) uniform LightData {
+    vec3 lightPos;
+    float ambientStrength;
+    vec3 lightColor;
+};
+
+// Luzes pontuais agrupadas por cluster (UBO, ponto de ligação 2; ver clustered_lighting.py)
+layout (std140) uniform ClusterData {
+    uvec4 clusterGrid;    // tiles em x, y, fatias em z, número de luzes pontuais
+    vec4 clusterParams;   // largura e altura do tile (pixels), escala e bias das fatias
+    uint clusterNaive;    // 1: percorre todas as luzes (comparação com o clustered)
+};
+uniform usamplerBuffer clusterSampler;     // (offset, quantidade) de cada cluster
+uniform usamplerBuffer lightIndexSampler;  // índices das luzes, em sequência por cluster
+uniform samplerBuffer lightSampler;        // 2 texels por luz: (posição, alcance), (cor, 0)
+
 uniform int isSun;
 uniform int useNormalMap; // 1 para usar normal map, 0 para usar normal padrão
 
+const vec3 specularColor = vec3(0.5);
+const float shininess = 32.0;
+
+// Difuso + especular (Phong) de uma luz com direção e radiância dadas
+vec3 shade(vec3 normal, vec3 viewDir, vec3 lightDir, vec3 radiance, vec3 textureColor)
+{
+    float diff = max(dot(normal, lightDir), 0.0);
+    vec3 reflectDir = reflect(-lightDir, normal);
+    float spec = pow(max(dot(viewDir, reflectDir), 0.0), shininess);
+    return radiance * (diff * textureColor + specularColor * spec);
+}
+
+// Luz pontual 'index': atenuação (1 - (d/r)²)², zero a partir do alcance r
+vec3 pointLight(int index, vec3 normal, vec3 viewDir, vec3 textureColor)
+{
+    vec4 positionRadius = texelFetch(lightSampler, 2 * index);
+    if (positionRadius.w <= 0.0) {
+        return vec3(0.0);
+    }
+    vec3 toLight = positionRadius.xyz - FragPos;
+    float ratio = length(toLight) / positionRadius.w;
+    float attenuation = clamp(1.0 - ratio * ratio, 0.0, 1.0);
+    if (attenuation == 0.0) {
+        return vec3(0.0);
+    }
+    vec3 color = texelFetch(lightSampler, 2 * index + 1).rgb;
+    return shade(normal, viewDir, normalize(toLight), color * attenuation * attenuation, textureColor);
+}
+
 void main()
 {
     // 1. Ler a cor da textura
@@ -30,43 +80,42 @@ void main()
         FragColor = vec4(textureColor, 1.0);
         return;
     }
-    
-    // 2. Determinar a normal a usar (com ou sem normal map)
-    vec3 normal;
-    vec3 lightDir;
-    vec3 viewDir;
-    
+
+    // 2. Determinar a normal (world space), com ou sem normal map
+    vec3 normal = normalize(Normal);
     if (useNormalMap == 1) {
-        // Usar normal map (espaço tangente)
+        // Normal map em espaço tangente, levado para world space pela base TBN
         vec3 normalMapColor = texture(normalMapSampler, TexCoord).rgb;
-        normal = normalize(normalMapColor * 2.0 - 1.0);
-        lightDir = normalize(TangentLightPos - TangentFragPos);
-        viewDir = normalize(TangentViewPos - TangentFragPos);
-    } else {
-        // Usar normal padrão (world space)
-        normal = normalize(Normal);
-        lightDir = normalize(TangentLightPos - FragPos);
-        viewDir = normalize(TangentViewPos - FragPos);
+        normal = normalize(mat3(Tangent, Bitangent, normal) * (normalMapColor * 2.0 - 1.0));
     }
-    
+    vec3 viewDir = normalize(viewPos - FragPos);
+
     // 3. Componente Ambiente
     vec3 ambient = ambientStrength * lightColor * textureColor;
 
-    // 4. Componente Difuso
-    float diff = max(dot(normal, lightDir), 0.0);
-    vec3 diffuse = diff * lightColor * textureColor;
+    // 4. Difuso e especular do Sol
+    vec3 result = ambient + shade(normal, viewDir, normalize(lightPos - FragPos), lightColor, textureColor);
+
+    // 5. Luzes pontuais: só as do cluster do fragmento (ou todas, no modo ingênuo)
+    if (clusterGrid.w > 0u) {
+        if (clusterNaive == 1u) {
+            for (int i = 0; i < int(clusterGrid.w); ++i) {
+                result += pointLight(i, normal, viewDir, textureColor);
+            }
+        } else {
+            // Tile pela posição na tela, fatia pelo log da profundidade na câmera
+            float depth = -(view * vec4(FragPos, 1.0)).z;
+            uvec2 tile = min(uvec2(gl_FragCoord.xy / clusterParams.xy), clusterGrid.xy - 1u);
+            float slice = clamp(floor(log(depth) * clusterParams.z + clusterParams.w),
+                                0.0, float(clusterGrid.z - 1u));
+            int cluster = int(tile.x + clusterGrid.x * (tile.y + clusterGrid.y * uint(slice)));
+            uvec2 range = texelFetch(clusterSampler, cluster).xy;
+            for (uint i = 0u; i < range.y; ++i) {
+                int index = int(texelFetch(lightIndexSampler, int(range.x + i)).r);
+                result += pointLight(index, normal, viewDir, textureColor);
+            }
+        }
+    }
 
-    // 5. Componente Especular
-    vec3 specularColor = vec3(0.5);
-    float shininess = 32.0;
-    
-    vec3 reflectDir = reflect(-lightDir, normal);
-    
-    float spec = pow(max(dot(viewDir, reflectDir), 0.0), shininess);
-    vec3 specular = specularColor * spec;
-    
-    // 6. Cor Final (Ambient + Diffuse + Specular)
-    vec3 result = ambient + diffuse + specular;
-    
     FragColor = vec4(result, 1.0);
-}
\ No newline at end of file
+}
@@ -0,0 +1,50 @@
+#version 330 core
+
+layout (location = 0) in vec3 aPos;
+layout (location = 1) in vec2 aTexCoord;
+layout (location = 2) in vec3 aNormal;
+// w: sinal da bitangente (1 no layout de floats, onde o w ausente vale 1;
+// ±1 no layout compacto, com ±1/3 no GL 3.3 por causa da normalização antiga)
+layout (location = 3) in vec4 aTangent;
+
+// Atributo por instância: model matrix (mat4 ocupa as localizações 5, 6, 7 e 8)
+layout (location = 5) in mat4 aModel;
+
+out vec2 TexCoord;
+out vec3 Normal;
+out vec3 FragPos;
+// Base tangente em world space: a iluminação toda é feita em world space
+out vec3 Tangent;
+out vec3 Bitangent;
+
+// Estado da câmera, compartilhado por todos os programas (UBO, ponto de ligação 0)
+layout (std140) uniform FrameData {
+    mat4 view;
+    mat4 projection;
+    mat4 viewProjection;
+    vec3 viewPos;  // posição da câmera (world space)
+    float time;
+};
+
+void main()
+{
+    mat4 model = aModel;
+
+    gl_Position = viewProjection * model * vec4(aPos, 1.0);
+    
+    FragPos = vec3(model * vec4(aPos, 1.0));
+    TexCoord = aTexCoord;
+    
+    // Transformar normais e tangentes para world space
+    vec3 T = normalize(vec3(model * vec4(aTangent.xyz, 0.0)));
+    vec3 N = normalize(vec3(model * vec4(aNormal, 0.0)));
+    
+    // Re-ortogonalizar usando Gram-Schmidt (T = T - (T·N)N)
+    T = normalize(T - dot(T, N) * N);
+    // B = N × T, com a orientação guardada no w da tangente
+    vec3 B = cross(N, T) * sign(aTangent.w);
+
+    Tangent = T;
+    Bitangent = B;
+    Normal = N;
+}
@@ -0,0 +1,11 @@
+#version 330 core
+
+in vec2 TexCoord;
+out vec4 FragColor;
+
+uniform sampler2D textSampler;
+
+void main()
+{
+    FragColor = texture(textSampler, TexCoord);
+}
@@ -0,0 +1,13 @@
+#version 330 core
+
+// Retângulo de texto sem VBO: 4 vértices em triangle strip a partir de gl_VertexID
+out vec2 TexCoord;
+
+uniform vec4 rect;  // (x0, y0, x1, y1) em coordenadas normalizadas da tela
+
+void main()
+{
+    vec2 corner = vec2(gl_VertexID & 1, (gl_VertexID >> 1) & 1);
+    TexCoord = corner;
+    gl_Position = vec4(mix(rect.xy, rect.zw, corner), 0.0, 1.0);
+}
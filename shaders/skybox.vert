@@ -5,12 +5,18 @@ layout (location = 1) in vec2 aTexCoord;
 
 out vec2 TexCoord;
 
-uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
+// Estado da câmera, compartilhado por todos os programas (UBO, ponto de ligação 0)
+layout (std140) uniform FrameData {
+    mat4 view;
+    mat4 projection;
+    mat4 viewProjection;
+    vec3 viewPos;  // posição da câmera (world space)
+    float time;
+};
 
 void main()
 {
     TexCoord = aTexCoord;
-    gl_Position = projection * view * model * vec4(aPos, 1.0);
+    // Só a rotação da view: a esfera fica centrada na câmera
+    gl_Position = projection * mat4(mat3(view)) * vec4(aPos, 1.0);
 }
@@ -0,0 +1,12 @@
+#version 330 core
+
+in vec3 Direction;
+out vec4 FragColor;
+
+uniform samplerCube skySampler;
+
+void main()
+{
+    vec3 starColor = vec3(texture(skySampler, Direction));
+    FragColor = vec4(starColor, 1.0);
+}
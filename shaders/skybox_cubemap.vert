@@ -0,0 +1,27 @@
+#version 330 core
+
+// Triângulo que cobre a tela inteira, sem VBO: (-1,-1), (3,-1), (-1,3)
+out vec3 Direction;
+
+// Estado da câmera, compartilhado por todos os programas (UBO, ponto de ligação 0)
+layout (std140) uniform FrameData {
+    mat4 view;
+    mat4 projection;
+    mat4 viewProjection;
+    vec3 viewPos;  // posição da câmera (world space)
+    float time;
+};
+
+void main()
+{
+    vec2 pos = vec2((gl_VertexID << 1) & 2, gl_VertexID & 2) * 2.0 - 1.0;
+
+    // Ponto do plano distante em coordenadas do mundo = direção a partir da câmera
+    // (inversa de projection * view sem translação; só 3 vértices por frame)
+    mat4 invViewProjection = inverse(projection * mat4(mat3(view)));
+    vec4 world = invViewProjection * vec4(pos, 1.0, 1.0);
+    Direction = world.xyz / world.w;
+
+    // z = w: profundidade exatamente 1.0, só passa onde nada foi desenhado (GL_LEQUAL)
+    gl_Position = vec4(pos, 1.0, 1.0);
+}
@@ -0,0 +1,232 @@
+# simulation.py
+"""
+Simulação em passo fixo, separada da renderização.
+
+A simulação (órbitas no SceneGraph e movimento da câmera) avança em ticks de
+duração fixa (ex.: 120 Hz) numa thread própria e grava cada tick num snapshot.
+O renderizador, a qualquer taxa de quadros, interpola os dois últimos
+snapshots no instante que vai apresentar:
+
+    tick:     |----S1----|----S2----|----S3----|
+    render:                    ^ t: lerp(S1, S2, alpha)
+
+São três snapshots em anel (anterior, atual e o que está sendo escrito):
+a thread só troca os índices sob o lock, então a escrita de um tick nunca
+toca nos dois que o renderizador interpola. O trabalho pesado de um tick é
+NumPy em lote (SceneGraph.update), que libera o GIL nos arrays grandes.
+
+Nos modos reproduzíveis (headless, benchmark) não há thread: advance_to(t)
+executa os ticks na thread que chamou, e a sequência é sempre a mesma.
+
+O instante das órbitas é o tempo da simulação mais uma época ajustável
+(seek/scrub): a linha do tempo pula para qualquer data sem mexer na câmera.
+Entre snapshots de épocas diferentes não há interpolação.
+"""
+import threading
+import time
+
+import glm
+import numpy as np
+
+from scenarios import NO_KEYS
+
+TICK_RATE = 120  # Hz
+MAX_TICKS_PER_WAKE = 8  # se a thread atrasar, descarta tempo em vez de espiralar
+
+
+class Snapshot:
+    """Estado da simulação no instante 'time' (arrays na ordem das linhas do SceneGraph)."""
+
+    __slots__ = ("time", "tick", "epoch", "models", "positions", "camera")
+
+    def __init__(self, count):
+        self.time = 0.0
+        self.tick = 0
+        self.epoch = 0.0
+        self.models = np.zeros((count, 4, 4), dtype=np.float32)
+        self.positions = np.zeros((count, 3), dtype=np.float64)
+        self.camera = np.zeros(5, dtype=np.float64)  # x, y, z, yaw, pitch
+
+    def capture(self, time, tick, epoch, scene, camera):
+        self.time = time
+        self.tick = tick
+        self.epoch = epoch
+        np.copyto(self.models, scene.models)
+        np.copyto(self.positions, scene.positions)
+        self.camera[:3] = camera.position
+        self.camera[3] = camera.yaw
+        self.camera[4] = camera.pitch
+
+
+class Simulation:
+    """
+    Dono do SceneGraph e de uma câmera própria da simulação. A thread de
+    renderização envia a entrada com push_input() e lê o estado com sample().
+    """
+
+    def __init__(self, scene, camera, tick_rate=TICK_RATE, epoch=0.0):
+        """
+        Args:
+            scene: SceneGraph (seus arrays passam a ser escritos só pela simulação)
+            camera: Câmera da simulação (a do renderizador recebe a pose interpolada)
+            tick_rate: Ticks por segundo do passo fixo
+            epoch: Instante das órbitas no tick 0 (segundos da cena)
+        """
+        self.scene = scene
+        self.camera = camera
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.tick = 0
+        self.epoch = epoch
+
+        self._snapshots = [Snapshot(scene.count) for _ in range(3)]
+        self._previous, self._current, self._writing = 0, 1, 2
+        self._lock = threading.Lock()
+        self._keys = NO_KEYS
+        self._mouse = [0.0, 0.0]
+
+        # Estado interpolado entregue ao renderizador
+        self.models = np.zeros((scene.count, 4, 4), dtype=np.float32)
+        self.positions = np.zeros((scene.count, 3), dtype=np.float64)
+        self.camera_pose = np.zeros(5, dtype=np.float64)
+
+        # Métricas
+        self.step_time = 0.0      # duração do último tick (s)
+        self.measured_rate = 0.0  # ticks por segundo medidos (thread)
+        self.dropped_ticks = 0
+        self.render_time = 0.0
+        self.lag = 0.0  # tempo simulado à frente do instante renderizado (s)
+
+        self._thread = None
+        self._running = False
+        self._origin = 0.0  # perf_counter() correspondente a sim_time 0 (thread)
+
+        # Dois snapshots iniciais iguais em t = 0
+        self._run_tick()
+        self._snapshots[self._previous].capture(0.0, 0, epoch, scene, camera)
+
+    # --- Entrada ---
+
+    def push_input(self, keys, mouse_delta):
+        """Entrada do frame (thread principal): teclas seguradas e movimento acumulado do mouse."""
+        with self._lock:
+            self._keys = keys
+            self._mouse[0] += mouse_delta[0]
+            self._mouse[1] += mouse_delta[1]
+
+    def seek(self, epoch):
+        """Muda a época das órbitas (vale a partir do próximo tick)."""
+        with self._lock:
+            self.epoch = epoch
+
+    def scrub(self, delta):
+        """Avança (ou volta, com delta < 0) a época das órbitas em 'delta' segundos."""
+        with self._lock:
+            self.epoch += delta
+
+    # --- Ticks ---
+
+    def _run_tick(self):
+        """Avança um tick: câmera e órbitas, e publica o snapshot."""
+        start = time.perf_counter()
+        with self._lock:
+            keys = self._keys
+            mouse_delta = (self._mouse[0], self._mouse[1])
+            self._mouse[0] = self._mouse[1] = 0.0
+            epoch = self.epoch
+        sim_time = self.tick * self.dt
+        self.camera.update(keys, mouse_delta, self.dt if self.tick else 0.0)
+        self.scene.update(epoch + sim_time)
+        self._snapshots[self._writing].capture(sim_time, self.tick, epoch, self.scene, self.camera)
+        with self._lock:
+            # O escrito vira o atual; o anterior antigo passa a ser o próximo a escrever
+            self._previous, self._current, self._writing = \
+                self._current, self._writing, self._previous
+        self.tick += 1
+        self.step_time = time.perf_counter() - start
+
+    @property
+    def sim_time(self):
+        """Instante do último snapshot publicado."""
+        return (self.tick - 1) * self.dt
+
+    def advance_to(self, t):
+        """Executa, nesta thread, os ticks necessários para cobrir o instante 't' (modo síncrono)."""
+        while self.sim_time < t - 1e-9:
+            self._run_tick()
+
+    def start(self):
+        """Roda os ticks numa thread, no ritmo do relógio real."""
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="simulation", daemon=True)
+        self._thread.start()
+
+    def clock(self):
+        """Tempo de simulação pelo relógio real (modo com thread)."""
+        return time.perf_counter() - self._origin
+
+    def _loop(self):
+        self._origin = time.perf_counter() - self.sim_time
+        rate_start, rate_ticks = time.perf_counter(), self.tick
+        while self._running:
+            now = self.clock()
+            behind = int(now / self.dt) - (self.tick - 1)
+            if behind > MAX_TICKS_PER_WAKE:
+                # Atraso grande (ex.: janela arrastada): pular o tempo perdido
+                self.dropped_ticks += behind - 1
+                self._origin += (behind - 1) * self.dt
+                behind = 1
+            for _ in range(max(0, behind)):
+                self._run_tick()
+
+            elapsed = time.perf_counter() - rate_start
+            if elapsed >= 1.0:
+                self.measured_rate = (self.tick - rate_ticks) / elapsed
+                rate_start, rate_ticks = time.perf_counter(), self.tick
+            # Dormir até o próximo tick
+            wait = self.tick * self.dt - self.clock()
+            if wait > 0:
+                time.sleep(wait)
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # --- Leitura pelo renderizador ---
+
+    def sample(self, t=None):
+        """
+        Interpola os dois últimos snapshots no instante 't' e guarda o resultado em
+        models, positions e camera_pose. Sem 't' (thread), renderiza um tick atrás
+        do relógio real, o atraso mínimo para que o instante fique entre os dois
+        últimos snapshots publicados.
+        """
+        if t is None:
+            t = self.clock() - self.dt
+        with self._lock:
+            previous = self._snapshots[self._previous]
+            current = self._snapshots[self._current]
+            span = current.time - previous.time
+            alpha = 1.0 if span <= 0.0 else min(max((t - previous.time) / span, 0.0), 1.0)
+            if previous.epoch != current.epoch:
+                # Salto na linha do tempo: interpolar atravessaria a órbita
+                alpha = 1.0
+            # lerp das matrizes inteiras: a 120 Hz a rotação por tick é pequena
+            # e a perda de escala do lerp fica abaixo de 1e-5
+            np.subtract(current.models, previous.models, out=self.models)
+            self.models *= alpha
+            self.models += previous.models
+            np.subtract(current.positions, previous.positions, out=self.positions)
+            self.positions *= alpha
+            self.positions += previous.positions
+            self.camera_pose[:] = previous.camera + (current.camera - previous.camera) * alpha
+            self.render_time = previous.time + span * alpha
+            self.lag = current.time - self.render_time
+        return self.models, self.positions
+
+    def apply_camera(self, camera):
+        """Coloca a câmera do renderizador na pose interpolada."""
+        pose = self.camera_pose
+        camera.set_pose(glm.vec3(*pose[:3]), pose[3], pose[4])
@@ -1,24 +1,57 @@
-import glm
-import numpy as np
 from OpenGL.GL import *
+from OpenGL.GL.ARB.pipeline_statistics_query import GL_FRAGMENT_SHADER_INVOCATIONS_ARB
 import ctypes
 
+from mesh_cache import load_mesh
+from render_queue import DrawMaterial, PASS_SKY_FIRST, PASS_SKY_LAST
+from utils import index_type
+
+# Shaders de cada modo do Skybox (vertex, fragment)
+SKYBOX_SHADERS = {
+    "sphere": ("shaders/skybox.vert", "shaders/skybox.frag"),
+    "cubemap": ("shaders/skybox_cubemap.vert", "shaders/skybox_cubemap.frag"),
+}
+
+# Tipos de medição do Skybox (ver Skybox.enable_query)
+QUERY_TARGETS = {
+    "fragments": GL_FRAGMENT_SHADER_INVOCATIONS_ARB,
+    "samples": GL_SAMPLES_PASSED,
+    "gpu_ns": GL_TIME_ELAPSED,
+}
+
+
+def _has_extension(name):
+    """True se o contexto OpenGL atual anuncia a extensão 'name'."""
+    count = glGetIntegerv(GL_NUM_EXTENSIONS)
+    return any(glGetStringi(GL_EXTENSIONS, i).decode() == name for i in range(count))
+
 
 class Skybox:
     """
-    Skybox como esfera invertida gigante.
-    Renderiza um fundo de estrelas ao redor da câmera.
+    Skybox que renderiza um fundo de estrelas ao redor da câmera.
+
+    Dois modos:
+        "sphere": esfera invertida gigante com textura 2D, desenhada antes dos
+            planetas (todo pixel coberto por um planeta é sombreado duas vezes)
+        "cubemap": campo de estrelas num cubemap e um único triângulo de tela
+            cheia na profundidade 1.0, desenhado depois dos planetas com
+            GL_LEQUAL: os pixels cobertos são descartados pelo teste de
+            profundidade antes do fragment shader (early-Z)
     """
-    
-    def __init__(self, radius=200.0, stacks=20, sectors=20):
+
+    def __init__(self, radius=200.0, stacks=20, sectors=20, mode="sphere"):
         """
         Inicializa o Skybox (geometria gerada lazy na primeira renderização).
-        
+
         Args:
             radius: Raio da esfera (deve ser muito grande)
             stacks: Divisões verticais da esfera
             sectors: Divisões horizontais da esfera
+            mode: "sphere" (textura 2D) ou "cubemap" (textura GL_TEXTURE_CUBE_MAP)
         """
+        if mode not in SKYBOX_SHADERS:
+            raise ValueError(f"Modo de Skybox desconhecido: {mode}")
+        self.mode = mode
         self.radius = radius
         self.stacks = stacks
         self.sectors = sectors
@@ -28,144 +61,142 @@ class Skybox:
         self.VBO = None
         self.EBO = None
         self.index_count = 0
+        self.index_type = GL_UNSIGNED_INT
         self.initialized = False
-    
+
+        # Medição opcional do custo do Skybox (ver enable_query)
+        self.queries = None
+        self.query_target = None
+        self.query_kind = None
+        self.query_frame = 0
+        self.last_query_result = None
+
+    @property
+    def draws_last(self):
+        """True se o Skybox deve ser desenhado depois dos planetas (modo cubemap)."""
+        return self.mode == "cubemap"
+
     def _generate_sphere(self):
         """
-        Gera uma esfera invertida (normais apontam para dentro).
+        Gera (ou carrega do cache de malhas) a esfera invertida e cria os buffers.
         Formato simplificado: apenas posição e UV.
         """
-        vertices = []
-        indices = []
-        
-        # Gerar vértices (esfera invertida: normais para dentro)
-        for i in range(self.stacks + 1):
-            stack_angle = np.pi / 2 - i * (np.pi / self.stacks)
-            xy = self.radius * np.cos(stack_angle)
-            z = self.radius * np.sin(stack_angle)
-            
-            for j in range(self.sectors + 1):
-                sector_angle = j * (2 * np.pi / self.sectors)
-                
-                x = xy * np.cos(sector_angle)
-                y = xy * np.sin(sector_angle)
-                
-                # UV coordinates
-                u = j / self.sectors
-                v = i / self.stacks
-                
-                # Para esfera invertida, negamos z para inverter normais
-                vertices.extend([x, y, -z, u, v])
-        
-        # Gerar índices (ordem invertida para normais internas)
-        for i in range(self.stacks):
-            k1 = i * (self.sectors + 1)
-            k2 = k1 + self.sectors + 1
-            
-            for j in range(self.sectors):
-                # Primeiro triângulo (ordem invertida)
-                if i != 0:
-                    indices.extend([k1, k1 + 1, k2])
-                
-                # Segundo triângulo (ordem invertida)
-                if i != (self.stacks - 1):
-                    indices.extend([k1 + 1, k2 + 1, k2])
-                
-                k1 += 1
-                k2 += 1
-        
+        vertices, indices = load_mesh(
+            "skybox_sphere", radius=self.radius, stacks=self.stacks, sectors=self.sectors
+        )
         self.index_count = len(indices)
-        vertices = np.array(vertices, dtype=np.float32)
-        indices = np.array(indices, dtype=np.uint32)
-        
+        self.index_type = index_type(indices)
+
         # Configurar VAO, VBO, EBO
         self.VAO = glGenVertexArrays(1)
         self.VBO = glGenBuffers(1)
         self.EBO = glGenBuffers(1)
-        
+
         glBindVertexArray(self.VAO)
-        
+
         # VBO
         glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
         glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
-        
+
         # EBO
         glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
         glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
-        
+
         # Layout: 5 floats por vértice (x, y, z, u, v)
         stride = 5 * 4
-        
+
         # Posição
         glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
         glEnableVertexAttribArray(0)
-        
+
         # UV
         glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * 4))
         glEnableVertexAttribArray(1)
-        
+
         glBindVertexArray(0)
-    
+
+    def _generate_triangle(self):
+        """
+        VAO vazio para o triângulo de tela cheia: os vértices saem de gl_VertexID
+        no shader, mas o perfil core exige um VAO ligado para desenhar.
+        """
+        self.VAO = glGenVertexArrays(1)
+
     def set_texture(self, texture_id):
-        """Define a textura do Skybox."""
+        """Define a textura do Skybox (2D no modo sphere, cubemap no modo cubemap)."""
         self.texture_id = texture_id
-    
+
     def set_shader(self, shader_program):
-        """Define o programa shader do Skybox."""
+        """
+        Define o programa shader do Skybox. As matrizes da câmera vêm do bloco
+        FrameData (UBO), então só o sampler é configurado, uma única vez.
+        """
         self.shader = shader_program
-    
-    def render(self, view, projection, camera_position):
+        sampler = "skySampler" if self.mode == "cubemap" else "textureSampler"
+        glUseProgram(shader_program)
+        glUniform1i(glGetUniformLocation(shader_program, sampler), 0)
+
+    def enable_query(self, kind=None):
         """
-        Renderiza o Skybox.
-        
+        Passa a medir cada desenho do Skybox com uma query. Usa duas queries
+        alternadas para ler o resultado do frame anterior sem esperar a GPU.
+
         Args:
-            view: Matriz view da câmera
-            projection: Matriz projection da câmera
-            camera_position: Posição da câmera (para seguir movimento)
+            kind: "fragments" (invocações do fragment shader, GL_ARB_pipeline_statistics_query),
+                "samples" (amostras que passaram no teste de profundidade) ou "gpu_ns"
+                (tempo de GPU). Padrão: "fragments" se a extensão existir, senão "gpu_ns".
         """
-        if self.shader is None or self.texture_id is None:
+        if kind is None:
+            has_statistics = _has_extension("GL_ARB_pipeline_statistics_query")
+            kind = "fragments" if has_statistics else "gpu_ns"
+        self.query_target = QUERY_TARGETS[kind]
+        self.query_kind = kind
+        self.queries = glGenQueries(2)
+        self.query_frame = 0
+
+    def _read_query(self):
+        """Lê a query do frame anterior, se a GPU já terminou (sem bloquear)."""
+        if self.query_frame == 0:
             return
-        
-        # Inicializar geometria na primeira renderização (com contexto OpenGL disponível)
+        query = self.queries[(self.query_frame - 1) % 2]
+        if glGetQueryObjectuiv(query, GL_QUERY_RESULT_AVAILABLE):
+            self.last_query_result = int(glGetQueryObjectuiv(query, GL_QUERY_RESULT))
+
+    def _begin_query(self):
+        self._read_query()
+        glBeginQuery(self.query_target, self.queries[self.query_frame % 2])
+
+    def _end_query(self):
+        glEndQuery(self.query_target)
+        self.query_frame += 1
+
+    def _ensure_initialized(self):
+        """Inicializa a geometria na primeira renderização (com contexto OpenGL disponível)."""
         if not self.initialized:
-            self._generate_sphere()
+            if self.mode == "cubemap":
+                self._generate_triangle()
+            else:
+                self._generate_sphere()
             self.initialized = True
-        
-        glUseProgram(self.shader)
-        
-        # Criar matriz model que segue a câmera
-        model = glm.translate(glm.mat4(1.0), camera_position)
-        
-        # Remover componente de translação da view para que skybox fique estático
-        view_no_translate = glm.mat4(1.0)
-        for i in range(3):
-            for j in range(3):
-                view_no_translate[i][j] = view[i][j]
-        
-        # Enviar uniforms
-        model_loc = glGetUniformLocation(self.shader, "model")
-        view_loc = glGetUniformLocation(self.shader, "view")
-        proj_loc = glGetUniformLocation(self.shader, "projection")
-        tex_loc = glGetUniformLocation(self.shader, "textureSampler")
-        
-        glUniformMatrix4fv(model_loc, 1, GL_FALSE, glm.value_ptr(model))
-        glUniformMatrix4fv(view_loc, 1, GL_FALSE, glm.value_ptr(view_no_translate))
-        glUniformMatrix4fv(proj_loc, 1, GL_FALSE, glm.value_ptr(projection))
-        glUniform1i(tex_loc, 0)
-        
-        # Desabilitar depth write para não ocluir nada
-        glDepthMask(GL_FALSE)
-        glDepthFunc(GL_LEQUAL)  # Desenhar até a profundidade máxima
-        
-        # Bind textura
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        
-        # Renderizar
-        glBindVertexArray(self.VAO)
-        glDrawElements(GL_TRIANGLES, self.index_count, GL_UNSIGNED_INT, None)
-        
-        # Reabilitar depth write e restaurar função
-        glDepthMask(GL_TRUE)
-        glDepthFunc(GL_LESS)
-        glBindVertexArray(0)
+
+    def submit(self, queue):
+        """
+        Enfileira o desenho do Skybox numa RenderQueue: no passe anterior aos
+        planetas (esfera) ou no posterior (cubemap). O estado de profundidade,
+        o programa e a textura ficam a cargo da fila.
+        """
+        if self.shader is None or self.texture_id is None:
+            return
+        self._ensure_initialized()
+
+        pass_ = PASS_SKY_LAST if self.draws_last else PASS_SKY_FIRST
+        if self.mode == "cubemap":
+            material = DrawMaterial(((GL_TEXTURE_CUBE_MAP, self.texture_id),), ())
+            count, indexed = 3, False
+        else:
+            material = DrawMaterial(((GL_TEXTURE_2D, self.texture_id),), ())
+            count, indexed = self.index_count, True
+        measuring = self.queries is not None
+        queue.submit(pass_, self.shader, self.VAO, count, material, indexed=indexed,
+                     before=self._begin_query if measuring else None,
+                     after=self._end_query if measuring else None, index_type=self.index_type)
@@ -0,0 +1,281 @@
+# starfield.py
+"""
+Campo de estrelas procedural vetorizado, com semente e cache em disco.
+
+As estrelas são posicionadas com indexação sofisticada (sem laços em Python),
+com brilho tirado de uma distribuição de magnitudes (muitas estrelas fracas,
+poucas brilhantes) e um "splat" gaussiano 3x3 para as mais brilhantes.
+A imagem é de um canal só (luminância): a textura usa GL_R8 com swizzle
+(R, R, R, 1), 4x menos memória que RGBA, o que deixa céus de 8k e 16k viáveis.
+
+A imagem equirretangular também pode ser reamostrada uma única vez para as 6
+faces de um cubemap (bake_cubemap), usado pelo Skybox no modo "cubemap".
+"""
+import os
+
+import numpy as np
+from OpenGL.GL import (
+    GL_TEXTURE_2D, GL_TEXTURE_CUBE_MAP, GL_TEXTURE_CUBE_MAP_POSITIVE_X,
+    GL_TEXTURE_CUBE_MAP_SEAMLESS, GL_R8, GL_RED, GL_ONE, GL_UNSIGNED_BYTE,
+    GL_CLAMP_TO_EDGE, GL_LINEAR, GL_UNPACK_ALIGNMENT,
+    GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T, GL_TEXTURE_WRAP_R,
+    GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER,
+    GL_TEXTURE_SWIZZLE_R, GL_TEXTURE_SWIZZLE_G, GL_TEXTURE_SWIZZLE_B, GL_TEXTURE_SWIZZLE_A,
+    glGenTextures, glBindTexture, glTexParameteri, glTexImage2D, glPixelStorei, glEnable
+)
+
+# Incrementar sempre que o algoritmo mudar (invalida o cache)
+STARFIELD_VERSION = 1
+CACHE_DIR = os.path.join(".cache", "starfield")
+
+# Magnitudes aparentes sorteadas entre as mais brilhantes e as mais fracas
+MAGNITUDE_RANGE = (0.0, 6.5)
+# Inclinação da contagem: N(m) ∝ 10^(slope * m) (~2.2x mais estrelas por magnitude)
+MAGNITUDE_SLOPE = 0.35
+# Estrelas com fluxo relativo acima disso ganham o splat 3x3
+SPLAT_THRESHOLD = 0.25
+
+_PSF = np.array([[0.08, 0.16, 0.08],
+                 [0.16, 1.00, 0.16],
+                 [0.08, 0.16, 0.08]], dtype=np.float32)
+
+
+def sample_magnitudes(rng, count, magnitude_range=MAGNITUDE_RANGE, slope=MAGNITUDE_SLOPE):
+    """Sorteia magnitudes com densidade ∝ 10^(slope * m) (inversa da CDF)."""
+    m_min, m_max = magnitude_range
+    span = 10.0 ** (slope * (m_max - m_min)) - 1.0
+    u = rng.random(count)
+    return m_min + np.log10(1.0 + u * span) / slope
+
+
+def generate_starfield(width=1024, height=1024, star_density=0.01, seed=0, rng=None):
+    """
+    Gera a luminância (height, width) uint8 de um campo de estrelas.
+
+    Args:
+        width, height: Tamanho da textura
+        star_density: Fração de pixels com estrela (0.0 a 1.0)
+        seed: Semente usada quando 'rng' não é passado
+        rng: np.random.Generator explícito (opcional)
+    """
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    num_stars = int(width * height * star_density)
+
+    x = rng.integers(0, width, num_stars)
+    y = rng.integers(0, height, num_stars)
+    magnitudes = sample_magnitudes(rng, num_stars)
+    # Fluxo relativo à estrela mais brilhante possível (m = 0 -> 1.0)
+    flux = 10.0 ** (-0.4 * (magnitudes - MAGNITUDE_RANGE[0]))
+    # Curva de exibição: raiz comprime a faixa dinâmica, piso para as estrelas fracas aparecerem
+    core = (0.2 + 0.8 * np.sqrt(flux)).astype(np.float32)
+
+    linear = [y * width + x]
+    values = [core]
+
+    # Splat gaussiano 3x3 só para as estrelas brilhantes (o centro já está em 'core')
+    bright = flux > SPLAT_THRESHOLD
+    bx, by, bcore = x[bright], y[bright], core[bright]
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dx == 0 and dy == 0:
+                continue
+            # Horizontal dá a volta (a textura cobre 360°); vertical é cortado nas bordas
+            sx = (bx + dx) % width
+            sy = np.clip(by + dy, 0, height - 1)
+            linear.append(sy * width + sx)
+            values.append(bcore * _PSF[dy + 1, dx + 1])
+
+    # Somar contribuições no mesmo pixel de forma esparsa (sem buffer float do tamanho da imagem)
+    linear = np.concatenate(linear)
+    values = np.concatenate(values)
+    order = np.argsort(linear, kind="stable")
+    linear = linear[order]
+    # Já ordenado: cada pixel começa onde o índice muda (np.unique ordenaria de novo)
+    starts = np.flatnonzero(np.r_[len(linear) > 0, linear[1:] != linear[:-1]])
+    pixels = linear[starts]
+    totals = np.add.reduceat(values[order], starts)
+
+    starfield = np.zeros(height * width, dtype=np.uint8)
+    starfield[pixels] = np.clip(totals * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    return starfield.reshape(height, width)
+
+
+def starfield_cache_path(width, height, star_density, seed, cache_dir=CACHE_DIR):
+    """Arquivo .npy do cache para (semente, tamanho, densidade)."""
+    name = f"stars_v{STARFIELD_VERSION}_s{seed}_{width}x{height}_d{star_density:g}.npy"
+    return os.path.join(cache_dir, name)
+
+
+def _load_cached(path, build):
+    """Abre o .npy de 'path' com mmap ou, se não existir, chama build() e salva o resultado."""
+    try:
+        return np.load(path, mmap_mode="r")
+    except (FileNotFoundError, ValueError, OSError):
+        pass
+
+    array = build()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+    return array
+
+
+def load_starfield(width=1024, height=1024, star_density=0.01, seed=0, cache_dir=CACHE_DIR):
+    """
+    Versão com cache de generate_starfield: o mesmo (seed, tamanho, densidade)
+    sempre gera o mesmo céu, então ele é salvo em disco e reaberto com mmap.
+    """
+    path = starfield_cache_path(width, height, star_density, seed, cache_dir)
+    return _load_cached(path, lambda: generate_starfield(width, height, star_density, seed))
+
+
+def cube_face_directions(face, size):
+    """
+    Direções (size, size, 3) float32 dos centros dos texels de uma face do cubemap,
+    na convenção do OpenGL (faces +X, -X, +Y, -Y, +Z, -Z; linha 0 = t = 0).
+    """
+    coords = (np.arange(size, dtype=np.float32) + 0.5) * (2.0 / size) - 1.0
+    tc, sc = np.meshgrid(coords, coords, indexing="ij")
+    one = np.ones_like(sc)
+    # Inversa da tabela de seleção de face da especificação (sc, tc, eixo maior)
+    axes = [
+        (one, -tc, -sc),   # +X
+        (-one, -tc, sc),   # -X
+        (sc, one, tc),     # +Y
+        (sc, -one, -tc),   # -Y
+        (sc, -tc, one),    # +Z
+        (-sc, -tc, -one),  # -Z
+    ]
+    return np.stack(axes[face], axis=-1)
+
+
+def bake_cubemap(starfield, face_size=None):
+    """
+    Reamostra o campo de estrelas equirretangular nas 6 faces de um cubemap
+    (interpolação bilinear, com a mesma projeção UV da esfera do Skybox).
+
+    Args:
+        starfield: Luminância (H, W) uint8 de generate_starfield
+        face_size: Lado de cada face (padrão: W / 4, a mesma densidade no equador)
+
+    Returns:
+        Array (6, face_size, face_size) uint8
+    """
+    height, width = starfield.shape[:2]
+    face_size = face_size or max(1, width // 4)
+    source = np.asarray(starfield, dtype=np.float32)
+    faces = np.empty((6, face_size, face_size), dtype=np.uint8)
+
+    for face in range(6):
+        d = cube_face_directions(face, face_size)
+        d /= np.linalg.norm(d, axis=-1, keepdims=True)
+        # Esfera do Skybox: longitude no plano XY, latitude medida em -Z (v = 0 no polo)
+        u = np.remainder(np.arctan2(d[..., 1], d[..., 0]), 2.0 * np.pi) / (2.0 * np.pi)
+        v = 0.5 + np.arcsin(np.clip(d[..., 2], -1.0, 1.0)) / np.pi
+
+        x = u * width - 0.5
+        y = np.clip(v * height - 0.5, 0.0, height - 1.0)
+        x0 = np.floor(x)
+        y0 = np.floor(y)
+        fx = x - x0
+        fy = y - y0
+        # Horizontal dá a volta (360°); vertical é cortado nas bordas
+        x0 = x0.astype(np.int64) % width
+        x1 = (x0 + 1) % width
+        y0 = y0.astype(np.int64)
+        y1 = np.minimum(y0 + 1, height - 1)
+
+        top = source[y0, x0] * (1.0 - fx) + source[y0, x1] * fx
+        bottom = source[y1, x0] * (1.0 - fx) + source[y1, x1] * fx
+        faces[face] = np.clip(top * (1.0 - fy) + bottom * fy + 0.5, 0, 255).astype(np.uint8)
+    return faces
+
+
+def load_starfield_cubemap(width=1024, height=1024, star_density=0.01, seed=0,
+                           face_size=None, cache_dir=CACHE_DIR):
+    """Versão com cache de bake_cubemap(load_starfield(...)). Retorna (6, N, N) uint8."""
+    face_size = face_size or max(1, width // 4)
+    name = f"cube_v{STARFIELD_VERSION}_s{seed}_{width}x{height}_d{star_density:g}_f{face_size}.npy"
+    path = os.path.join(cache_dir, name)
+    return _load_cached(path, lambda: bake_cubemap(
+        load_starfield(width, height, star_density, seed, cache_dir), face_size
+    ))
+
+
+def upload_starfield(starfield):
+    """
+    Cria a textura OpenGL (GL_R8 com swizzle R,R,R,1) direto do buffer NumPy contíguo.
+    Retorna o ID da textura.
+    """
+    height, width = starfield.shape[:2]
+    starfield = np.ascontiguousarray(starfield)
+
+    texture_id = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, texture_id)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+
+    # Um canal só, lido como cinza (R, R, R) e opaco no shader
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_R, GL_RED)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_G, GL_RED)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_B, GL_RED)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_SWIZZLE_A, GL_ONE)
+
+    # Linhas de 1 byte por pixel não são múltiplas de 4 em larguras arbitrárias
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_R8, width, height, 0, GL_RED, GL_UNSIGNED_BYTE, starfield)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+
+    glBindTexture(GL_TEXTURE_2D, 0)
+    return texture_id
+
+
+def generate_starfield_texture(width=1024, height=1024, star_density=0.01, seed=0):
+    """
+    Gera (ou carrega do cache) o campo de estrelas e cria a textura OpenGL.
+    Retorna o ID da textura.
+    """
+    return upload_starfield(load_starfield(width, height, star_density, seed))
+
+
+def create_cubemap_texture():
+    """Cria e configura (sem dados) o cubemap GL_R8 do céu. Retorna o ID da textura."""
+    # Filtrar através das bordas entre faces (sem costuras visíveis)
+    glEnable(GL_TEXTURE_CUBE_MAP_SEAMLESS)
+
+    texture_id = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_CUBE_MAP, texture_id)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_WRAP_R, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_SWIZZLE_R, GL_RED)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_SWIZZLE_G, GL_RED)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_SWIZZLE_B, GL_RED)
+    glTexParameteri(GL_TEXTURE_CUBE_MAP, GL_TEXTURE_SWIZZLE_A, GL_ONE)
+    glBindTexture(GL_TEXTURE_CUBE_MAP, 0)
+    return texture_id
+
+
+def upload_cubemap_face(texture_id, face, pixels):
+    """Envia uma face (N, N) uint8 (0 = +X, ..., 5 = -Z) para o cubemap."""
+    size = pixels.shape[0]
+    glBindTexture(GL_TEXTURE_CUBE_MAP, texture_id)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    glTexImage2D(GL_TEXTURE_CUBE_MAP_POSITIVE_X + face, 0, GL_R8, size, size, 0,
+                 GL_RED, GL_UNSIGNED_BYTE, np.ascontiguousarray(pixels))
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+    glBindTexture(GL_TEXTURE_CUBE_MAP, 0)
+
+
+def upload_starfield_cubemap(faces):
+    """Cria o cubemap a partir das 6 faces de bake_cubemap. Retorna o ID da textura."""
+    texture_id = create_cubemap_texture()
+    for face, pixels in enumerate(faces):
+        upload_cubemap_face(texture_id, face, pixels)
+    return texture_id
@@ -0,0 +1,77 @@
+# stats.py
+"""
+Contadores por frame do renderizador (triângulos enviados, draw calls, etc.).
+"""
+
+
+class FrameStats:
+    """
+    Acumula contadores nomeados durante um frame.
+    Ao chamar end_frame() os valores vão para 'last' e os contadores são zerados,
+    então 'last' sempre reflete o último frame completo.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.last = {}
+        self.frame = 0
+
+    def add(self, name, value=1):
+        """Soma 'value' ao contador 'name' do frame atual."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        """Define o valor absoluto do contador 'name' no frame atual."""
+        self.counters[name] = value
+
+    def end_frame(self):
+        """Fecha o frame atual e retorna os contadores dele."""
+        self.last = self.counters
+        self.counters = {}
+        self.frame += 1
+        return self.last
+
+    def summary(self):
+        """Texto curto com os contadores do último frame (ex.: para o título da janela)."""
+        return " | ".join(f"{name}: {value:,}" for name, value in sorted(self.last.items()))
+
+
+class GLCallCounter:
+    """
+    Conta as chamadas gl* feitas pelos módulos indicados enquanto estiver ativo
+    (context manager). As funções são trocadas por versões que contam no
+    namespace de cada módulo e restauradas na saída.
+
+        with GLCallCounter(skybox, uniform_buffers) as counter:
+            ...
+        counter.total, counter.counts["glBufferSubData"]
+    """
+
+    def __init__(self, *modules):
+        self.modules = modules
+        self.counts = {}
+        self._saved = []
+
+    def _wrap(self, name, func):
+        def counted(*args, **kwargs):
+            self.counts[name] = self.counts.get(name, 0) + 1
+            return func(*args, **kwargs)
+        return counted
+
+    def __enter__(self):
+        for module in self.modules:
+            for name, func in list(vars(module).items()):
+                if name.startswith("gl") and callable(func):
+                    self._saved.append((module, name, func))
+                    setattr(module, name, self._wrap(name, func))
+        return self
+
+    def __exit__(self, *exc):
+        for module, name, func in self._saved:
+            setattr(module, name, func)
+        self._saved = []
+        return False
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
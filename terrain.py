@@ -0,0 +1,587 @@
+# terrain.py
+"""
+Corpos vistos de perto como cube-sphere com quadtree de chunks.
+
+A esfera UV concentra triângulos nos polos e fica grosseira no equador quando
+a câmera chega perto da superfície. Aqui cada uma das 6 faces de um cubo é
+projetada na esfera e dividida numa quadtree; todo nó é um chunk de
+CHUNK_QUADS x CHUNK_QUADS quads (mesmo layout de 14 floats da esfera UV, então
+os shaders são os mesmos).
+
+A cada frame, a partir da posição da câmera no espaço local do corpo:
+    1. Refinamento: os nós são divididos em ordem de erro na tela (aresta
+       projetada / edge_pixels, o mesmo critério do LODSelector), com
+       histerese, até o orçamento de chunks. Nós atrás do horizonte ou fora
+       do frustum não são divididos: o número de triângulos fica constante,
+       seja a vista orbital ou rente ao chão. Antes de dividir um nó, os
+       vizinhos mais grossos que a costura comporta são divididos também.
+    2. Geração: os chunks que faltam são gerados por threads de trabalho e
+       enviados a um pool fixo de slots num único VBO (LRU quando cheio).
+       Enquanto os 4 filhos de um nó não chegam, o próprio nó é desenhado
+       (e os vizinhos finos demais para ele, pelo ancestral que cabe na costura).
+    3. Costura: cada borda vizinha de um chunk mais grosso (2^d vezes) junta
+       os vértices da borda de 2^d em 2^d (índices pré-gerados por combinação
+       de passos), então as bordas coincidem e não há rachaduras, inclusive
+       entre faces do cubo.
+
+Todos os chunks compartilham um EBO com as variantes de costura (uint16) e
+são desenhados com glDrawElementsBaseVertex a partir do slot no pool.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import ctypes
+import heapq
+import math
+import queue
+import time
+
+import numpy as np
+from OpenGL.GL import (
+    GL_ARRAY_BUFFER, GL_ELEMENT_ARRAY_BUFFER, GL_DYNAMIC_DRAW, GL_STATIC_DRAW, GL_TRIANGLES,
+    GL_UNSIGNED_SHORT, GL_FALSE, GL_TEXTURE0, GL_TEXTURE1, GL_TEXTURE_2D,
+    glGenVertexArrays, glGenBuffers, glBindVertexArray, glBindBuffer, glBufferData,
+    glBufferSubData, glDeleteVertexArrays, glDeleteBuffers, glUseProgram, glGetUniformLocation,
+    glUniformMatrix4fv, glUniform1i, glActiveTexture, glBindTexture, glDrawElementsBaseVertex
+)
+
+from utils import configure_mesh_attributes
+
+CHUNK_QUADS = 16
+GRID = CHUNK_QUADS + 1
+CHUNK_VERTICES = GRID * GRID
+VERTEX_FLOATS = 14
+CHUNK_BYTES = CHUNK_VERTICES * VERTEX_FLOATS * 4
+MAX_CHUNK_INDICES = CHUNK_QUADS * CHUNK_QUADS * 6
+
+ROOT_LEVEL = 1  # 4 raízes por face: o polo fica num canto, não no meio de um chunk
+MAX_LEVEL = 18
+MAX_CHUNKS = 192
+# Raio na tela a partir do qual o corpo usa o terreno (a esfera UV de 256 setores
+# só mantém arestas de 8 px até ~326 px de raio)
+CLOSE_RADIUS_PX = 256.0
+STEPS = (1, 2, 4, 8, 16)  # passos de costura por borda (vizinho até 4 níveis mais grosso)
+MAX_LEVEL_GAP = len(STEPS) - 1
+
+# Faces do cubo: (normal, eixo u, eixo v) com u x v = normal (triângulos CCW vistos de fora)
+FACES = np.array([
+    [(1, 0, 0), (0, 1, 0), (0, 0, 1)],
+    [(-1, 0, 0), (0, 0, 1), (0, 1, 0)],
+    [(0, 1, 0), (0, 0, 1), (1, 0, 0)],
+    [(0, -1, 0), (1, 0, 0), (0, 0, 1)],
+    [(0, 0, 1), (1, 0, 0), (0, 1, 0)],
+    [(0, 0, -1), (0, 1, 0), (1, 0, 0)],
+], dtype=np.float64)
+
+
+def spherify(points):
+    """Projeta pontos (N, 3) da superfície do cubo [-1, 1]^3 na esfera unitária (distribuição uniforme)."""
+    x2, y2, z2 = (points * points).T
+    return points * np.sqrt(np.stack([
+        1.0 - y2 / 2.0 - z2 / 2.0 + y2 * z2 / 3.0,
+        1.0 - z2 / 2.0 - x2 / 2.0 + z2 * x2 / 3.0,
+        1.0 - x2 / 2.0 - y2 / 2.0 + x2 * y2 / 3.0,
+    ], axis=1))
+
+
+def cube_points(face, u, v):
+    """Pontos do cubo na face 'face' nas coordenadas (u, v) em [0, 1] (arrays)."""
+    normal, axis_u, axis_v = FACES[face]
+    return normal + np.multiply.outer(2.0 * u - 1.0, axis_u) + np.multiply.outer(2.0 * v - 1.0, axis_v)
+
+
+def face_coordinates(point):
+    """(face, u, v) do ponto do cubo (ou de fora dele) na direção de 'point'."""
+    axis = int(np.argmax(np.abs(point)))
+    face = 2 * axis + (1 if point[axis] < 0 else 0)
+    normal, axis_u, axis_v = FACES[face]
+    projected = point / abs(point[axis])
+    return face, (projected @ axis_u + 1.0) / 2.0, (projected @ axis_v + 1.0) / 2.0
+
+
+def node_bounds(node):
+    """Intervalos (u0, u1, v0, v1) do nó (face, nível, x, y) na face."""
+    _, level, x, y = node
+    size = 1.0 / (1 << level)
+    return x * size, (x + 1) * size, y * size, (y + 1) * size
+
+
+def children(node):
+    face, level, x, y = node
+    return [(face, level + 1, 2 * x + dx, 2 * y + dy) for dy in (0, 1) for dx in (0, 1)]
+
+
+def ancestor(node, level):
+    """Nó do nível 'level' (<= o do nó) que contém o nó."""
+    face, node_level, x, y = node
+    shift = node_level - level
+    return face, level, x >> shift, y >> shift
+
+
+def node_at(face, u, v, level):
+    """Nó do nível 'level' que contém o ponto (u, v) da face."""
+    cells = 1 << level
+    return face, level, min(int(u * cells), cells - 1), min(int(v * cells), cells - 1)
+
+
+def generate_chunk(node):
+    """
+    Vértices do chunk (GRID x GRID) na esfera unitária, no layout de 14 floats
+    [x,y,z, u,v, nx,ny,nz, tx,ty,tz, bx,by,bz] com as UVs equiretangulares da esfera UV.
+    Não usa OpenGL (roda nas threads de trabalho).
+    """
+    u0, u1, v0, v1 = node_bounds(node)
+    u, v = np.meshgrid(np.linspace(u0, u1, GRID), np.linspace(v0, v1, GRID))
+    pos = spherify(cube_points(node[0], u.ravel(), v.ravel()))
+
+    # Longitude relativa ao centro do chunk: a costura em lon = 0 não atravessa
+    # nenhum chunk (as UVs podem passar de 1) e o polo recebe a longitude do centro
+    center = spherify(cube_points(node[0], np.array([(u0 + u1) / 2]), np.array([(v0 + v1) / 2])))[0]
+    center_lon = math.atan2(center[1], center[0]) % (2.0 * math.pi)
+    at_pole = np.hypot(pos[:, 0], pos[:, 1]) < 1e-12
+    lon = np.arctan2(pos[:, 1], pos[:, 0])
+    lon = center_lon + (lon - center_lon + math.pi) % (2.0 * math.pi) - math.pi
+    lon[at_pole] = center_lon
+    lat = np.arcsin(np.clip(pos[:, 2], -1.0, 1.0))
+    uv = np.stack([lon / (2.0 * math.pi), 0.5 - lat / math.pi], axis=1)
+
+    # Tangente na direção de u (leste) e bitangente B = N x T, como na esfera UV
+    tangent = np.stack([-np.sin(lon), np.cos(lon), np.zeros_like(lon)], axis=1)
+    bitangent = np.cross(pos, tangent)
+    vertices = np.concatenate([pos, uv, pos, tangent, bitangent], axis=1)
+    return vertices.astype(np.float32).ravel()
+
+
+def chunk_indices(steps):
+    """
+    Índices (uint16) da grade do chunk com as bordas costuradas.
+
+    Args:
+        steps: Passo de cada borda (v = 0, u = 1, v = 1, u = 0): 2^d quando o
+            vizinho é d níveis mais grosso. Os vértices da borda são levados ao
+            múltiplo de passo anterior e os triângulos degenerados descartados.
+    """
+    j, i = np.divmod(np.arange(CHUNK_VERTICES), GRID)
+    si, sj = i.copy(), j.copy()
+    bottom, right, top, left = steps
+    si[j == 0] = i[j == 0] // bottom * bottom
+    si[j == CHUNK_QUADS] = i[j == CHUNK_QUADS] // top * top
+    sj[i == CHUNK_QUADS] = j[i == CHUNK_QUADS] // right * right
+    sj[i == 0] = j[i == 0] // left * left
+    remap = sj * GRID + si
+
+    qj, qi = np.divmod(np.arange(CHUNK_QUADS * CHUNK_QUADS), CHUNK_QUADS)
+    p00 = qj * GRID + qi
+    p10, p01, p11 = p00 + 1, p00 + GRID, p00 + GRID + 1
+    tris = remap[np.concatenate([np.stack([p00, p10, p11], 1), np.stack([p00, p11, p01], 1)])]
+    keep = (tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2])
+    return tris[keep].astype(np.uint16).ravel()
+
+
+def variant_id(steps):
+    """Índice da combinação de passos (4 bordas, 5 passos cada) no EBO compartilhado."""
+    index = 0
+    for step in reversed(steps):
+        index = index * len(STEPS) + STEPS.index(step)
+    return index
+
+
+class ChunkPool:
+    """
+    Pool fixo de slots de chunks num único VBO, com um EBO compartilhado das
+    variantes de costura (geradas sob demanda) e um VAO.
+    """
+
+    def __init__(self, capacity):
+        """
+        Args:
+            capacity: Número de slots (chunks residentes ao mesmo tempo)
+        """
+        self.capacity = capacity
+        self.VAO = glGenVertexArrays(1)
+        self.VBO, self.EBO = glGenBuffers(2)
+        glBindVertexArray(self.VAO)
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferData(GL_ARRAY_BUFFER, capacity * CHUNK_BYTES, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, len(STEPS) ** 4 * MAX_CHUNK_INDICES * 2, None,
+                     GL_STATIC_DRAW)
+        configure_mesh_attributes()
+        glBindVertexArray(0)
+
+        self.free = list(range(capacity - 1, -1, -1))
+        self.slot_of = {}    # nó -> slot
+        self.last_used = {}  # nó -> frame em que foi desenhado ou pedido pela última vez
+        self.variants = {}   # id da variante -> número de índices
+        self.evictions = 0
+
+    @property
+    def used(self):
+        return self.capacity - len(self.free)
+
+    def __contains__(self, node):
+        return node in self.slot_of
+
+    def upload(self, node, vertices, protected):
+        """
+        Envia o chunk para um slot livre, ou para o do chunk menos usado
+        recentemente fora de 'protected'. Retorna False se não houver slot.
+        """
+        if not self.free:
+            candidates = [n for n in self.slot_of if n not in protected]
+            if not candidates:
+                return False
+            victim = min(candidates, key=self.last_used.__getitem__)
+            self.free.append(self.slot_of.pop(victim))
+            del self.last_used[victim]
+            self.evictions += 1
+        slot = self.free.pop()
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferSubData(GL_ARRAY_BUFFER, slot * CHUNK_BYTES, vertices.nbytes, vertices)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.slot_of[node] = slot
+        return True
+
+    def variant(self, steps):
+        """
+        (offset em bytes, número de índices) da variante de costura, enviando-a na
+        primeira vez. O EBO é estado do VAO: o envio liga o VAO do pool e o deixa ligado.
+        """
+        index = variant_id(steps)
+        if index not in self.variants:
+            indices = chunk_indices(steps)
+            glBindVertexArray(self.VAO)
+            glBufferSubData(GL_ELEMENT_ARRAY_BUFFER, index * MAX_CHUNK_INDICES * 2,
+                            indices.nbytes, indices)
+            self.variants[index] = len(indices)
+        return index * MAX_CHUNK_INDICES * 2, self.variants[index]
+
+    def delete(self):
+        glDeleteVertexArrays(1, [self.VAO])
+        glDeleteBuffers(2, [self.VBO, self.EBO])
+
+
+class CubeSphereTerrain:
+    """Quadtree de chunks de um corpo; update() e draw() rodam na thread do OpenGL."""
+
+    def __init__(self, name, max_chunks=MAX_CHUNKS, pool_size=None, edge_pixels=8.0,
+                 hysteresis=0.15, workers=2, max_pending=32, uploads_per_frame=16,
+                 synchronous=False):
+        """
+        Args:
+            name: Nome para os relatórios
+            max_chunks: Orçamento de chunks folha (triângulos = max_chunks * 512)
+            pool_size: Slots do pool de buffers (padrão: 2 * max_chunks)
+            edge_pixels: Tamanho alvo da aresta de um triângulo na tela (pixels)
+            hysteresis: Margem em torno do limiar de divisão (evita oscilar)
+            workers: Threads que geram os chunks
+            max_pending: Máximo de chunks sendo gerados ao mesmo tempo
+            uploads_per_frame: Máximo de chunks enviados à GPU por frame
+            synchronous: Gerar e enviar tudo na própria thread (frames reproduzíveis)
+        """
+        self.name = name
+        self.max_chunks = max_chunks
+        self.edge_pixels = edge_pixels
+        self.hysteresis = hysteresis
+        self.max_pending = max_pending
+        self.uploads_per_frame = uploads_per_frame
+        self.synchronous = synchronous
+        self.executor = None if synchronous else ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="terrain")
+        self.ready = queue.Queue()
+        self.pool = ChunkPool(pool_size or 2 * max_chunks)
+
+        self.roots = [(face, ROOT_LEVEL, x, y) for face in range(6)
+                      for y in range(1 << ROOT_LEVEL) for x in range(1 << ROOT_LEVEL)]
+        self._info = {}  # nó -> (centro x, y, z, raio da esfera envolvente, aresta, raio angular)
+        self._samples = {}  # nó -> pontos dos vizinhos (ver _neighbours)
+        self.internal = set()  # nós divididos no refinamento atual
+        self.leaves = set(self.roots)
+        self.drawn = list(self.roots)
+        self.steps = [(1, 1, 1, 1)] * len(self.roots)
+        self.visible = np.ones(len(self.roots), dtype=bool)
+        self.pending = {}  # nó -> instante do pedido
+        self.frame = 0
+        self._locations = {}  # programa -> localizações de model, isSun e useNormalMap
+
+        # Métricas
+        self.latencies = deque(maxlen=256)  # pedido -> envio (s)
+        self.generated = 0
+        self.discarded = 0
+
+        # As raízes ficam sempre residentes: há sempre algo para desenhar
+        for node in self.roots:
+            self.pool.upload(node, generate_chunk(node), ())
+
+    def _node_info(self, node):
+        info = self._info.get(node)
+        if info is None:
+            u0, u1, v0, v1 = node_bounds(node)
+            corners = spherify(cube_points(node[0], np.array([u0, u1, u0, u1]), np.array([v0, v0, v1, v1])))
+            center = spherify(cube_points(node[0], np.array([(u0 + u1) / 2]), np.array([(v0 + v1) / 2])))[0]
+            radius = float(np.linalg.norm(corners - center, axis=1).max())
+            edge = float(np.linalg.norm(corners[1] - corners[0])) / CHUNK_QUADS
+            # Floats do Python: os testes por nó são escalares e rodam centenas de vezes por frame
+            info = (*center.tolist(), radius, edge, 2.0 * math.asin(min(radius / 2.0, 1.0)))
+            self._info[node] = info
+        return info
+
+    def _neighbours(self, node):
+        """(face, u, v) de um ponto logo além do meio de cada borda (v = 0, u = 1, v = 1, u = 0)."""
+        samples = self._samples.get(node)
+        if samples is None:
+            u0, u1, v0, v1 = node_bounds(node)
+            eps = 1e-6
+            u = np.array([(u0 + u1) / 2, u1 + eps, (u0 + u1) / 2, u0 - eps])
+            v = np.array([v0 - eps, (v0 + v1) / 2, v1 + eps, (v0 + v1) / 2])
+            samples = [face_coordinates(point) for point in cube_points(node[0], u, v)]
+            self._samples[node] = samples
+        return samples
+
+    def update(self, model, camera, viewport_height, planes):
+        """
+        Refina a quadtree para a câmera, pede os chunks que faltam e envia os prontos.
+
+        Args:
+            model: Model matrix do corpo (4, 4) em ordem de coluna (como na RenderQueue)
+            camera: Câmera (posição e projeção)
+            viewport_height: Altura da tela em pixels
+            planes: Planos do frustum (6, 4) em world space (culling.frustum_planes)
+        """
+        self.frame += 1
+        matrix = np.asarray(model, dtype=np.float64).T  # forma matemática (linha, coluna)
+        inverse = np.linalg.inv(matrix)
+        eye = (inverse @ np.append(np.asarray(camera.position, dtype=np.float64), 1.0))[:3]
+        # Planos no espaço local (x_mundo = M x_local), renormalizados
+        local_planes = np.asarray(planes) @ matrix
+        local_planes /= np.linalg.norm(local_planes[:, :3], axis=1, keepdims=True)
+        local_planes = local_planes.tolist()
+        focal = camera.get_projection()[1][1] * viewport_height * 0.5
+
+        ex, ey, ez = eye.tolist()
+        distance = math.sqrt(ex * ex + ey * ey + ez * ez)
+        horizon = math.acos(min(1.0, 1.0 / distance)) if distance > 1.0 else math.pi
+        visibility = {}
+
+        def visible(node):
+            # Antes do horizonte (calota vista da câmera) e não totalmente fora do frustum
+            result = visibility.get(node)
+            if result is None:
+                cx, cy, cz, radius, _, angle = self._node_info(node)
+                cosine = (cx * ex + cy * ey + cz * ez) / max(distance, 1e-12)
+                result = math.acos(min(1.0, max(-1.0, cosine))) <= horizon + angle and all(
+                    a * cx + b * cy + c * cz + d >= -radius for a, b, c, d in local_planes)
+                visibility[node] = result
+            return result
+
+        def error(node):
+            if node[1] >= MAX_LEVEL or not visible(node):
+                return 0.0
+            cx, cy, cz, radius, edge, _ = self._node_info(node)
+            gap = max(math.sqrt((ex - cx) ** 2 + (ey - cy) ** 2 + (ez - cz) ** 2) - radius, 1e-6)
+            return edge * focal / gap / self.edge_pixels
+
+        # 1. Refinamento por erro na tela, do maior para o menor, até o orçamento
+        heap = [(-error(node), node) for node in self.roots]
+        heapq.heapify(heap)
+        count = len(self.roots)
+        internal = set()
+
+        def split(node):
+            # Balanceamento: os filhos não podem ficar mais de MAX_LEVEL_GAP níveis
+            # abaixo de um vizinho, então os vizinhos grossos demais são divididos antes
+            nonlocal count
+            for face, nu, nv in self._neighbours(node):
+                neighbour = self._leaf_at(face, nu, nv, internal)
+                if neighbour[1] + MAX_LEVEL_GAP <= node[1] and not split(neighbour):
+                    return False
+            if count + 3 > self.max_chunks:
+                return False
+            internal.add(node)
+            count += 3
+            for child in children(node):
+                heapq.heappush(heap, (-error(child), child))
+            return True
+
+        while heap:
+            negative_error, node = heapq.heappop(heap)
+            if node in internal:
+                continue  # já dividido pelo balanceamento de um vizinho
+            threshold = 1.0 - self.hysteresis if node in self.internal else 1.0 + self.hysteresis
+            if -negative_error > threshold:
+                split(node)
+        leaves = {kid for node in internal for kid in children(node) if kid not in internal}
+        leaves.update(node for node in self.roots if node not in internal)
+        self.internal, self.leaves = internal, leaves
+
+        # 2. Geração dos que faltam (os mais grossos primeiro) e envio dos prontos
+        wanted = internal | leaves
+        for node in wanted:
+            if node in self.pool:
+                self.pool.last_used[node] = self.frame
+        missing = sorted((node for node in wanted if node not in self.pool and node not in self.pending),
+                         key=lambda node: (node[1], node))
+        for node in missing:
+            if not self.synchronous and len(self.pending) >= self.max_pending:
+                break
+            self._request(node)
+        self._pump(wanted)
+
+        # 3. O que é desenhado: um nó dividido só é trocado pelos filhos quando os 4
+        #    chegaram, e um chunk fino demais para o vizinho que ainda espera os filhos
+        #    dá lugar ao ancestral (residente, pois foi dividido) que cabe na costura
+        collapsed = set()
+        while True:
+            drawn = self._drawn_nodes(internal, collapsed)
+            if drawn == self.drawn:
+                break
+            levels = {node: node[1] for node in drawn}
+            too_fine = {ancestor(node, neighbour_level + MAX_LEVEL_GAP)
+                        for node in drawn for neighbour_level in self._neighbour_levels(node, levels)
+                        if node[1] - neighbour_level > MAX_LEVEL_GAP}
+            if not too_fine:
+                # A costura só muda quando o conjunto desenhado muda
+                self.steps = [self._edge_steps(node, levels) for node in drawn]
+                self.drawn = drawn
+                break
+            collapsed |= too_fine
+        self.visible = np.array([visible(node) for node in drawn], dtype=bool)
+        for node in drawn:
+            self.pool.last_used[node] = self.frame
+
+    @staticmethod
+    def _leaf_at(face, u, v, internal):
+        """Folha da quadtree em refinamento ('internal' são os nós divididos) que contém o ponto."""
+        node = node_at(face, u, v, ROOT_LEVEL)
+        while node in internal:
+            node = node_at(face, u, v, node[1] + 1)
+        return node
+
+    def _drawn_nodes(self, internal, collapsed):
+        """Nós desenhados, em profundidade: desce nos nós divididos com os 4 filhos no pool."""
+        drawn = []
+        stack = list(reversed(self.roots))
+        while stack:
+            node = stack.pop()
+            kids = children(node)
+            if node in internal and node not in collapsed and all(kid in self.pool for kid in kids):
+                stack.extend(reversed(kids))
+            else:
+                drawn.append(node)
+        return drawn
+
+    def _neighbour_levels(self, node, levels):
+        """Nível do chunk desenhado do outro lado de cada borda (o do nó, se não for mais grosso)."""
+        level = node[1]
+        result = []
+        for neighbour_face, nu, nv in self._neighbours(node):
+            neighbour_level = level
+            for candidate in range(ROOT_LEVEL, level):
+                if node_at(neighbour_face, nu, nv, candidate) in levels:
+                    neighbour_level = candidate
+                    break
+            result.append(neighbour_level)
+        return result
+
+    def _edge_steps(self, node, levels):
+        """Passo de costura de cada borda pelo nível do chunk desenhado do outro lado."""
+        return tuple(STEPS[min(node[1] - neighbour_level, MAX_LEVEL_GAP)]
+                     for neighbour_level in self._neighbour_levels(node, levels))
+
+    def _request(self, node):
+        self.pending[node] = time.perf_counter()
+        if self.synchronous:
+            self.ready.put((node, generate_chunk(node)))
+            return
+
+        def work():
+            self.ready.put((node, generate_chunk(node)))
+
+        self.executor.submit(work)
+
+    def _pump(self, wanted):
+        """Envia ao pool os chunks gerados (limitado por frame, exceto no modo síncrono)."""
+        uploads = 0
+        while self.synchronous or uploads < self.uploads_per_frame:
+            try:
+                node, vertices = self.ready.get_nowait()
+            except queue.Empty:
+                break
+            requested = self.pending.pop(node)
+            self.generated += 1
+            if node not in wanted or not self.pool.upload(node, vertices, wanted):
+                self.discarded += 1  # a câmera já mudou de ideia ou o pool está cheio
+                continue
+            self.latencies.append(time.perf_counter() - requested)
+            uploads += 1
+
+    def draw(self, program, model, material, stats=None):
+        """
+        Desenha os chunks visíveis com o programa da esfera (mesmos atributos e uniforms).
+
+        Args:
+            program: Programa de shader (basic.vert/basic.frag)
+            model: Model matrix do corpo (4, 4) em ordem de coluna
+            material: instancing.Material do corpo
+            stats: FrameStats opcional para contar triângulos e draw calls
+        """
+        locations = self._locations.get(program)
+        if locations is None:
+            locations = self._locations[program] = [glGetUniformLocation(program, name)
+                                                    for name in ("model", "isSun", "useNormalMap")]
+        model_loc, is_sun_loc, normal_map_loc = locations
+        glUseProgram(program)
+        glUniformMatrix4fv(model_loc, 1, GL_FALSE, np.asarray(model, dtype=np.float32))
+        glUniform1i(is_sun_loc, 1 if material.is_sun else 0)
+        glUniform1i(normal_map_loc, 0 if material.normal_map_id is None else 1)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, material.texture_id)
+        if material.normal_map_id is not None:
+            glActiveTexture(GL_TEXTURE1)
+            glBindTexture(GL_TEXTURE_2D, material.normal_map_id)
+            glActiveTexture(GL_TEXTURE0)
+
+        glBindVertexArray(self.pool.VAO)
+        for node, steps, visible in zip(self.drawn, self.steps, self.visible):
+            if not visible:
+                continue
+            offset, count = self.pool.variant(steps)
+            glDrawElementsBaseVertex(GL_TRIANGLES, count, GL_UNSIGNED_SHORT, ctypes.c_void_p(offset),
+                                     self.pool.slot_of[node] * CHUNK_VERTICES)
+            if stats is not None:
+                stats.add("triangles", count // 3)
+                stats.add("draw_calls")
+        glBindVertexArray(0)
+
+    def metrics(self):
+        """Contagens de chunks, latência de geração e ocupação do pool."""
+        latencies = np.array(self.latencies) * 1000.0
+        return {
+            "leaves": len(self.leaves),
+            "drawn": len(self.drawn),
+            "visible": int(self.visible.sum()),
+            "pending": len(self.pending),
+            "max_level": max(node[1] for node in self.drawn),
+            "pool_used": self.pool.used,
+            "pool_capacity": self.pool.capacity,
+            "evictions": self.pool.evictions,
+            "generated": self.generated,
+            "discarded": self.discarded,
+            "latency_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "latency_ms_p95": float(np.percentile(latencies, 95)) if len(latencies) else None,
+        }
+
+    def report_lines(self):
+        """Linhas de texto com os contadores (para o overlay ou o terminal)."""
+        m = self.metrics()
+        latency = "-" if m["latency_ms_p50"] is None else \
+            f"{m['latency_ms_p50']:.1f}/{m['latency_ms_p95']:.1f} ms"
+        return [f"terreno {self.name}: {m['visible']}/{m['drawn']} chunks (nível máx. {m['max_level']}), "
+                f"{m['pending']} gerando",
+                f"  pool {m['pool_used']}/{m['pool_capacity']}, {m['evictions']} despejos, "
+                f"geração p50/p95 {latency}"]
+
+    def shutdown(self):
+        """Encerra as threads de geração e libera os buffers."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.delete()
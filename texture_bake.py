@@ -0,0 +1,344 @@
+# texture_bake.py
+"""
+Pipeline de "baking" de texturas: decodifica cada imagem uma única vez, gera a
+cadeia de mipmaps na CPU e salva tudo num contêiner compacto (.mip).
+
+Formato do arquivo (little-endian):
+    cabeçalho (HEADER_DTYPE)
+    tabela de níveis (LEVEL_DTYPE * levels)
+    níveis da cadeia, um após o outro (alinhados a 16 bytes), linhas sem padding
+
+Em tempo de execução o arquivo é aberto com np.memmap e cada nível vai direto
+para glTexImage2D, sem decodificar com o Pillow e sem cópias intermediárias em bytes.
+Imagens RGB (ex.: earth.jpg) são guardadas com 3 canais (25% menos bytes que RGBA).
+
+Uso pela linha de comando:
+    python3 texture_bake.py                        # todas as texturas de assets/textures
+    python3 texture_bake.py assets/textures/earth.jpg --filter lanczos --force
+"""
+import argparse
+import glob
+import hashlib
+import os
+
+import numpy as np
+from PIL import Image
+from OpenGL.GL import (
+    GL_TEXTURE_2D, GL_RGB, GL_RGBA, GL_RGB8, GL_RGBA8, GL_UNSIGNED_BYTE,
+    GL_CLAMP_TO_EDGE, GL_LINEAR_MIPMAP_LINEAR, GL_LINEAR,
+    GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T, GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER,
+    GL_TEXTURE_BASE_LEVEL, GL_TEXTURE_MAX_LEVEL, GL_UNPACK_ALIGNMENT,
+    glGenTextures, glBindTexture, glTexParameteri, glTexImage2D, glTexSubImage2D, glPixelStorei
+)
+
+BAKE_DIR = os.path.join(".cache", "textures")
+TEXTURE_DIR = os.path.join("assets", "textures")
+
+MAGIC = b"MIPC"
+FORMAT_VERSION = 2  # 2: filtro dos mipmaps no cabeçalho
+ALIGNMENT = 16
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("channels", "u1"),
+    ("levels", "u1"),
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("source_mtime_ns", "<u8"),
+    ("source_size", "<u8"),
+    ("source_sha1", "S20"),
+    ("filter", "u1"),  # índice em FILTERS
+])
+LEVEL_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("width", "<u4"),
+    ("height", "<u4"),
+])
+
+_FORMATS = {3: (GL_RGB8, GL_RGB), 4: (GL_RGBA8, GL_RGBA)}
+
+# Filtros de redução dos mipmaps (ver build_mip_chain)
+FILTERS = ("box", "lanczos")
+
+
+def baked_path(source_path, bake_dir=BAKE_DIR):
+    """
+    Caminho do arquivo .mip correspondente a uma textura de origem. O nome leva
+    um hash do diretório da origem: texturas com o mesmo nome em pastas
+    diferentes não disputam o mesmo .mip.
+    """
+    directory = os.path.abspath(os.path.dirname(source_path))
+    tag = hashlib.sha1(directory.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(bake_dir, f"{os.path.basename(source_path)}.{tag}.mip")
+
+
+def _sha1(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+def _downsample_box(level):
+    """Reduz um nível pela metade com filtro box 2x2 (dimensões ímpares perdem a última linha/coluna)."""
+    data = level.astype(np.float32)
+    if data.shape[0] > 1:
+        rows = data.shape[0] // 2 * 2
+        data = (data[0:rows:2] + data[1:rows:2]) * 0.5
+    if data.shape[1] > 1:
+        cols = data.shape[1] // 2 * 2
+        data = (data[:, 0:cols:2] + data[:, 1:cols:2]) * 0.5
+    return np.clip(data + 0.5, 0, 255).astype(np.uint8)
+
+
+def build_mip_chain(image, filter="box"):
+    """
+    Gera a cadeia completa de mipmaps (até 1x1) de um array (H, W, C) uint8.
+
+    Args:
+        image: Nível 0
+        filter: "box" (média 2x2 em NumPy) ou "lanczos" (cada nível reamostrado do nível 0)
+    """
+    levels = [np.ascontiguousarray(image)]
+    base = Image.fromarray(image) if filter == "lanczos" else None
+    while levels[-1].shape[0] > 1 or levels[-1].shape[1] > 1:
+        height, width = levels[-1].shape[:2]
+        if filter == "lanczos":
+            size = (max(1, width // 2), max(1, height // 2))
+            levels.append(np.asarray(base.resize(size, Image.LANCZOS)))
+        else:
+            levels.append(_downsample_box(levels[-1]))
+    return levels
+
+
+def bake_texture(source_path, output_path=None, filter="box"):
+    """
+    Decodifica a imagem de origem e grava o contêiner .mip com a cadeia de mipmaps.
+    Retorna o caminho do arquivo gerado.
+    """
+    output_path = output_path or baked_path(source_path)
+    img = Image.open(source_path)
+    # Só imagens com transparência precisam de 4 canais; RGB, L, etc. ficam com 3
+    has_alpha = "A" in img.getbands() or "transparency" in img.info
+    img = img.convert("RGBA" if has_alpha else "RGB")
+    levels = build_mip_chain(np.asarray(img), filter)
+
+    stat = os.stat(source_path)
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = FORMAT_VERSION
+    header["channels"] = levels[0].shape[2]
+    header["levels"] = len(levels)
+    header["width"] = img.width
+    header["height"] = img.height
+    header["source_mtime_ns"] = stat.st_mtime_ns
+    header["source_size"] = stat.st_size
+    header["source_sha1"] = _sha1(source_path)
+    header["filter"] = FILTERS.index(filter)
+
+    table = np.zeros(len(levels), dtype=LEVEL_DTYPE)
+    offset = HEADER_DTYPE.itemsize + LEVEL_DTYPE.itemsize * len(levels)
+    for i, level in enumerate(levels):
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        table[i] = (offset, level.shape[1], level.shape[0])
+        offset += level.nbytes
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(table.tobytes())
+        for entry, level in zip(table, levels):
+            f.seek(int(entry["offset"]))
+            f.write(level.tobytes())
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def read_baked(path):
+    """
+    Abre um .mip com np.memmap.
+    Retorna (header, lista de arrays (H, W, C) mapeados em memória, um por nível).
+    """
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    header = data[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+    if header["magic"] != MAGIC or header["version"] != FORMAT_VERSION:
+        raise ValueError(f"Arquivo de textura inválido: {path}")
+
+    channels = int(header["channels"])
+    table_end = HEADER_DTYPE.itemsize + LEVEL_DTYPE.itemsize * int(header["levels"])
+    table = data[HEADER_DTYPE.itemsize:table_end].view(LEVEL_DTYPE)
+    levels = []
+    for entry in table:
+        width, height, offset = int(entry["width"]), int(entry["height"]), int(entry["offset"])
+        size = width * height * channels
+        levels.append(data[offset:offset + size].reshape(height, width, channels))
+    return header, levels
+
+
+def is_current(source_path, path, filter=None):
+    """
+    True se o .mip existe e corresponde à origem. Compara tamanho e mtime e,
+    se o mtime mudou, o hash do conteúdo (ex.: arquivo tocado sem alteração).
+    Com o mesmo hash, o novo mtime é gravado no cabeçalho, e as próximas
+    verificações não precisam ler a origem de novo.
+
+    Args:
+        filter: Se dado, um .mip feito com outro filtro também está desatualizado
+    """
+    try:
+        header, _ = read_baked(path)
+    except (FileNotFoundError, ValueError):
+        return False
+    if filter is not None and header["filter"] != FILTERS.index(filter):
+        return False
+    stat = os.stat(source_path)
+    if stat.st_size != header["source_size"]:
+        return False
+    if stat.st_mtime_ns == header["source_mtime_ns"]:
+        return True
+    if _sha1(source_path) != header["source_sha1"]:
+        return False
+    _update_source_mtime(path, stat.st_mtime_ns)
+    return True
+
+
+def _update_source_mtime(path, mtime_ns):
+    """Regrava só o campo source_mtime_ns do cabeçalho (o resto do .mip não muda)."""
+    try:
+        with open(path, "r+b") as f:
+            f.seek(HEADER_DTYPE.fields["source_mtime_ns"][1])
+            f.write(np.array(mtime_ns, dtype="<u8").tobytes())
+    except OSError:
+        pass  # cache somente leitura: o hash continua sendo conferido
+
+
+def create_mip_texture(num_levels, base_level=0):
+    """
+    Cria e configura (sem dados) uma textura com 'num_levels' níveis de mipmap.
+    Só os níveis de base_level em diante são amostrados (streaming). Retorna o ID.
+    """
+    texture_id = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, texture_id)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_BASE_LEVEL, base_level)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, num_levels - 1)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    return texture_id
+
+
+def upload_level(texture_id, index, level):
+    """Envia um nível (H, W, C) uint8 da cadeia para a textura."""
+    internal_format, pixel_format = _FORMATS[level.shape[2]]
+    height, width = level.shape[:2]
+    glBindTexture(GL_TEXTURE_2D, texture_id)
+    # Linhas RGB não são múltiplas de 4 bytes: os níveis estão empacotados sem padding
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    glTexImage2D(GL_TEXTURE_2D, index, internal_format, width, height, 0,
+                 pixel_format, GL_UNSIGNED_BYTE, level)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+    glBindTexture(GL_TEXTURE_2D, 0)
+
+
+def first_level_within(levels, max_size):
+    """Índice do primeiro nível da cadeia com largura e altura <= max_size."""
+    for index, level in enumerate(levels):
+        if max(level.shape[:2]) <= max_size:
+            return index
+    return len(levels) - 1
+
+
+def allocate_level(texture_id, index, width, height, channels):
+    """Aloca um nível sem dados (preenchido depois por upload_rows)."""
+    internal_format, pixel_format = _FORMATS[channels]
+    glBindTexture(GL_TEXTURE_2D, texture_id)
+    glTexImage2D(GL_TEXTURE_2D, index, internal_format, width, height, 0,
+                 pixel_format, GL_UNSIGNED_BYTE, None)
+    glBindTexture(GL_TEXTURE_2D, 0)
+
+
+def upload_rows(texture_id, index, y, rows):
+    """Envia as linhas 'rows' (H, W, C) de um nível já alocado, a partir da linha y."""
+    _, pixel_format = _FORMATS[rows.shape[2]]
+    glBindTexture(GL_TEXTURE_2D, texture_id)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    glTexSubImage2D(GL_TEXTURE_2D, index, 0, y, rows.shape[1], rows.shape[0],
+                    pixel_format, GL_UNSIGNED_BYTE, rows)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+    glBindTexture(GL_TEXTURE_2D, 0)
+
+
+def set_base_level(texture_id, index):
+    """Define o nível mais detalhado que pode ser amostrado."""
+    glBindTexture(GL_TEXTURE_2D, texture_id)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_BASE_LEVEL, index)
+    glBindTexture(GL_TEXTURE_2D, 0)
+
+
+def release_level(texture_id, index, channels):
+    """Libera a memória de um nível (redefinido com 0x0; deve estar fora de BASE..MAX_LEVEL)."""
+    internal_format, pixel_format = _FORMATS[channels]
+    glBindTexture(GL_TEXTURE_2D, texture_id)
+    glTexImage2D(GL_TEXTURE_2D, index, internal_format, 0, 0, 0,
+                 pixel_format, GL_UNSIGNED_BYTE, None)
+    glBindTexture(GL_TEXTURE_2D, 0)
+
+
+def upload_baked(path):
+    """
+    Cria uma textura OpenGL a partir de um .mip, enviando cada nível da cadeia
+    direto do arquivo mapeado em memória. Retorna o ID da textura.
+    """
+    _, levels = read_baked(path)
+    texture_id = create_mip_texture(len(levels))
+    for i, level in enumerate(levels):
+        upload_level(texture_id, i, level)
+    return texture_id
+
+
+def ensure_baked(texture_path, bake_dir=BAKE_DIR):
+    """
+    Garante que o .mip da textura existe e está atualizado (faz o bake se preciso).
+    Não usa OpenGL, então pode rodar numa thread de trabalho. Retorna o caminho do .mip.
+    """
+    path = baked_path(texture_path, bake_dir)
+    if not is_current(texture_path, path):
+        bake_texture(texture_path, path)
+    return path
+
+
+def load_texture_baked(texture_path, bake_dir=BAKE_DIR):
+    """
+    Substituto de utils.load_texture: usa o .mip se estiver atualizado,
+    senão faz o bake antes. Lança FileNotFoundError se a origem não existir.
+    """
+    return upload_baked(ensure_baked(texture_path, bake_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera os contêineres .mip das texturas.")
+    parser.add_argument("sources", nargs="*", help="Texturas de origem (padrão: assets/textures/*)")
+    parser.add_argument("--filter", choices=FILTERS, default="box")
+    parser.add_argument("--force", action="store_true", help="Refazer mesmo se estiver atualizado")
+    parser.add_argument("--dir", default=BAKE_DIR, help="Diretório de saída")
+    args = parser.parse_args()
+
+    sources = args.sources or sorted(
+        glob.glob(os.path.join(TEXTURE_DIR, "*.jpg")) + glob.glob(os.path.join(TEXTURE_DIR, "*.png"))
+    )
+    for source in sources:
+        path = baked_path(source, args.dir)
+        if not args.force and is_current(source, path, args.filter):
+            print(f"{source}: atualizado")
+            continue
+        bake_texture(source, path, args.filter)
+        header, levels = read_baked(path)
+        print(f"{source}: {int(header['width'])}x{int(header['height'])}, "
+              f"{int(header['channels'])} canais, {len(levels)} níveis ({args.filter}), "
+              f"{os.path.getsize(path) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# texture_streaming.py
+"""
+Streaming dos níveis de mipmap das texturas dos corpos, guiado pelo tamanho na tela.
+
+Cada textura começa só com a cauda da cadeia (níveis com lado <= RESIDENT_SIZE)
+e GL_TEXTURE_BASE_LEVEL apontando para o primeiro deles. A cada frame o raio
+projetado dos corpos visíveis que usam a textura define o nível mais detalhado
+necessário:
+
+    texels por pixel no centro do disco ~ largura do nível / (2 * pi * raio_px)
+
+Os níveis que faltam são lidos do .mip por uma thread de trabalho, do mais
+grosso para o mais fino, e enviados em faixas de linhas (glTexSubImage2D)
+respeitando um limite de bytes por frame; só quando o nível está completo o
+BASE_LEVEL desce para ele. Quando o corpo encolhe (ou sai da tela) por
+DROP_DELAY frames seguidos, os níveis sobrando são liberados.
+
+Assim texturas 16k/32k nunca precisam estar inteiras na memória de vídeo, nem
+na RAM: o .mip é mapeado com np.memmap e só os níveis pedidos são lidos.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import math
+import os
+import queue
+
+import numpy as np
+
+from texture_bake import (
+    baked_path, read_baked, first_level_within,
+    allocate_level, upload_rows, set_base_level, release_level
+)
+
+RESIDENT_SIZE = 64  # níveis sempre residentes: lado <= 64 texels
+STREAM_BUDGET_BYTES = 2 * 1024 * 1024  # por frame
+STRIP_BYTES = 256 * 1024  # granularidade do envio (faixas de linhas)
+DROP_DELAY = 120  # frames sem precisar de um nível antes de liberá-lo
+
+
+class StreamedTexture:
+    """Estado de streaming de uma textura: níveis residentes e corpos que a usam."""
+
+    def __init__(self, name, texture_id, levels, base, owners, order=0):
+        """
+        Args:
+            name: Nome para os relatórios (arquivo de origem)
+            texture_id: ID da textura OpenGL (criada com todos os níveis)
+            levels: Níveis do .mip mapeados em memória (np.memmap)
+            base: Primeiro nível residente da cauda (nunca liberado)
+            owners: Índices dos corpos (na ordem de all_planets) que usam a textura
+            order: Posição do pedido (as texturas são processadas nessa ordem)
+        """
+        self.name = name
+        self.texture_id = texture_id
+        self.levels = levels
+        self.tail_base = base
+        self.base = base       # nível mais detalhado residente (= GL_TEXTURE_BASE_LEVEL)
+        self.wanted = base     # nível pedido no último update
+        self.loading = None    # nível sendo lido ou enviado
+        self.idle_frames = 0   # frames seguidos com níveis sobrando
+        self.owners = np.asarray(owners, dtype=np.int64)
+        self.order = order
+
+    @property
+    def width(self):
+        return self.levels[0].shape[1]
+
+    @property
+    def channels(self):
+        return self.levels[0].shape[2]
+
+    @property
+    def resident_bytes(self):
+        return sum(level.nbytes for level in self.levels[self.base:])
+
+    @property
+    def full_bytes(self):
+        return sum(level.nbytes for level in self.levels)
+
+
+def wanted_level(width, radius_px, tail_base):
+    """
+    Nível mais grosso que ainda tem pelo menos 1 texel por pixel no centro do disco
+    de raio 'radius_px' (a textura equiretangular cobre o perímetro 2 * pi * r).
+    """
+    needed = 2.0 * math.pi * radius_px
+    if needed <= 1.0:
+        return tail_base
+    return int(min(max(math.floor(math.log2(width / needed)), 0), tail_base))
+
+
+class TextureStreamer:
+    """
+    Decide, lê e envia os níveis de mipmap das texturas registradas com request().
+    update() e pump() rodam uma vez por frame na thread do OpenGL.
+    """
+
+    def __init__(self, upload_budget=STREAM_BUDGET_BYTES, resident_size=RESIDENT_SIZE,
+                 drop_delay=DROP_DELAY, workers=2, synchronous=False):
+        """
+        Args:
+            upload_budget: Bytes enviados à GPU por frame
+            resident_size: Lado máximo dos níveis carregados de início (a cauda)
+            drop_delay: Frames sem uso antes de liberar um nível
+            workers: Threads que leem os níveis do disco
+            synchronous: Ler os níveis na própria thread (frames reproduzíveis)
+        """
+        self.upload_budget = upload_budget
+        self.resident_size = resident_size
+        self.drop_delay = drop_delay
+        self.synchronous = synchronous
+        self.executor = None if synchronous else ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="streaming")
+        self.ready = queue.Queue()
+        self.textures = []  # na ordem dos pedidos (não na de chegada): envio reproduzível
+        self._requested = 0
+        self._active = None  # gerador do envio em andamento
+        self._pending = deque()  # níveis lidos esperando o envio (ordem de chegada)
+
+        self.bytes_streamed = 0
+        self.bytes_released = 0
+        self.levels_streamed = 0
+        self.levels_released = 0
+
+    def request(self, loader, texture_path, owners, on_ready):
+        """
+        Carrega a cauda da textura pelo AsyncLoader e registra a textura para o
+        streaming. on_ready(texture_id) como em loader.request_texture.
+        """
+        order = self._requested
+        self._requested += 1
+
+        def register(texture_id):
+            _, levels = read_baked(baked_path(texture_path))
+            base = first_level_within(levels, self.resident_size)
+            self.textures.append(StreamedTexture(
+                os.path.basename(texture_path), texture_id, levels, base, owners, order))
+            self.textures.sort(key=lambda texture: texture.order)
+            on_ready(texture_id)
+
+        loader.request_texture(texture_path, register, max_size=self.resident_size)
+
+    def update(self, indices, radius_px, count):
+        """
+        Escolhe o nível de cada textura pelo maior raio projetado entre os corpos
+        que a usam, pede os níveis que faltam e libera os que sobram.
+
+        Args:
+            indices: Índices (na ordem de all_planets) dos corpos visíveis
+            radius_px: Raio projetado (pixels) de cada corpo visível
+            count: Número total de corpos
+        """
+        screen = np.zeros(count)
+        screen[indices] = radius_px
+        for texture in self.textures:
+            texture.wanted = wanted_level(texture.width, screen[texture.owners].max(),
+                                          texture.tail_base)
+            if texture.wanted < texture.base:
+                texture.idle_frames = 0
+                if texture.loading is None:
+                    # Do mais grosso para o mais fino: a nitidez melhora aos poucos
+                    self._load(texture, texture.base - 1)
+            elif texture.wanted > texture.base:
+                texture.idle_frames += 1
+                if texture.idle_frames >= self.drop_delay and texture.loading is None:
+                    self._release(texture, texture.wanted)
+            else:
+                texture.idle_frames = 0
+
+    def _load(self, texture, index):
+        texture.loading = index
+        if self.synchronous:
+            self._pending.append((texture, index, np.array(texture.levels[index])))
+            return
+
+        def work():
+            # Copiar para a RAM aqui para que o envio não espere pelo disco
+            self.ready.put((texture, index, np.array(texture.levels[index])))
+
+        self.executor.submit(work)
+
+    def _release(self, texture, base):
+        """Sobe o BASE_LEVEL para 'base' e libera os níveis mais detalhados."""
+        set_base_level(texture.texture_id, base)
+        for index in range(texture.base, base):
+            release_level(texture.texture_id, index, texture.channels)
+            self.bytes_released += texture.levels[index].nbytes
+            self.levels_released += 1
+        texture.base = base
+        texture.idle_frames = 0
+
+    def _upload(self, texture, index, pixels):
+        """Envia um nível em faixas de linhas; só passa a ser amostrado quando completo."""
+        height, width, channels = pixels.shape
+        allocate_level(texture.texture_id, index, width, height, channels)
+        rows = max(1, STRIP_BYTES // (width * channels))
+        for y in range(0, height, rows):
+            strip = pixels[y:y + rows]
+            upload_rows(texture.texture_id, index, y, strip)
+            yield strip.nbytes
+        set_base_level(texture.texture_id, index)
+        texture.base = index
+        texture.loading = None
+        self.levels_streamed += 1
+
+    def pump(self):
+        """Envia os níveis lidos até o limite de bytes do frame. Retorna os bytes enviados."""
+        while True:
+            try:
+                self._pending.append(self.ready.get_nowait())
+            except queue.Empty:
+                break
+
+        sent = 0
+        while sent < self.upload_budget:
+            if self._active is None:
+                if not self._pending:
+                    break
+                self._active = self._upload(*self._pending.popleft())
+            try:
+                sent += next(self._active)
+            except StopIteration:
+                self._active = None
+
+        self.bytes_streamed += sent
+        return sent
+
+    @property
+    def resident_bytes(self):
+        """Bytes de todos os níveis residentes (dados enviados, sem padding do driver)."""
+        return sum(texture.resident_bytes for texture in self.textures)
+
+    def metrics(self):
+        """Residência de cada textura e totais de streaming."""
+        return {
+            "textures": {
+                texture.name: {
+                    "base_level": texture.base,
+                    "wanted_level": texture.wanted,
+                    "levels": len(texture.levels),
+                    "resident_bytes": texture.resident_bytes,
+                    "full_bytes": texture.full_bytes,
+                }
+                for texture in self.textures
+            },
+            "bytes_streamed": self.bytes_streamed,
+            "bytes_released": self.bytes_released,
+            "levels_streamed": self.levels_streamed,
+            "levels_released": self.levels_released,
+        }
+
+    def report_lines(self):
+        """Linhas de texto com a residência de cada textura (para o overlay ou o terminal)."""
+        lines = [f"{'textura':<22}{'nível':>6}{'pedido':>8}{'residente':>12}{'total':>10}  KB"]
+        for texture in self.textures:
+            lines.append(f"{texture.name:<22}{texture.base:>6}{texture.wanted:>8}"
+                         f"{texture.resident_bytes / 1024:>12.0f}{texture.full_bytes / 1024:>10.0f}")
+        return lines
+
+    def shutdown(self):
+        """Encerra as threads de leitura (descarta o que ainda não foi enviado)."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,153 @@
+# uniform_buffers.py
+"""
+Uniform Buffer Objects (layout std140) com o estado de câmera e de luz.
+
+Em vez de um glUniform* por valor e por programa, cada bloco fica num UBO ligado
+a um ponto de ligação fixo, compartilhado por todos os shaders que o declaram:
+
+    layout (std140) uniform FrameData {        // ponto de ligação 0
+        mat4 view;
+        mat4 projection;
+        mat4 viewProjection;
+        vec3 viewPos;   // posição da câmera
+        float time;
+    };
+    layout (std140) uniform LightData {        // ponto de ligação 1
+        vec3 lightPos;
+        float ambientStrength;
+        vec3 lightColor;
+    };
+    layout (std140) uniform ClusterData {      // ponto de ligação 2
+        uvec4 clusterGrid;    // tiles em x, y, fatias em z, número de luzes pontuais
+        vec4 clusterParams;   // largura e altura do tile (pixels), escala e bias das fatias
+        uint clusterNaive;    // 1: percorre todas as luzes (comparação com o clustered)
+    };
+
+Os dados de cada bloco ficam num array estruturado NumPy pré-alocado, com os
+offsets do std140, e vão para a GPU com um único glBufferSubData.
+"""
+import numpy as np
+from OpenGL.GL import (
+    GL_UNIFORM_BUFFER, GL_DYNAMIC_DRAW, GL_INVALID_INDEX,
+    glGenBuffers, glBindBuffer, glBufferData, glBufferSubData, glBindBufferBase,
+    glGetUniformBlockIndex, glUniformBlockBinding
+)
+
+FRAME_BINDING = 0
+LIGHT_BINDING = 1
+CLUSTER_BINDING = 2
+
+# std140: mat4 = 4 colunas vec4 (64 bytes); um float logo após um vec3 ocupa o padding dele
+FRAME_DTYPE = np.dtype({
+    "names": ["view", "projection", "view_projection", "camera_position", "time"],
+    "formats": [("<f4", (4, 4)), ("<f4", (4, 4)), ("<f4", (4, 4)), ("<f4", 3), "<f4"],
+    "offsets": [0, 64, 128, 192, 204],
+    "itemsize": 208,
+})
+LIGHT_DTYPE = np.dtype({
+    "names": ["position", "ambient_strength", "color"],
+    "formats": [("<f4", 3), "<f4", ("<f4", 3)],
+    "offsets": [0, 12, 16],
+    "itemsize": 32,
+})
+CLUSTER_DTYPE = np.dtype({
+    "names": ["grid", "params", "naive"],
+    "formats": [("<u4", 4), ("<f4", 4), "<u4"],
+    "offsets": [0, 16, 32],
+    "itemsize": 48,
+})
+
+
+def _columns(matrix):
+    """Matriz glm -> array (4, 4) na ordem de memória do GLSL (coluna a coluna)."""
+    # np.array de uma matriz glm devolve a forma matemática (linha, coluna)
+    return np.array(matrix, dtype=np.float32).T
+
+
+class UniformBlock:
+    """
+    Um bloco uniform std140: array estruturado pré-alocado + UBO ligado ao
+    ponto de ligação 'binding'. Os campos são escritos em 'data' e enviados
+    de uma vez com upload().
+    """
+
+    def __init__(self, name, dtype, binding):
+        """
+        Args:
+            name: Nome do bloco nos shaders (ex.: "FrameData")
+            dtype: dtype estruturado com os offsets do std140
+            binding: Ponto de ligação fixo (GL_UNIFORM_BUFFER)
+        """
+        self.name = name
+        self.binding = binding
+        self.data = np.zeros(1, dtype=dtype)
+        self.UBO = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.UBO)
+        glBufferData(GL_UNIFORM_BUFFER, dtype.itemsize, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+        glBindBufferBase(GL_UNIFORM_BUFFER, binding, self.UBO)
+
+    def attach(self, program):
+        """Liga o bloco 'name' do programa ao ponto de ligação (se o programa o declarar)."""
+        index = glGetUniformBlockIndex(program, self.name)
+        if index != GL_INVALID_INDEX:
+            glUniformBlockBinding(program, index, self.binding)
+
+    def upload(self):
+        """Envia o bloco inteiro com um único glBufferSubData."""
+        # Os shaders leem pelo ponto de ligação: o alvo genérico pode ficar com o UBO
+        glBindBuffer(GL_UNIFORM_BUFFER, self.UBO)
+        glBufferSubData(GL_UNIFORM_BUFFER, 0, self.data.nbytes, self.data)
+
+
+class FrameUniforms(UniformBlock):
+    """Bloco FrameData: matrizes da câmera, posição da câmera e tempo (atualizado a cada frame)."""
+
+    def __init__(self, binding=FRAME_BINDING):
+        super().__init__("FrameData", FRAME_DTYPE, binding)
+
+    def update(self, view, projection, camera_position, time):
+        """Preenche o bloco a partir das matrizes glm da câmera e envia para a GPU."""
+        frame = self.data[0]
+        frame["view"] = _columns(view)
+        frame["projection"] = _columns(projection)
+        frame["view_projection"] = _columns(projection * view)
+        frame["camera_position"] = camera_position
+        frame["time"] = time
+        self.upload()
+
+
+class LightUniforms(UniformBlock):
+    """Bloco LightData: luz pontual (o Sol) e a intensidade da luz ambiente."""
+
+    def __init__(self, binding=LIGHT_BINDING):
+        super().__init__("LightData", LIGHT_DTYPE, binding)
+
+    def update(self, position, color, ambient_strength):
+        """Preenche o bloco e envia para a GPU (só precisa ser chamado quando a luz muda)."""
+        light = self.data[0]
+        light["position"] = position
+        light["color"] = color
+        light["ambient_strength"] = ambient_strength
+        self.upload()
+
+
+class ClusterUniforms(UniformBlock):
+    """Bloco ClusterData: dimensões da grade de clusters e fatiamento da profundidade."""
+
+    def __init__(self, binding=CLUSTER_BINDING):
+        super().__init__("ClusterData", CLUSTER_DTYPE, binding)
+
+    def update(self, grid, light_count, tile_size, slice_scale, slice_bias, naive):
+        """Preenche o bloco e envia para a GPU."""
+        cluster = self.data[0]
+        cluster["grid"] = (*grid, light_count)
+        cluster["params"] = (*tile_size, slice_scale, slice_bias)
+        cluster["naive"] = 1 if naive else 0
+        self.upload()
+
+
+def attach_uniform_blocks(program, *blocks):
+    """Liga os blocos uniform de 'program' aos pontos de ligação de cada UniformBlock."""
+    for block in blocks:
+        block.attach(program)
@@ -1,41 +1,127 @@
-from OpenGL.GL import GL_VERTEX_SHADER, GL_FRAGMENT_SHADER
-from OpenGL.GL.shaders import compileProgram, compileShader
 from OpenGL.GL import (
     GL_TEXTURE_2D, GL_RGBA, GL_UNSIGNED_BYTE, 
     GL_CLAMP_TO_EDGE, GL_LINEAR_MIPMAP_LINEAR, GL_LINEAR, 
     GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T, GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER, 
     glGenTextures, glBindTexture, glTexParameteri, glTexImage2D, glGenerateMipmap
 )
+from OpenGL.GL import (
+    GL_ARRAY_BUFFER, GL_ELEMENT_ARRAY_BUFFER, GL_STATIC_DRAW, GL_FLOAT, GL_FALSE, GL_TRUE,
+    GL_SHORT, GL_UNSIGNED_SHORT, GL_UNSIGNED_INT, GL_INT_2_10_10_10_REV,
+    glGenVertexArrays, glGenBuffers, glBindVertexArray, glBindBuffer, glBufferData,
+    glVertexAttribPointer, glEnableVertexAttribArray, glDisableVertexAttribArray
+)
 from PIL import Image
 import numpy as np 
+import ctypes
+
+from clustered_lighting import bind_sampler_units
+from shader_cache import load_program
+
+# Layouts de vértice das malhas dos corpos: "float" (14 floats, 56 bytes) e
+# "packed" (meshes.PACKED_VERTEX_DTYPE, 20 bytes)
+VERTEX_FORMATS = ("float", "packed")
+VERTEX_STRIDES = {"float": 14 * 4, "packed": 20}
 
 
 def load_shader(vertex_path, fragment_path):
     """
-    Lê os arquivos, compila e linka o programa de shader.
+    Lê os arquivos, compila e linka o programa de shader, ou o carrega do cache
+    de binários do driver (ver shader_cache.py). Os samplers de texture buffer
+    já saem ligados às suas unidades (ver clustered_lighting.bind_sampler_units).
     Retorna o ID do programa OpenGL ou lança erro.
     """
-    with open(vertex_path, "r") as f:
-        vertex_src = f.read()
+    program = load_program(vertex_path, fragment_path)
+    bind_sampler_units(program)
+    return program
+
+
+def create_mesh_buffers(vertices, indices, vertex_format="float"):
+    """
+    Cria VAO, VBO e EBO para uma malha no formato de 14 floats por vértice
+    [x,y,z, u,v, nx,ny,nz, tx,ty,tz, bx,by,bz] (ou no layout compacto, com
+    vertex_format="packed") e configura os atributos.
+    Retorna (VAO, VBO, EBO). O VAO fica desligado ao final.
+    """
+    VAO = glGenVertexArrays(1)
+    VBO = glGenBuffers(1)
+    EBO = glGenBuffers(1)
+
+    glBindVertexArray(VAO)
+
+    # VBO: Envia os dados dos vértices
+    glBindBuffer(GL_ARRAY_BUFFER, VBO)
+    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+
+    # EBO: Envia os índices
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, EBO)
+    glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+
+    configure_mesh_attributes(vertex_format)
+
+    glBindVertexArray(0)
+    return VAO, VBO, EBO
+
+
+def index_type(indices):
+    """Tipo OpenGL dos índices (GL_UNSIGNED_SHORT ou GL_UNSIGNED_INT) pelo dtype do array."""
+    return GL_UNSIGNED_SHORT if np.asarray(indices).dtype.itemsize == 2 else GL_UNSIGNED_INT
+
+
+def configure_mesh_attributes(vertex_format="float"):
+    """
+    Configura os atributos 0-4 do layout de 14 floats por vértice (ou 0-3 do
+    layout compacto) no VAO ligado, lendo do GL_ARRAY_BUFFER ligado.
+    """
+    if vertex_format == "packed":
+        _configure_packed_attributes()
+        return
+
+    # Configurar os Atributos (Layout do Vertex Shader)
+    stride = 14 * 4  # 14 floats * 4 bytes
+
+    # Local 0: Posição (x, y, z) - Offset 0
+    glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+    glEnableVertexAttribArray(0)
+
+    # Local 1: TexCoord (u, v) - Offset de 3 floats (12 bytes)
+    glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * 4))
+    glEnableVertexAttribArray(1)
 
-    with open(fragment_path, "r") as f:
-        fragment_src = f.read()
+    # Local 2: Normal (nx, ny, nz) - Offset de 5 floats (20 bytes)
+    glVertexAttribPointer(2, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(5 * 4))
+    glEnableVertexAttribArray(2)
 
-    try:
-        shader_vertex = compileShader(vertex_src, GL_VERTEX_SHADER)
-    except RuntimeError as e:
-        print(f"ERRO ao compilar Vertex Shader ({vertex_path}):\n{e}")
-        raise
+    # Local 3: Tangent (tx, ty, tz) - Offset de 8 floats (32 bytes)
+    glVertexAttribPointer(3, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(8 * 4))
+    glEnableVertexAttribArray(3)
 
-    try:
-        shader_fragment = compileShader(fragment_src, GL_FRAGMENT_SHADER)
-    except RuntimeError as e:
-        print(f"ERRO ao compilar Fragment Shader ({fragment_path}):\n{e}")
-        raise
+    # Local 4: Bitangent (bx, by, bz) - Offset de 11 floats (44 bytes)
+    glVertexAttribPointer(4, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(11 * 4))
+    glEnableVertexAttribArray(4)
 
-    shader_program = compileProgram(shader_vertex, shader_fragment)
 
-    return shader_program
+def _configure_packed_attributes():
+    """Atributos do layout compacto (meshes.PACKED_VERTEX_DTYPE), todos normalizados."""
+    stride = 20
+
+    # Local 0: Posição (3 shorts normalizados) - Offset 0 (o 4º short é alinhamento)
+    glVertexAttribPointer(0, 3, GL_SHORT, GL_TRUE, stride, ctypes.c_void_p(0))
+    glEnableVertexAttribArray(0)
+
+    # Local 1: TexCoord (2 ushorts normalizados) - Offset 8
+    glVertexAttribPointer(1, 2, GL_UNSIGNED_SHORT, GL_TRUE, stride, ctypes.c_void_p(8))
+    glEnableVertexAttribArray(1)
+
+    # Local 2: Normal (2_10_10_10) - Offset 12
+    glVertexAttribPointer(2, 4, GL_INT_2_10_10_10_REV, GL_TRUE, stride, ctypes.c_void_p(12))
+    glEnableVertexAttribArray(2)
+
+    # Local 3: Tangent + sinal da bitangente no w (2_10_10_10) - Offset 16
+    glVertexAttribPointer(3, 4, GL_INT_2_10_10_10_REV, GL_TRUE, stride, ctypes.c_void_p(16))
+    glEnableVertexAttribArray(3)
+
+    # Local 4: sem bitangente (o shader usa B = w * N × T)
+    glDisableVertexAttribArray(4)
 
 
 def load_texture(texture_path):
@@ -86,56 +172,16 @@ def load_texture(texture_path):
     return texture_id
 
 
-def generate_starfield_texture(width=1024, height=1024, star_density=0.01):
+def create_placeholder_texture(color=(128, 128, 128, 255)):
     """
-    Gera uma textura procedural de campo de estrelas.
-    
-    Args:
-        width: Largura da textura
-        height: Altura da textura
-        star_density: Densidade de estrelas (0.0 a 1.0)
-    
-    Returns:
-        ID da textura OpenGL
+    Cria uma textura 1x1 de cor sólida, usada enquanto a textura real ainda carrega.
+    Retorna o ID da textura.
     """
-    # Criar array com fundo preto
-    starfield = np.zeros((height, width, 4), dtype=np.uint8)
-    
-    # Adicionar stars aleatoriamente
-    num_stars = int(width * height * star_density)
-    star_x = np.random.randint(0, width, num_stars)
-    star_y = np.random.randint(0, height, num_stars)
-    
-    # Variar intensidade das estrelas (mais brilhantes)
-    star_brightness = np.random.randint(150, 255, num_stars)
-    
-    for i in range(num_stars):
-        x, y = star_x[i], star_y[i]
-        brightness = star_brightness[i]
-        # Cor branca com intensidade variável
-        starfield[y, x] = [brightness, brightness, brightness, 255]
-    
-    # Converter para imagem PIL
-    img = Image.fromarray(starfield, 'RGBA')
-    img_data = img.tobytes()
-    
-    # Criar textura OpenGL
+    pixel = np.array(color, dtype=np.uint8)
     texture_id = glGenTextures(1)
     glBindTexture(GL_TEXTURE_2D, texture_id)
-    
-    # Parâmetros de wrapping e filtering
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    
-    # Upload dados
-    glTexImage2D(
-        GL_TEXTURE_2D, 0, GL_RGBA,
-        width, height, 0,
-        GL_RGBA, GL_UNSIGNED_BYTE, img_data
-    )
-    
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, 1, 1, 0, GL_RGBA, GL_UNSIGNED_BYTE, pixel)
     glBindTexture(GL_TEXTURE_2D, 0)
-    
-    return texture_id
\ No newline at end of file
+    return texture_id